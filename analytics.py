@@ -0,0 +1,184 @@
+"""
+Pre-aggregated sales analytics
+Daily rollups of revenue, units and order count overall, per category and
+per product, maintained incrementally from the orders table
+
+Orders are folded in by increasing order id, tracked by a watermark in
+analytics_rollup_state. Orders changed after they were rolled up (e.g.
+cancelled) are caught through orders.updated_at, and the days they fall
+on are re-aggregated from scratch. Reports read only the small rollup
+tables, never orders/order_items. The SQL helpers take an open cursor
+and must run inside a transaction (see main.db_transaction)
+
+Both new orders and changes are picked up one run after they are first
+seen, so reports lag checkouts and order updates by one to two roll-up
+intervals (main.ANALYTICS_ROLLUP_INTERVAL)
+"""
+
+from datetime import date
+from typing import List, Optional
+
+# Orders folded into the rollups per transaction
+ROLLUP_BATCH_SIZE = 5000
+
+# Watermark row in analytics_rollup_state
+ROLLUP_STATE_NAME = "sales"
+
+# (table, key columns, key expressions) for each rollup
+_ROLLUPS = (
+    ("sales_daily", ("day",), ("DATE(o.order_date)",)),
+    ("sales_daily_category", ("day", "category"), ("DATE(o.order_date)", "p.category")),
+    ("sales_daily_product", ("day", "product_id"), ("DATE(o.order_date)", "oi.product_id")),
+)
+
+def roll_up_orders(cursor, batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """Fold the next batch of orders into the daily rollups
+
+    Only orders up to `seen_order_id` are eligible; that mark is advanced
+    to the newest order id each time the rollups catch up, so an order is
+    rolled up one run (up to one roll-up interval) after it first became
+    visible. This gives checkouts that were still in flight (and so had
+    lower ids than orders already committed) time to commit before the
+    watermark passes them. Once caught up, days with orders changed since
+    the last run are re-rolled (see reroll_changed_days).
+
+    The state row is locked for the whole batch, so concurrent runners
+    in several workers take turns. Cancelled orders are skipped; products
+    are grouped under their category at roll-up time. Returns the number
+    of orders rolled up (0 once caught up).
+    """
+    cursor.execute(
+        "INSERT IGNORE INTO analytics_rollup_state (name, last_order_id, seen_order_id) VALUES (%s, 0, 0)",
+        (ROLLUP_STATE_NAME,)
+    )
+    cursor.execute("""
+        SELECT last_order_id, seen_order_id, changes_checked_at, changes_seen_at 
+        FROM analytics_rollup_state WHERE name = %s FOR UPDATE
+    """, (ROLLUP_STATE_NAME,))
+    state = cursor.fetchone()
+    last_order_id = state['last_order_id']
+
+    cursor.execute("""
+        SELECT id FROM orders WHERE id > %s AND id <= %s ORDER BY id LIMIT %s
+    """, (last_order_id, state['seen_order_id'], batch_size))
+    order_ids = [row['id'] for row in cursor.fetchall()]
+
+    if not order_ids:
+        reroll_changed_days(cursor, state)
+        # Caught up: newer orders become eligible on the next run
+        cursor.execute("""
+            UPDATE analytics_rollup_state
+            SET seen_order_id = (SELECT COALESCE(MAX(id), 0) FROM orders)
+            WHERE name = %s
+        """, (ROLLUP_STATE_NAME,))
+        return 0
+
+    upper_order_id = order_ids[-1]
+    for table, key_columns, key_expressions in _ROLLUPS:
+        _aggregate_into(cursor, table, key_columns, key_expressions,
+                        "o.id > %s AND o.id <= %s", (last_order_id, upper_order_id))
+
+    cursor.execute(
+        "UPDATE analytics_rollup_state SET last_order_id = %s WHERE name = %s",
+        (upper_order_id, ROLLUP_STATE_NAME)
+    )
+    return len(order_ids)
+
+def _aggregate_into(cursor, table, key_columns, key_expressions, order_filter: str, params):
+    """Add the non-cancelled orders matching `order_filter` to a rollup table"""
+    cursor.execute(f"""
+        INSERT INTO {table} ({', '.join(key_columns)}, revenue, units, order_count)
+        SELECT {', '.join(key_expressions)},
+               SUM(oi.price * oi.quantity), SUM(oi.quantity), COUNT(DISTINCT o.id)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id
+        JOIN products p ON p.id = oi.product_id
+        WHERE {order_filter} AND o.status <> 'cancelled'
+        GROUP BY {', '.join(key_expressions)}
+        ON DUPLICATE KEY UPDATE
+            revenue = revenue + VALUES(revenue),
+            units = units + VALUES(units),
+            order_count = order_count + VALUES(order_count)
+    """, params)
+
+def reroll_changed_days(cursor, state) -> List[date]:
+    """Re-aggregate the days of rolled-up orders changed since the last run
+
+    Rollups only grow by order id, so a status change (a cancellation) or
+    an edited amount on an order already folded in would otherwise stay
+    counted forever. Like new orders, changes are handled one run after
+    they are seen: only updates up to `changes_seen_at` are eligible, then
+    the watermarks move forward. Each affected day is deleted from the
+    rollups and rebuilt from every order up to `last_order_id`, so
+    re-rolling a day twice is harmless. Runs under the locked state row
+    (see roll_up_orders); returns the days re-rolled.
+    """
+    days = []
+    if state['changes_seen_at'] is not None:
+        cursor.execute("""
+            SELECT DISTINCT DATE(order_date) AS day FROM orders 
+            WHERE updated_at > COALESCE(%s, '1970-01-01') AND updated_at <= %s AND id <= %s
+            ORDER BY day
+        """, (state['changes_checked_at'], state['changes_seen_at'], state['last_order_id']))
+        days = [row['day'] for row in cursor.fetchall()]
+
+    for day in days:
+        for table, key_columns, key_expressions in _ROLLUPS:
+            cursor.execute(f"DELETE FROM {table} WHERE day = %s", (day,))
+            _aggregate_into(cursor, table, key_columns, key_expressions,
+                            "o.order_date >= %s AND o.order_date < %s + INTERVAL 1 DAY AND o.id <= %s",
+                            (day, day, state['last_order_id']))
+
+    cursor.execute("""
+        UPDATE analytics_rollup_state 
+        SET changes_checked_at = changes_seen_at, changes_seen_at = NOW() 
+        WHERE name = %s
+    """, (ROLLUP_STATE_NAME,))
+    return days
+
+def get_last_rolled_up_order_id(cursor) -> int:
+    """Highest order id included in the rollups"""
+    cursor.execute(
+        "SELECT last_order_id FROM analytics_rollup_state WHERE name = %s",
+        (ROLLUP_STATE_NAME,)
+    )
+    row = cursor.fetchone()
+    return row['last_order_id'] if row else 0
+
+def get_daily_totals(cursor, date_from: date, date_to: date) -> List[dict]:
+    """Revenue, units and orders per day, oldest first (both dates inclusive)"""
+    cursor.execute("""
+        SELECT day, revenue, units, order_count
+        FROM sales_daily
+        WHERE day BETWEEN %s AND %s
+        ORDER BY day
+    """, (date_from, date_to))
+    return cursor.fetchall()
+
+def get_category_daily(cursor, date_from: date, date_to: date, category: Optional[str] = None) -> List[dict]:
+    """Revenue, units and orders per day and category (both dates inclusive)"""
+    query = """
+        SELECT day, category, revenue, units, order_count
+        FROM sales_daily_category
+        WHERE day BETWEEN %s AND %s
+    """
+    params = [date_from, date_to]
+    if category is not None:
+        query += " AND category = %s"
+        params.append(category)
+    cursor.execute(query + " ORDER BY day, revenue DESC", params)
+    return cursor.fetchall()
+
+def get_top_products(cursor, date_from: date, date_to: date, limit: int) -> List[dict]:
+    """Products with the highest revenue over a date range"""
+    cursor.execute("""
+        SELECT s.product_id, p.title, p.category,
+               SUM(s.revenue) AS revenue, SUM(s.units) AS units, SUM(s.order_count) AS order_count
+        FROM sales_daily_product s
+        LEFT JOIN products p ON p.id = s.product_id
+        WHERE s.day BETWEEN %s AND %s
+        GROUP BY s.product_id, p.title, p.category
+        ORDER BY revenue DESC
+        LIMIT %s
+    """, (date_from, date_to, limit))
+    return cursor.fetchall()
@@ -6,7 +6,6 @@ This runs in the background and automatically generates static files
 
 import time
 import pymysql
-import hashlib
 import os
 from datetime import datetime
 from dotenv import load_dotenv
@@ -27,28 +26,23 @@ DB_CONFIG = {
     'cursorclass': pymysql.cursors.DictCursor
 }
 
-def get_products_hash():
-    """Get a hash of all products to detect changes"""
+def get_catalog_version():
+    """Get the current catalog version from the change log
+
+    The version increases on every product insert, update or delete, and
+    on stock changes (coalesced by the API to about once a second), so
+    comparing it is enough to detect changes without reading the catalog.
+    """
     try:
         connection = pymysql.connect(**DB_CONFIG)
         with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id, title, description, price, quantity, category, 
-                       image_full_url, image_main_url, image_thumb_url, 
-                       updated_at
-                FROM products 
-                WHERE is_active = TRUE 
-                ORDER BY id
-            """)
-            products = cursor.fetchall()
+            cursor.execute("SELECT COALESCE(MAX(version), 0) AS version FROM catalog_changes")
+            version = cursor.fetchone()['version']
         connection.close()
-        
-        # Create hash from product data
-        products_str = str(products)
-        return hashlib.md5(products_str.encode()).hexdigest()
+        return version
         
     except Exception as e:
-        print(f"Error getting products hash: {e}")
+        print(f"Error getting catalog version: {e}")
         return None
 
 def run_static_generator():
@@ -72,26 +66,26 @@ def monitor_products():
     print("⏹️  Press Ctrl+C to stop monitoring")
     print("-" * 60)
     
-    last_hash = None
+    last_version = None
     check_interval = 30  # Check every 30 seconds
     
     try:
         while True:
-            current_hash = get_products_hash()
+            current_version = get_catalog_version()
             
-            if current_hash is None:
+            if current_version is None:
                 print(f"⚠️  {datetime.now().strftime('%H:%M:%S')} - Could not connect to database")
                 time.sleep(check_interval)
                 continue
             
-            if last_hash is None:
+            if last_version is None:
                 # First run
-                last_hash = current_hash
+                last_version = current_version
                 print(f"🎯 {datetime.now().strftime('%H:%M:%S')} - Initial product state captured")
                 run_static_generator()
-            elif current_hash != last_hash:
+            elif current_version != last_version:
                 # Products changed
-                last_hash = current_hash
+                last_version = current_version
                 run_static_generator()
             else:
                 # No changes
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+In-process API load benchmark
+Drives the FastAPI app through an in-process ASGI client, backed by the
+in-memory database stand-in (standin_db.py), and reports latency
+percentiles and throughput per endpoint and concurrency level
+
+Everything runs on one event loop, like a single uvicorn worker. Blocking
+work in an async endpoint serializes requests, so its throughput stays
+flat as clients are added while per-request latency may not move at all;
+the report therefore shows how req/s scales from the lowest to the
+highest concurrency level and warns when it does not grow (--min-scaling
+turns that into a failure). Results can be saved with --json and
+compared against an earlier run with --compare
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Keep app logging (e.g. re-select warnings on every update) out of the report
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+# Per-phase breakdown of every response (see server_timing.py)
+os.environ.setdefault("SERVER_TIMING", "1")
+
+import httpx
+
+from standin_db import CATEGORIES, StandInDatabase
+
+SCENARIOS = ["catalog", "search", "filter", "add_product", "update_product", "checkout"]
+
+# Throughput growth (highest over lowest concurrency) below which the report warns
+SCALING_WARNING = 1.2
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+def add_server_timing(phases, header):
+    """Accumulate `name;dur=ms` entries of a Server-Timing header into phases"""
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            if param.startswith("dur="):
+                phases[name] = phases.get(name, 0.0) + float(param[4:])
+
+def sample_jpeg():
+    """Small JPEG upload for the add-product scenario"""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (1200, 900), (180, 90, 40)).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def load_app(database, images_dir):
+    """Import main with the stand-in installed and images (and the catalog snapshot) written to a temporary directory"""
+    database.install()
+    import main
+
+    main.IMAGES_DIR = images_dir
+    main.THUMBNAIL_DIR = os.path.join(images_dir, "thumbnails")
+    main.MAIN_DIR = os.path.join(images_dir, "main")
+    main.ORIGINAL_DIR = os.path.join(images_dir, "original")
+    for directory in (main.THUMBNAIL_DIR, main.MAIN_DIR, main.ORIGINAL_DIR):
+        os.makedirs(directory, exist_ok=True)
+    main.catalog_snapshot.SNAPSHOT_PATH = os.path.join(images_dir, "catalog_snapshot.bin")
+
+    # /search/ and /filter/ read the in-memory product list
+    main.products_db[:] = [
+        {**product, 'price': float(product['price']), 'created_at': product['created_at'].isoformat()}
+        for product in database.products.values()
+    ]
+    return main
+
+def build_requests(main, database, image):
+    """Map each scenario to a coroutine factory taking (client, sequence number)"""
+    admin = {"Authorization": f"Bearer {main.ADMIN_TOKEN}"}
+    product_ids = sorted(database.products)
+
+    def checkout_body(n):
+        ids = [product_ids[(n + offset) % len(product_ids)] for offset in range(3)]
+        total = sum(float(database.products[product_id]['price']) for product_id in ids)
+        items = [{"product_id": product_id, "quantity": 1, "price": float(database.products[product_id]['price'])}
+                 for product_id in ids]
+        return {"customer_id": 1, "shipping_address_id": 1, "items": items, "total_amount": total}
+
+    return {
+        "catalog": lambda client, n: client.get("/products/"),
+        "search": lambda client, n: client.get("/search/", params={"q": f"product {n % 100}"}),
+        "filter": lambda client, n: client.get("/filter/", params={
+            "category": CATEGORIES[n % len(CATEGORIES)], "min_price": 20, "max_price": 80,
+            "in_stock": "true", "sort_by": "price"
+        }),
+        "add_product": lambda client, n: client.post("/add-product/", headers=admin, data={
+            "title": f"Bench upload {n}", "price": "19.99", "description": "Benchmark upload",
+            "quantity": "5", "category": "benchmark"
+        }, files={"image": ("bench.jpg", image, "image/jpeg")}),
+        "update_product": lambda client, n: client.put(
+            f"/update-product/{product_ids[n % len(product_ids)]}", headers=admin,
+            data={"price": f"{10 + n % 50}.49", "quantity": str(100 + n % 7)}
+        ),
+        "checkout": lambda client, n: client.post("/orders/", json=checkout_body(n)),
+    }
+
+async def run_level(app, make_request, concurrency, total_requests):
+    """Run `total_requests` requests from `concurrency` clients
+
+    Returns latencies, errors, seconds and summed Server-Timing phases (ms).
+    """
+    latencies = []
+    errors = 0
+    phases = {}
+    counter = iter(range(total_requests))
+    transport = httpx.ASGITransport(app=app)
+
+    async def client_loop(client):
+        nonlocal errors
+        for n in counter:
+            start = time.perf_counter()
+            response = await make_request(client, n)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            add_server_timing(phases, response.headers.get("server-timing", ""))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        await make_request(client, total_requests)  # Warm-up (imports, caches)
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return sorted(latencies), errors, elapsed, phases
+
+def summarize(scenario, concurrency, latencies, errors, elapsed, phases):
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        # Mean time per request in each server-side phase
+        "server_timing_ms": {name: round(total / len(latencies), 3) for name, total in phases.items()},
+    }
+
+def throughput_scaling(results):
+    """Throughput at the highest concurrency level over the lowest, per scenario"""
+    by_scenario = {}
+    for result in results:
+        by_scenario.setdefault(result["scenario"], []).append(result)
+    scaling = {}
+    for scenario, levels in by_scenario.items():
+        levels.sort(key=lambda result: result["concurrency"])
+        if len(levels) > 1:
+            scaling[scenario] = levels[-1]["throughput_rps"] / levels[0]["throughput_rps"]
+    return scaling
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline_path):
+    """Print throughput and p95 changes against an earlier --json run"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    print("-" * 72)
+    print(f"   Compared with {baseline.get('commit') or baseline_path}:")
+    for result in results:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        throughput = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100
+        p95 = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        print(f"   {result['scenario']:<15} c={result['concurrency']:<4} "
+              f"throughput {throughput:+6.1f}%   p95 {p95:+6.1f}%")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="In-process API load benchmark")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS, help="Endpoints to drive")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50], help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario and concurrency level")
+    parser.add_argument("--products", type=int, default=500, help="Products in the stand-in catalog")
+    parser.add_argument("--db-latency-ms", type=float, default=0.2, help="Simulated round trip per statement")
+    parser.add_argument("--connect-ms", type=float, default=0.5, help="Simulated connection setup time")
+    parser.add_argument("--json", metavar="PATH", help="Write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Compare with results from an earlier --json run")
+    parser.add_argument("--min-scaling", type=float,
+                        help="Fail when a scenario's throughput at the highest concurrency is not this many "
+                             "times that at the lowest (e.g. 2 for --scenarios checkout --concurrency 1 50)")
+    args = parser.parse_args()
+
+    database = StandInDatabase(args.products, query_latency=args.db_latency_ms / 1000,
+                               connect_latency=args.connect_ms / 1000)
+
+    print("⏱️  In-process API Benchmark")
+    print("=" * 72)
+    print(f"   {'scenario':<15} {'conc':>4} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as images_dir:
+        main_module = load_app(database, images_dir)
+        requests = build_requests(main_module, database, sample_jpeg())
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                latencies, errors, elapsed, phases = asyncio.run(
+                    run_level(main_module.app, requests[scenario], concurrency, args.requests)
+                )
+                result = summarize(scenario, concurrency, latencies, errors, elapsed, phases)
+                results.append(result)
+                print(f"   {scenario:<15} {concurrency:>4} {result['throughput_rps']:>9.1f} {result['p50_ms']:>8.2f} "
+                      f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {errors:>7}")
+                breakdown = "  ".join(f"{name} {ms:.2f}" for name, ms in result["server_timing_ms"].items())
+                print(f"        {breakdown}")
+
+    scaling = throughput_scaling(results)
+    if scaling:
+        print("-" * 72)
+        print("   Throughput scaling (highest / lowest concurrency):")
+        for scenario, factor in scaling.items():
+            warning = ("  ⚠️  no growth: blocking work on the event loop, or CPU-bound"
+                       if factor < SCALING_WARNING else "")
+            print(f"   {scenario:<15} {factor:6.2f}x{warning}")
+
+    if args.json:
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("json", "compare", "min_scaling")},
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"   Results written to {args.json}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    failed = False
+    if args.min_scaling is not None:
+        for scenario, factor in scaling.items():
+            if factor < args.min_scaling:
+                print(f"❌ {scenario} throughput scaled {factor:.2f}x from the lowest to the highest concurrency "
+                      f"(required {args.min_scaling:.2f}x)")
+                failed = True
+
+    if any(result["errors"] for result in results):
+        print("❌ Some requests failed")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Checkout load benchmark
+Drives POST /orders/ on a running server with concurrent buyers and
+reports orders/sec and latency percentiles
+
+Fixtures (customer, shipping address, products) are created directly in
+the database configured in .env and removed afterwards
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pymysql
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from generate_static_site import DB_CONFIG
+
+# API base URL
+BASE_URL = "http://localhost:8000"
+
+def create_fixtures(product_count):
+    """Create a benchmark customer, address and well-stocked products"""
+    connection = pymysql.connect(**DB_CONFIG)
+    with connection.cursor() as cursor:
+        tag = uuid.uuid4().hex[:8]
+        cursor.execute(
+            "INSERT INTO customers (first_name, last_name, email) VALUES (%s, %s, %s)",
+            ("Bench", "Buyer", f"bench-{tag}@example.com")
+        )
+        customer_id = cursor.lastrowid
+        cursor.execute("""
+            INSERT INTO shipping_addresses (customer_id, address_line1, city, country, zip_code)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (customer_id, "1 Benchmark Road", "Bench City", "IN", "000000"))
+        address_id = cursor.lastrowid
+
+        product_ids = []
+        for i in range(product_count):
+            cursor.execute("""
+                INSERT INTO products (title, description, price, quantity, category)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (f"Bench Product {tag}-{i}", "Checkout benchmark product", 10.00, 10_000_000, "benchmark"))
+            product_ids.append(cursor.lastrowid)
+    connection.close()
+    return customer_id, address_id, product_ids
+
+def remove_fixtures(customer_id, product_ids):
+    """Delete benchmark orders, products, address and customer"""
+    connection = pymysql.connect(**DB_CONFIG)
+    with connection.cursor() as cursor:
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        cursor.execute(f"DELETE FROM order_items WHERE product_id IN ({placeholders})", product_ids)
+        cursor.execute("DELETE FROM orders WHERE customer_id = %s", (customer_id,))
+        cursor.execute(f"DELETE FROM products WHERE id IN ({placeholders})", product_ids)
+        cursor.execute("DELETE FROM shipping_addresses WHERE customer_id = %s", (customer_id,))
+        cursor.execute("DELETE FROM customers WHERE id = %s", (customer_id,))
+    connection.close()
+
+def buyer(orders, order_body):
+    """Place `orders` orders sequentially, return (latencies, failures)"""
+    session = requests.Session()
+    latencies = []
+    failures = 0
+    for _ in range(orders):
+        start = time.perf_counter()
+        response = session.post(f"{BASE_URL}/orders/", json=order_body)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 201:
+            failures += 1
+    return latencies, failures
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Checkout load benchmark")
+    parser.add_argument("--buyers", type=int, default=50, help="Concurrent buyers")
+    parser.add_argument("--orders", type=int, default=20, help="Orders per buyer")
+    parser.add_argument("--items", type=int, default=3, help="Distinct products per order")
+    args = parser.parse_args()
+
+    print("🛒 Checkout Load Benchmark")
+    print("=" * 50)
+
+    customer_id, address_id, product_ids = create_fixtures(args.items)
+    order_body = {
+        "customer_id": customer_id,
+        "shipping_address_id": address_id,
+        "items": [{"product_id": pid, "quantity": 1, "price": 10.00} for pid in product_ids],
+        "total_amount": 10.00 * len(product_ids)
+    }
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.buyers) as executor:
+            results = list(executor.map(lambda _: buyer(args.orders, order_body), range(args.buyers)))
+        elapsed = time.perf_counter() - start
+    finally:
+        remove_fixtures(customer_id, product_ids)
+
+    latencies = sorted(latency for buyer_latencies, _ in results for latency in buyer_latencies)
+    failures = sum(buyer_failures for _, buyer_failures in results)
+    total = len(latencies)
+
+    print(f"   Buyers: {args.buyers}, orders: {total}, items/order: {args.items}")
+    print(f"   Throughput: {(total - failures) / elapsed:.1f} orders/sec")
+    print(f"   Latency p50: {percentile(latencies, 50) * 1000:.1f} ms, "
+          f"p95: {percentile(latencies, 95) * 1000:.1f} ms, "
+          f"p99: {percentile(latencies, 99) * 1000:.1f} ms, "
+          f"mean: {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"   Failed orders: {failures}")
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory benchmark for the finance exports
+Encodes synthetic order rows (or a real table with --database) through
+exports.py and reports rows/sec and peak RSS growth, which should stay
+flat from 1M to 10M rows
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import exports
+
+STATUSES = ["pending", "confirmed", "processing", "shipped", "delivered", "cancelled"]
+
+def synthetic_orders(count):
+    """Yield order tuples shaped like the export query result"""
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        yield (
+            i + 1,
+            i % 50_000 + 1,
+            i % 60_000 + 1,
+            STATUSES[i % len(STATUSES)],
+            Decimal(f"{(i % 10_000) / 100 + 5:.2f}"),
+            start + timedelta(seconds=i)
+        )
+
+def peak_rss_kib():
+    """Peak resident set size of this process so far (KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_benchmark(rows, export_format, output_path):
+    """Export `rows` to a file; return (row_count, seconds, file_bytes)"""
+    row_count = 0
+
+    def counted():
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
+
+    start = time.perf_counter()
+    with open(output_path, "wb") as output:
+        for chunk in exports.iter_export_chunks(counted(), "orders", export_format):
+            output.write(chunk)
+    elapsed = time.perf_counter() - start
+    file_size = os.path.getsize(output_path)
+    os.remove(output_path)
+    return row_count, elapsed, file_size
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Finance export benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000],
+                        help="Synthetic row counts (smallest first)")
+    parser.add_argument("--format", choices=exports.EXPORT_FORMATS, default="csv", help="Output format")
+    parser.add_argument("--database", action="store_true",
+                        help="Export the real orders table (from .env) instead of synthetic rows")
+    args = parser.parse_args()
+
+    if args.format == "parquet" and not exports.parquet_available():
+        print("❌ Parquet benchmark needs pyarrow")
+        sys.exit(1)
+
+    print(f"📦 Finance Export Benchmark ({args.format})")
+    print("=" * 50)
+
+    baseline_rss = peak_rss_kib()
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_path = os.path.join(output_dir, f"orders.{args.format}")
+        if args.database:
+            from generate_static_site import DB_CONFIG
+            runs = [exports.iter_export_rows(DB_CONFIG, "orders")]
+        else:
+            runs = [synthetic_orders(count) for count in args.rows]
+
+        for rows in runs:
+            row_count, elapsed, file_size = run_benchmark(rows, args.format, output_path)
+            growth = peak_rss_kib() - baseline_rss
+            results.append((row_count, growth))
+            print(f"   {row_count:>11,} rows: {elapsed:7.2f}s, {row_count / elapsed:>10,.0f} rows/sec, "
+                  f"output {file_size / 1024 / 1024:8.1f} MiB, peak RSS +{growth / 1024:6.1f} MiB")
+
+    if len(results) < 2:
+        return
+
+    # Peak memory must not scale with the number of rows
+    print("-" * 50)
+    smallest_growth = results[0][1]
+    largest_growth = results[-1][1]
+    print(f"   Peak RSS growth ({results[-1][0]:,} vs {results[0][0]:,} rows): "
+          f"{smallest_growth / 1024:.1f} MiB -> {largest_growth / 1024:.1f} MiB")
+    if largest_growth > max(smallest_growth * 1.5, smallest_growth + 16 * 1024):
+        print("❌ Peak memory grows with export size")
+        sys.exit(1)
+    print("✅ Export memory is bounded")
+
+if __name__ == "__main__":
+    main()
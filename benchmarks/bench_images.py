@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Image pipeline micro-benchmark and regression gate
+Generates synthetic JPEG, PNG (with alpha) and WebP uploads at several
+resolutions and measures, per upload, the decode, resize
+(create_square_thumbnail + resize_with_aspect_ratio) and encode stages,
+the end-to-end save_image_with_sizes time, and the peak RSS growth
+
+Each input runs in a fresh process so peak RSS is attributable to it.
+Results are compared with benchmarks/image_baseline.json (written with
+--save-baseline); the run fails if any case is slower or uses more memory
+than the baseline by more than --threshold. Baselines are machine
+specific, so record them on the machine that runs the gate
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, ".."))
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "image_baseline.json")
+
+FORMATS = {"jpeg": "jpg", "png": "png", "webp": "webp"}
+RESOLUTIONS = [(640, 480), (1920, 1080), (4000, 3000)]
+
+# Output sizes and qualities used by main.save_image_with_sizes
+OUTPUTS = [("thumbnail", 85), ("main", 90), ("original", 95)]
+
+# Differences below these are treated as noise by the gate
+MIN_TIME_DELTA_MS = 2.0
+MIN_RSS_DELTA_MIB = 4.0
+
+def peak_rss_mib():
+    """Peak resident set size of this process so far (MiB, Linux reports KiB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def synthetic_image(image_format, width, height):
+    """Encoded photo-like test image: gradients plus noise, so it compresses realistically"""
+    from PIL import Image
+
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 48)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    if image_format == "png":
+        image.putalpha(gradient)  # Product cut-outs are usually RGBA PNGs
+    buffer = io.BytesIO()
+    image.save(buffer, image_format.upper(), quality=90)
+    return buffer.getvalue()
+
+def measure_case(image_format, width, height, repeat, results):
+    """Child process: time the pipeline stages for one input"""
+    os.environ["LOG_LEVEL"] = "ERROR"
+    from standin_db import StandInDatabase
+    StandInDatabase(product_count=0, query_latency=0, connect_latency=0).install()
+    from PIL import Image
+    import main
+
+    data = synthetic_image(image_format, width, height)
+    with tempfile.TemporaryDirectory() as images_dir:
+        main.IMAGES_DIR = images_dir
+        main.THUMBNAIL_DIR = os.path.join(images_dir, "thumbnails")
+        main.MAIN_DIR = os.path.join(images_dir, "main")
+        main.ORIGINAL_DIR = os.path.join(images_dir, "original")
+        for directory in (main.THUMBNAIL_DIR, main.MAIN_DIR, main.ORIGINAL_DIR):
+            os.makedirs(directory)
+
+        baseline_rss = peak_rss_mib()
+        timings = {"decode_ms": [], "resize_ms": [], "encode_ms": [], "total_ms": []}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with Image.open(io.BytesIO(data)) as img:
+                img.load()
+                if img.mode in ("RGBA", "P"):
+                    img = img.convert("RGB")
+                decoded = time.perf_counter()
+
+                resized = [
+                    main.create_square_thumbnail(img, 200),
+                    main.resize_with_aspect_ratio(img, 600, 400),
+                    main.resize_with_aspect_ratio(img, 800, 600),
+                ]
+                resized_at = time.perf_counter()
+
+                for output, (_, quality) in zip(resized, OUTPUTS):
+                    output.save(io.BytesIO(), image_format.upper(), optimize=True, quality=quality)
+                encoded = time.perf_counter()
+
+            main.save_image_with_sizes(io.BytesIO(data), f"upload.{FORMATS[image_format]}")
+            finished = time.perf_counter()
+
+            timings["decode_ms"].append((decoded - start) * 1000)
+            timings["resize_ms"].append((resized_at - decoded) * 1000)
+            timings["encode_ms"].append((encoded - resized_at) * 1000)
+            timings["total_ms"].append((finished - encoded) * 1000)
+
+    results.put({
+        "case": f"{image_format}-{width}x{height}",
+        "input_kib": round(len(data) / 1024, 1),
+        **{name: round(statistics.median(values), 2) for name, values in timings.items()},
+        "peak_rss_mib": round(peak_rss_mib() - baseline_rss, 1),
+    })
+
+def run_case(image_format, width, height, repeat):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=measure_case, args=(image_format, width, height, repeat, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+def regressions(results, baseline, threshold):
+    """List (case, metric, baseline value, current value) beyond the threshold"""
+    found = []
+    for result in results:
+        before = baseline.get(result["case"])
+        if before is None:
+            continue
+        for metric, floor in (("total_ms", MIN_TIME_DELTA_MS), ("peak_rss_mib", MIN_RSS_DELTA_MIB)):
+            if result[metric] > before[metric] * (1 + threshold) and result[metric] - before[metric] > floor:
+                found.append((result["case"], metric, before[metric], result[metric]))
+    return found
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Image pipeline benchmark")
+    parser.add_argument("--formats", nargs="+", choices=sorted(FORMATS), default=sorted(FORMATS))
+    parser.add_argument("--repeat", type=int, default=5, help="Uploads per case (medians are reported)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown/growth (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    print("🖼️  Image Pipeline Benchmark")
+    print("=" * 78)
+    print(f"   {'case':<18} {'input KiB':>9} {'decode':>8} {'resize':>8} {'encode':>8} {'total':>8} {'peak RSS':>9}")
+
+    results = []
+    for image_format in args.formats:
+        for width, height in RESOLUTIONS:
+            result = run_case(image_format, width, height, args.repeat)
+            results.append(result)
+            print(f"   {result['case']:<18} {result['input_kib']:>9.1f} {result['decode_ms']:>6.1f}ms "
+                  f"{result['resize_ms']:>6.1f}ms {result['encode_ms']:>6.1f}ms {result['total_ms']:>6.1f}ms "
+                  f"{result['peak_rss_mib']:>+6.1f}MiB")
+
+    print("-" * 78)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({result["case"]: result for result in results}, f, indent=2)
+        print(f"✅ Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"   No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    found = regressions(results, baseline, args.threshold)
+    for case, metric, before, after in found:
+        print(f"   {case}: {metric} {before} -> {after} ({(after / before - 1) * 100:+.0f}%)")
+    if found:
+        print(f"❌ Image pipeline regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"✅ Within {args.threshold:.0%} of the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Worker startup benchmark
+Times `import main` (what a uvicorn worker does before serving) in fresh
+interpreters, backed by the in-memory database stand-in, and reports the
+statements executed during import and which heavy optional libraries
+(Pillow, pyarrow) were loaded
+
+The import of FastAPI itself is measured separately, since it is a fixed
+cost the app cannot reduce; `app` is the remainder. Fails with --max-app-ms
+when the app's own share exceeds the budget
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in the child interpreter; prints one JSON line
+CHILD = """
+import json, os, sys, time
+os.environ["LOG_LEVEL"] = "ERROR"
+sys.path[:0] = [{benchmarks!r}, os.path.dirname({benchmarks!r})]
+from standin_db import StandInDatabase
+database = StandInDatabase(product_count=0, query_latency={latency!r}, connect_latency={latency!r}).install()
+start = time.perf_counter()
+import fastapi, fastapi.staticfiles, fastapi.security, fastapi.responses
+framework = time.perf_counter()
+import main
+finished = time.perf_counter()
+print(json.dumps({{
+    "framework_ms": (framework - start) * 1000,
+    "app_ms": (finished - framework) * 1000,
+    "statements": database.statements,
+    "pillow_loaded": "PIL.Image" in sys.modules,
+    "pyarrow_loaded": "pyarrow" in sys.modules,
+}}))
+"""
+
+def measure(latency):
+    child = CHILD.format(benchmarks=BENCHMARKS_DIR, latency=latency)
+    output = subprocess.run([sys.executable, "-c", child], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Worker startup benchmark")
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters to time (medians are reported)")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="Simulated round trip per statement")
+    parser.add_argument("--max-app-ms", type=float, help="Fail when the app's import time exceeds this")
+    args = parser.parse_args()
+
+    runs = [measure(args.db_latency_ms / 1000) for _ in range(args.runs)]
+    framework_ms = statistics.median(run["framework_ms"] for run in runs)
+    app_ms = statistics.median(run["app_ms"] for run in runs)
+
+    print("🚀 Worker Startup Benchmark")
+    print("=" * 50)
+    print(f"   FastAPI import:        {framework_ms:8.1f} ms")
+    print(f"   App import (main):     {app_ms:8.1f} ms")
+    print(f"   Total:                 {framework_ms + app_ms:8.1f} ms")
+    print(f"   DB statements:         {runs[0]['statements']:8d}")
+    print(f"   Pillow loaded:         {'yes' if runs[0]['pillow_loaded'] else 'no':>8}")
+    print(f"   pyarrow loaded:        {'yes' if runs[0]['pyarrow_loaded'] else 'no':>8}")
+
+    if args.max_app_ms is not None and app_ms > args.max_app_ms:
+        print(f"❌ App import took {app_ms:.1f} ms (budget {args.max_app_ms:.1f} ms)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the streaming static export
+Feeds synthetic product rows through generate_static_site's writer and
+reports peak traced memory, which should stay flat as the catalog grows
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from generate_static_site import write_static_products_js
+
+CATALOG_SIZES = [50_000, 500_000]
+CATEGORIES = ["t-shirts", "shirts", "hoodies", "jeans", "accessories"]
+
+def synthetic_products(count):
+    """Yield product rows shaped like the database result"""
+    now = datetime.now()
+    for i in range(count):
+        yield {
+            'id': i + 1,
+            'title': f"Benchmark Product {i}",
+            'description': "Synthetic product used for export benchmarking. " * 3,
+            'price': Decimal("19.99"),
+            'quantity': i % 50,
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'image_full_url': f"/images/original/{i}.jpg",
+            'image_main_url': f"/images/main/{i}.jpg",
+            'image_thumb_url': f"/images/thumbnails/{i}.jpg",
+            'created_at': now,
+            'updated_at': now,
+            'is_active': True
+        }
+
+def run_benchmark(count, output_dir):
+    """Export `count` products and return (seconds, peak_bytes, file_bytes)"""
+    output_path = os.path.join(output_dir, f"static_products_{count}.js")
+    
+    tracemalloc.start()
+    start = time.perf_counter()
+    written = write_static_products_js(synthetic_products(count), output_path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    assert written == count, f"Expected {count} products, wrote {written}"
+    file_size = os.path.getsize(output_path)
+    os.remove(output_path)
+    return elapsed, peak, file_size
+
+def main():
+    """Main function"""
+    print("📊 Static Export Memory Benchmark")
+    print("=" * 50)
+    
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for count in CATALOG_SIZES:
+            elapsed, peak, file_size = run_benchmark(count, output_dir)
+            results.append((count, peak))
+            print(f"   {count:>9,} products: {elapsed:6.2f}s, "
+                  f"peak {peak / 1024:8.1f} KiB, output {file_size / 1024 / 1024:7.1f} MiB")
+    
+    # Peak memory must not scale with the number of products
+    smallest_peak = results[0][1]
+    largest_peak = results[-1][1]
+    ratio = largest_peak / smallest_peak if smallest_peak else 1.0
+    print("-" * 50)
+    print(f"   Peak memory ratio ({results[-1][0]:,} vs {results[0][0]:,}): {ratio:.2f}x")
+    
+    if ratio > 1.5:
+        print("❌ Peak memory grows with catalog size")
+        sys.exit(1)
+    print("✅ Export memory is bounded")
+
+if __name__ == "__main__":
+    main()
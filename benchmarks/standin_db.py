@@ -0,0 +1,197 @@
+"""
+In-memory database stand-in for in-process benchmarks
+Replaces pymysql.connect with connections that answer the statements used
+by the catalog, product admin and checkout paths from Python dicts, after
+a simulated network round trip. Other statements (schema bootstrap,
+analytics, ...) succeed with an empty result
+
+Transactions are not isolated and rollbacks are not undone; benchmark
+fixtures are stocked so that checkouts never fail
+"""
+
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pymysql
+
+import query_log
+
+CATEGORIES = ["t-shirts", "shirts", "hoodies", "jeans", "accessories"]
+
+def synthetic_product(product_id: int, created_at: datetime, quantity: int) -> dict:
+    """Product row shaped like the products table"""
+    return {
+        'id': product_id,
+        'title': f"Benchmark Product {product_id}",
+        'description': "Synthetic product used for API benchmarking. " * 3,
+        'price': Decimal(f"{10 + product_id % 90}.99"),
+        'quantity': quantity,
+        'category': CATEGORIES[product_id % len(CATEGORIES)],
+        'image_full_url': f"/images/original/{product_id}.jpg",
+        'image_main_url': f"/images/main/{product_id}.jpg",
+        'image_thumb_url': f"/images/thumbnails/{product_id}.jpg",
+        'created_at': created_at,
+        'updated_at': None,
+        'is_active': True
+    }
+
+class StandInDatabase:
+    """Shared state behind every stand-in connection"""
+
+    def __init__(self, product_count: int = 500, quantity: int = 10_000_000,
+                 query_latency: float = 0.0002, connect_latency: float = 0.0005):
+        self.query_latency = query_latency
+        self.connect_latency = connect_latency
+        self.lock = threading.Lock()
+        start = datetime(2025, 1, 1)
+        self.products = {
+            product_id: synthetic_product(product_id, start + timedelta(minutes=product_id), quantity)
+            for product_id in range(1, product_count + 1)
+        }
+        self.next_product_id = product_count + 1
+        self.version = 0
+        self.order_ids = itertools.count(1)
+        self.statements = 0
+
+    def install(self):
+        """Route pymysql.connect (used by main and the helper modules) to this stand-in"""
+        pymysql.connect = self.connect
+        return self
+
+    def connect(self, **kwargs):
+        time.sleep(self.connect_latency)
+        return StandInConnection(self)
+
+    # Statement handlers: (normalized SQL, params) -> (rows, rowcount, lastrowid)
+
+    def execute(self, sql: str, params):
+        params = list(params or ())
+        with self.lock:
+            self.statements += 1
+            if sql.startswith("SELECT id, title, description") and sql.endswith("ORDER BY created_at DESC"):
+                rows = sorted((dict(p) for p in self.products.values() if p['is_active']),
+                              key=lambda p: p['created_at'], reverse=True)
+                return rows, len(rows), None
+            if sql.startswith("SELECT id, title, description") and "WHERE id = %s" in sql:
+                product = self.products.get(params[0])
+                rows = [dict(product)] if product and product['is_active'] else []
+                return rows, len(rows), None
+            if sql.startswith("SELECT COALESCE(MAX(version), 0) AS version FROM catalog_changes"):
+                return [{'version': self.version}], 1, None
+            if sql.startswith("UPDATE catalog_version SET version = LAST_INSERT_ID(version + %s)"):
+                self.version += params[0]
+                return [], 1, self.version
+            if sql.startswith("INSERT INTO catalog_changes"):
+                return [], len(params) // 3, None
+            if sql.startswith("SELECT id FROM products WHERE id >= %s ORDER BY id LIMIT %s"):
+                rows = [{'id': product_id} for product_id in sorted(self.products) if product_id >= params[0]]
+                return rows[:params[1]], len(rows[:params[1]]), None
+            if sql.startswith("INSERT INTO products"):
+                return self._insert_product(sql, params)
+            if sql.startswith("UPDATE products SET quantity = quantity - (CASE id"):
+                return self._decrement_stock(params)
+            if sql.startswith("UPDATE products SET") and sql.endswith("WHERE id = %s"):
+                return self._update_product(sql, params)
+            if sql.startswith("SELECT id, price, quantity FROM products WHERE id IN") or \
+                    sql.startswith("SELECT id, quantity FROM products WHERE id IN"):
+                rows = [{'id': p['id'], 'price': p['price'], 'quantity': p['quantity']}
+                        for p in map(self.products.get, params) if p]
+                return rows, len(rows), None
+            if sql.startswith("INSERT INTO orders "):
+                return [], 1, next(self.order_ids)
+            if sql.startswith("INSERT INTO order_items"):
+                return [], len(params) // 4, None
+        return [], 0, None
+
+    def _insert_product(self, sql, params):
+        columns = [c.strip() for c in sql[sql.index("(") + 1:sql.index(")")].split(",")]
+        product_id = self.next_product_id
+        rows = len(params) // len(columns)
+        for offset in range(rows):
+            values = dict(zip(columns, params[offset * len(columns):(offset + 1) * len(columns)]))
+            product = synthetic_product(product_id + offset, datetime.now(), 0)
+            product.update(values)
+            product['price'] = Decimal(str(product['price']))
+            self.products[product_id + offset] = product
+        self.next_product_id += rows
+        return [], rows, product_id
+
+    def _update_product(self, sql, params):
+        assignments = sql[len("UPDATE products SET "):sql.index(" WHERE")].split(", ")
+        product = self.products.get(params[-1])
+        if product is None:
+            return [], 0, None
+        for assignment, value in zip(assignments, params):
+            product[assignment.split(" = ")[0]] = value
+        product['price'] = Decimal(str(product['price']))
+        product['updated_at'] = datetime.now()
+        return [], 1, None
+
+    def _decrement_stock(self, params):
+        # Parameters: CASE pairs, ids, CASE pairs (see inventory.decrement_stock)
+        pair_count = len(params) // 5
+        quantities = dict(zip(params[0:pair_count * 2:2], params[1:pair_count * 2:2]))
+        if any(self.products.get(pid, {}).get('quantity', 0) < qty for pid, qty in quantities.items()):
+            return [], 0, None
+        for product_id, quantity in quantities.items():
+            self.products[product_id]['quantity'] -= quantity
+        return [], len(quantities), None
+
+class StandInCursor:
+    def __init__(self, database: StandInDatabase):
+        self.database = database
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = []
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        time.sleep(self.database.query_latency)
+        self._rows, self.rowcount, self.lastrowid = self.database.execute(" ".join(query.split()), args)
+        query_log.record_query(query, time.perf_counter() - start, self.rowcount)
+        return self.rowcount
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+class StandInConnection:
+    def __init__(self, database: StandInDatabase):
+        self.database = database
+        self.open = True
+
+    def cursor(self, *args):
+        return StandInCursor(self.database)
+
+    def begin(self):
+        time.sleep(self.database.query_latency)
+
+    def commit(self):
+        time.sleep(self.database.query_latency)
+
+    def rollback(self):
+        time.sleep(self.database.query_latency)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.open = False
@@ -0,0 +1,101 @@
+"""
+Streaming parsing and validation for bulk product imports
+Rows are read one at a time from CSV or JSONL uploads so large catalogs
+never have to fit in memory
+"""
+
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from typing import Iterator, Optional, Tuple
+
+# Rows inserted per transaction
+BULK_IMPORT_CHUNK_SIZE = 500
+
+SUPPORTED_FORMATS = ("csv", "jsonl")
+
+def detect_format(filename: Optional[str], requested: Optional[str] = None) -> Optional[str]:
+    """Pick the import format from an explicit value or the file extension"""
+    if requested:
+        requested = requested.lower()
+        return requested if requested in SUPPORTED_FORMATS else None
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension == "csv":
+        return "csv"
+    return None
+
+def iter_rows(fileobj, file_format: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (row_number, row, parse_error) for each record in a binary file
+
+    Row numbers are 1-based data rows (the CSV header is not counted).
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        if file_format == "csv":
+            for row_number, row in enumerate(csv.DictReader(text), start=1):
+                yield row_number, row, None
+        else:
+            row_number = 0
+            for line in text:
+                if not line.strip():
+                    continue
+                row_number += 1
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield row_number, None, f"Invalid JSON: {e.msg}"
+                    continue
+                if not isinstance(row, dict):
+                    yield row_number, None, "Each line must be a JSON object"
+                    continue
+                yield row_number, row, None
+    finally:
+        # Leave the underlying upload open for the caller to close
+        text.detach()
+
+def validate_product_row(row: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """Validate one import row; return (product_data, error)
+
+    product_data uses the products table column names plus an optional
+    `image` entry naming a file inside the images zip.
+    """
+    title = str(row.get("title") or "").strip()
+    if not title:
+        return None, "title is required"
+    if len(title) > 255:
+        return None, "title is longer than 255 characters"
+
+    category = str(row.get("category") or "").strip()
+    if not category:
+        return None, "category is required"
+    if len(category) > 100:
+        return None, "category is longer than 100 characters"
+
+    try:
+        price = Decimal(str(row.get("price")).strip())
+    except (InvalidOperation, ValueError):
+        return None, "price must be a number"
+    if not price.is_finite() or price <= 0:
+        return None, "Price must be positive"
+
+    raw_quantity = row.get("quantity")
+    try:
+        quantity = int(str(raw_quantity).strip()) if raw_quantity not in (None, "") else 0
+    except ValueError:
+        return None, "quantity must be an integer"
+    if quantity < 0:
+        return None, "Quantity cannot be negative"
+
+    image = str(row.get("image") or "").strip() or None
+
+    return {
+        "title": title,
+        "description": str(row.get("description") or ""),
+        "price": price.quantize(Decimal("0.01")),
+        "quantity": quantity,
+        "category": category,
+        "image": image
+    }, None
@@ -0,0 +1,181 @@
+"""
+In-process catalog snapshot cache
+Holds the formatted active catalog and its category statistics for one
+catalog version, and rebuilds it only when the version changes
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from metrics import record_cache
+from server_timing import span
+
+logger = logging.getLogger(__name__)
+
+# Seconds between catalog version checks (picks up writes from other workers)
+VERSION_CHECK_INTERVAL = 2.0
+
+@dataclass
+class CatalogSnapshot:
+    """Immutable view of the active catalog at a given catalog version"""
+    version: int
+    products: List[dict]  # Formatted like ProductResponse, newest first
+    categories: List[dict]  # Formatted like /categories/ entries, largest first
+    built_at: float = field(default_factory=time.time)
+    # Per-snapshot memo for derived artifacts (e.g. rendered pages)
+    derived: Dict[str, object] = field(default_factory=dict, repr=False)
+
+    @property
+    def product_count(self) -> int:
+        return len(self.products)
+
+def build_category_stats(products: List[dict]) -> List[dict]:
+    """Compute category statistics from formatted products in one pass"""
+    stats = {}
+    for product in products:
+        category = stats.get(product['category'])
+        if category is None:
+            category = stats[product['category']] = {
+                'name': product['category'],
+                'count': 0,
+                'total_products': 0,
+                'in_stock': 0,
+                'out_of_stock': 0
+            }
+        category['count'] += 1
+        category['total_products'] += 1
+        if product['quantity'] > 0:
+            category['in_stock'] += 1
+        elif product['quantity'] == 0:
+            category['out_of_stock'] += 1
+
+    return sorted(stats.values(), key=lambda cat: cat['count'], reverse=True)
+
+class CatalogCache:
+    """Serve the latest catalog snapshot, rebuilding it on version change
+
+    `loader(version)` builds a CatalogSnapshot from the database and
+    `version_loader()` returns the current catalog version. Local writes
+    call invalidate() so the next read re-checks the version right away;
+    writes from other processes are picked up within `check_interval`.
+    Checks and rebuilds run in a background thread while readers keep
+    getting the current snapshot, so once a snapshot exists a read never
+    waits on the database or a rebuild.
+
+    `warm_start()` optionally returns a previously published snapshot (or
+    None). A cold cache serves it immediately and refreshes it from the
+    database in a background thread.
+    """
+
+    def __init__(self, loader: Callable[[int], CatalogSnapshot], version_loader: Callable[[], int],
+                 check_interval: float = VERSION_CHECK_INTERVAL,
+                 warm_start: Optional[Callable[[], Optional[CatalogSnapshot]]] = None):
+        self.loader = loader
+        self.version_loader = version_loader
+        self.check_interval = check_interval
+        self.warm_start_loader = warm_start
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._warm_start_tried = False
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()  # Held while a background refresh is pending
+
+    def get(self) -> CatalogSnapshot:
+        """Return the current snapshot, refreshing it if the catalog changed"""
+        with span("cache"):
+            return self._get()
+
+    def _get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            if self._stale or time.monotonic() - self._checked_at >= self.check_interval:
+                self._start_background_refresh()
+            record_cache("catalog", True)
+            return snapshot
+
+        with self._lock:
+            # Another thread may have loaded a snapshot while we waited for the lock
+            snapshot = self._snapshot
+            if snapshot is not None:
+                record_cache("catalog", True)
+                return snapshot
+
+            if self._warm_start():
+                record_cache("catalog", True)
+                return self._snapshot
+
+            return self._refresh(None)
+
+    def _refresh(self, snapshot: Optional[CatalogSnapshot]) -> CatalogSnapshot:
+        """Re-check the version and rebuild if needed (caller holds the lock)"""
+        try:
+            self._stale = False
+            version = self.version_loader()
+            rebuild = snapshot is None or version != snapshot.version
+            record_cache("catalog", not rebuild)
+            if rebuild:
+                snapshot = self.loader(version)
+                self._snapshot = snapshot
+                logger.info("Catalog snapshot rebuilt at version %s (%s products)", version, snapshot.product_count)
+            self._checked_at = time.monotonic()
+        except Exception as e:
+            if snapshot is None:
+                self._stale = True
+                raise
+            # Keep serving the last good snapshot while the database is
+            # unavailable, retrying after the next check interval
+            self._checked_at = time.monotonic()
+            logger.warning("Serving stale catalog snapshot (version %s): %s", snapshot.version, e)
+
+        return snapshot
+
+    def _warm_start(self) -> bool:
+        """Adopt the warm-start snapshot and refresh it in the background (caller holds the lock)"""
+        if self.warm_start_loader is None or self._warm_start_tried:
+            return False
+        self._warm_start_tried = True
+        snapshot = self.warm_start_loader()
+        if snapshot is None:
+            return False
+        self._snapshot = snapshot
+        self._stale = False
+        self._checked_at = time.monotonic()
+        logger.info("Serving warm-start catalog snapshot at version %s (%s products)",
+                    snapshot.version, snapshot.product_count)
+        self._start_background_refresh()
+        return True
+
+    def _start_background_refresh(self):
+        """Re-check the version in a background thread unless one is already pending"""
+        if not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            threading.Thread(target=self._background_refresh, name="catalog-refresh", daemon=True).start()
+        except BaseException:
+            self._refreshing.release()
+            raise
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                self._refresh(self._snapshot)
+        finally:
+            self._refreshing.release()
+
+    def warm_start(self):
+        """Load the warm-start snapshot now (at boot) if the cache is still cold"""
+        with self._lock:
+            if self._snapshot is None:
+                self._warm_start()
+
+    def invalidate(self):
+        """Make the next get() start a version re-check (it still returns the current snapshot)"""
+        self._stale = True
+
+    def peek(self):
+        """Return the current snapshot without refreshing (may be None)"""
+        return self._snapshot
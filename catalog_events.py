@@ -0,0 +1,130 @@
+"""
+In-process fan-out of catalog change events for the /events/catalog SSE stream
+Admin write paths publish one event per committed change; every connected
+client has its own bounded queue and is dropped if it falls behind
+
+Events are per process: with several uvicorn workers a client only sees
+writes handled by its own worker, so /products/changes stays the source
+of truth for catching up
+"""
+
+import asyncio
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber before it is considered too slow and dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Seconds between keep-alive comments on idle streams
+HEARTBEAT_INTERVAL = 15
+
+class CatalogSubscriber:
+    """A single connected client's bounded event queue"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue_size: int):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = False
+
+    def offer(self, message: str) -> bool:
+        """Enqueue a pre-formatted message; return False if the subscriber overflowed"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            # Discard the backlog and leave a single end-of-stream marker
+            self.dropped = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+class CatalogBroadcaster:
+    """Fan out catalog events to all subscribers with one dispatch per write"""
+
+    def __init__(self, max_queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.max_queue_size = max_queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> CatalogSubscriber:
+        """Register a subscriber; must be called from the event loop"""
+        subscriber = CatalogSubscriber(asyncio.get_running_loop(), self.max_queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: CatalogSubscriber):
+        """Remove a subscriber (safe to call more than once)"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event_type: str, data: dict, event_id=None):
+        """Format an event once and deliver it to every subscriber
+
+        Safe to call from the event loop or from worker threads. Never
+        blocks: subscribers whose queues are full are dropped.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+
+        message = format_sse(event_type, data, event_id)
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        for subscriber in subscribers:
+            if subscriber.loop is running_loop:
+                self._deliver(subscriber, message)
+            elif not subscriber.loop.is_closed():
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, message)
+
+    def _deliver(self, subscriber: CatalogSubscriber, message: str):
+        if subscriber.dropped:
+            return
+        if not subscriber.offer(message):
+            logger.warning("Dropping slow catalog event subscriber")
+            self.unsubscribe(subscriber)
+
+    async def stream(self, heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        """Async generator of SSE messages for one client connection"""
+        subscriber = self.subscribe()
+        try:
+            # Ask browsers to wait a few seconds before reconnecting
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if message is None:
+                    # Slow consumer: tell the client to resync via /products/changes
+                    yield format_sse("dropped", {"reason": "slow consumer"})
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+def format_sse(event_type: str, data: dict, event_id=None) -> str:
+    """Format a single server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+# Shared broadcaster used by the API process
+catalog_broadcaster = CatalogBroadcaster()
@@ -0,0 +1,237 @@
+"""
+Catalog snapshots shared between workers and kept for warm starts
+Each catalog version is built once, by whichever worker first needs it,
+and published to a memory-mapped file that every uvicorn worker reads:
+other workers map the published version instead of rebuilding it, and
+/products/ is answered straight from the mapping without copying. A
+freshly started worker maps the file to serve the catalog before (or
+without) reaching MySQL, the way static_products.js serves the offline
+frontend
+
+Only the encoded /products/ body is shared as is. The marshalled
+products and categories sections stay in the mapping as well, but
+Python objects cannot live there: a worker decodes its own copy of a
+section the first time /bootstrap (or the storefront page) needs it
+
+File layout: a fixed header, the encoded /products/ response body and the
+marshalled products and categories sections
+
+    magic "TYCS" | format | python | catalog version | body length | products length |
+    categories length | product count | built_at | crc32
+
+Builders hold an exclusive lock on "<path>.lock" while they check the
+header, build and publish, so a version is written once. Publishing
+writes a new file and renames it over the old one, which swaps the
+version atomically: mappings held by readers keep the previous version
+until they see the new version in the header and remap. On tmpfs
+(CATALOG_SNAPSHOT_PATH=/dev/shm/...) the region lives purely in shared
+memory; on disk it also survives restarts
+
+marshal is compact and fast for the plain dicts, strings and numbers of a
+formatted catalog, but its format is tied to the Python version, so
+snapshots written by another interpreter (or damaged ones) are ignored
+"""
+
+import logging
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from contextlib import contextmanager
+from functools import cached_property
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, workers may build the same version
+    fcntl = None
+
+from catalog_cache import CatalogSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Snapshot location; set CATALOG_SNAPSHOT_PATH to "" to disable sharing and warm starts
+SNAPSHOT_PATH = os.getenv('CATALOG_SNAPSHOT_PATH', 'catalog_snapshot.bin')
+
+MAGIC = b"TYCS"
+FORMAT_VERSION = 3
+PYTHON_VERSION = sys.version_info[0] << 8 | sys.version_info[1]
+
+HEADER = struct.Struct("<4sHHQQQQIdI")
+
+# CatalogSnapshot.derived key of the encoded /products/ body (bytes, or a memoryview into the mapping)
+PRODUCTS_JSON = 'products_json'
+
+class MappedCatalogSnapshot(CatalogSnapshot):
+    """Snapshot read from a mapping; products and categories are decoded on first access"""
+
+    def __init__(self, version: int, products_section, categories_section, product_count: int, built_at: float):
+        self.version = version
+        self.built_at = built_at
+        self.derived = {}
+        self._products_section = products_section
+        self._categories_section = categories_section
+        self._product_count = product_count
+
+    @cached_property
+    def products(self):
+        return marshal.loads(self._products_section)
+
+    @cached_property
+    def categories(self):
+        return marshal.loads(self._categories_section)
+
+    @property
+    def product_count(self) -> int:
+        return self._product_count
+
+def _checksum(*sections) -> int:
+    checksum = 0
+    for section in sections:
+        checksum = zlib.crc32(section, checksum)
+    return checksum
+
+def encode_snapshot(snapshot: CatalogSnapshot) -> bytes:
+    """Header, /products/ body and marshalled sections for a snapshot"""
+    body = bytes(snapshot.derived.get(PRODUCTS_JSON, b""))
+    products = marshal.dumps(snapshot.products)
+    categories = marshal.dumps(snapshot.categories)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, PYTHON_VERSION, snapshot.version, len(body), len(products),
+                         len(categories), snapshot.product_count, snapshot.built_at,
+                         _checksum(body, products, categories))
+    return header + body + products + categories
+
+def _unpack_header(buffer):
+    if len(buffer) < HEADER.size:
+        raise ValueError("truncated header")
+    magic, format_version, python_version, *fields = HEADER.unpack_from(buffer)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise ValueError("not a catalog snapshot")
+    if python_version != PYTHON_VERSION:
+        raise ValueError("written by another Python version")
+    return fields
+
+def decode_snapshot(buffer) -> CatalogSnapshot:
+    """Snapshot from a bytes-like object; raises ValueError if it is not a usable snapshot
+
+    Nothing is copied: the /products/ body is a view into `buffer`, and
+    the products and categories sections are decoded from it on first
+    access.
+    """
+    version, body_length, products_length, categories_length, product_count, built_at, checksum = \
+        _unpack_header(buffer)
+    view = memoryview(buffer)
+    offset = HEADER.size
+    sections = []
+    for length in (body_length, products_length, categories_length):
+        section = view[offset:offset + length]
+        if len(section) != length:
+            raise ValueError("truncated snapshot")
+        sections.append(section)
+        offset += length
+    body, products, categories = sections
+    if _checksum(*sections) != checksum:
+        raise ValueError("checksum mismatch")
+    snapshot = MappedCatalogSnapshot(version, products, categories, product_count, built_at)
+    if body_length:
+        snapshot.derived[PRODUCTS_JSON] = body
+    return snapshot
+
+def write_snapshot(snapshot: CatalogSnapshot, path: str = None):
+    """Replace the snapshot file with `snapshot`"""
+    path = path or SNAPSHOT_PATH
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".catalog_snapshot.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(encode_snapshot(snapshot))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def read_snapshot(path: str = None) -> Optional[CatalogSnapshot]:
+    """Memory-map and decode the snapshot file (None if missing or unusable)
+
+    The mapping stays open for as long as the snapshot (or its /products/
+    body view) is referenced.
+    """
+    path = path or SNAPSHOT_PATH
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return decode_snapshot(mapped)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, EOFError, TypeError) as e:
+        logger.warning("Ignoring catalog snapshot %s: %s", path, e)
+        return None
+
+def read_snapshot_version(path: str = None) -> Optional[int]:
+    """Catalog version in the snapshot header, without mapping the file (None if unusable)"""
+    try:
+        with open(path or SNAPSHOT_PATH, "rb") as f:
+            return _unpack_header(f.read(HEADER.size))[0]
+    except (OSError, ValueError):
+        return None
+
+@contextmanager
+def build_lock(path: str = None):
+    """Exclusive lock between the workers sharing a snapshot file"""
+    path = path or SNAPSHOT_PATH
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def load_shared_snapshot(version: int, build: Callable[[int], CatalogSnapshot], path: str = None) -> CatalogSnapshot:
+    """Snapshot for `version`: mapped if another worker published it, else built and published
+
+    Used as CatalogCache's loader, so the database is read once per
+    catalog version however many workers there are. Only exactly
+    `version` is accepted: after a database reset or restore the version
+    goes back, and a newer-looking file belongs to the old database.
+    """
+    path = path or SNAPSHOT_PATH
+    if not path:
+        return build(version)
+
+    snapshot = _read_if_current(version, path)
+    if snapshot is not None:
+        return snapshot
+
+    with build_lock(path):
+        # Another worker may have published while we waited for the lock
+        snapshot = _read_if_current(version, path)
+        if snapshot is not None:
+            return snapshot
+        snapshot = build(version)
+        try:
+            write_snapshot(snapshot, path)
+        except OSError as e:
+            logger.warning("Could not write catalog snapshot %s: %s", path, e)
+        return snapshot
+
+def _read_if_current(version: int, path: str) -> Optional[CatalogSnapshot]:
+    if read_snapshot_version(path) != version:
+        return None
+    snapshot = read_snapshot(path)
+    if snapshot is None or snapshot.version != version:
+        return None
+    return snapshot
+
+def load_warm_snapshot() -> Optional[CatalogSnapshot]:
+    """CatalogCache hook: the published snapshot for a cold worker"""
+    if not SNAPSHOT_PATH:
+        return None
+    return read_snapshot()
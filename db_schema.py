@@ -22,7 +22,8 @@ DATABASE_SCHEMA = {
             "shipping_address_id", 
             "status",
             "total_amount",
-            "order_date"
+            "order_date",
+            "updated_at"
         ]
     },
     
@@ -58,6 +59,24 @@ DATABASE_SCHEMA = {
         ]
     },
     
+    "catalog_changes": {
+        "table_name": "catalog_changes",
+        "columns": [
+            "version",
+            "product_id",
+            "change_type",
+            "changed_at"
+        ]
+    },
+    
+    "catalog_version": {
+        "table_name": "catalog_version",
+        "columns": [
+            "id",
+            "version"
+        ]
+    },
+    
     "shipping_addresses": {
         "table_name": "shipping_addresses",
         "columns": [
@@ -72,6 +91,26 @@ DATABASE_SCHEMA = {
         ]
     },
     
+    "inventory_reservations": {
+        "table_name": "inventory_reservations",
+        "columns": [
+            "id",
+            "status",
+            "expires_at",
+            "order_id",
+            "created_at"
+        ]
+    },
+    
+    "inventory_reservation_items": {
+        "table_name": "inventory_reservation_items",
+        "columns": [
+            "reservation_id",
+            "product_id",
+            "quantity"
+        ]
+    },
+    
     "order_items": {
         "table_name": "order_items",
         "columns": [
@@ -81,6 +120,86 @@ DATABASE_SCHEMA = {
             "quantity",
             "price"
         ]
+    },
+    
+    "sales_daily": {
+        "table_name": "sales_daily",
+        "columns": [
+            "day",
+            "revenue",
+            "units",
+            "order_count"
+        ]
+    },
+    
+    "sales_daily_category": {
+        "table_name": "sales_daily_category",
+        "columns": [
+            "day",
+            "category",
+            "revenue",
+            "units",
+            "order_count"
+        ]
+    },
+    
+    "sales_daily_product": {
+        "table_name": "sales_daily_product",
+        "columns": [
+            "day",
+            "product_id",
+            "revenue",
+            "units",
+            "order_count"
+        ]
+    },
+    
+    "analytics_rollup_state": {
+        "table_name": "analytics_rollup_state",
+        "columns": [
+            "name",
+            "last_order_id",
+            "seen_order_id",
+            "changes_checked_at",
+            "changes_seen_at",
+            "updated_at"
+        ]
+    },
+    
+    "order_idempotency_keys": {
+        "table_name": "order_idempotency_keys",
+        "columns": [
+            "idempotency_key",
+            "request_hash",
+            "order_id",
+            "response",
+            "created_at"
+        ]
+    },
+    
+    "reconciliation_issues": {
+        "table_name": "reconciliation_issues",
+        "columns": [
+            "id",
+            "order_id",
+            "payment_id",
+            "issue_type",
+            "expected_amount",
+            "actual_amount",
+            "details",
+            "source",
+            "resolved",
+            "detected_at"
+        ]
+    },
+    
+    "reconciliation_state": {
+        "table_name": "reconciliation_state",
+        "columns": [
+            "name",
+            "last_order_id",
+            "updated_at"
+        ]
     }
 }
 
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Streaming exports of orders, order items and payments for finance
+Rows are read through an unbuffered server-side cursor and encoded in
+small chunks, so memory stays flat no matter how many rows are exported
+
+Used by the admin export endpoints in main.py and as a CLI:
+    python exports.py orders --from 2025-07-01 --to 2025-08-01 -o orders.csv
+    python exports.py payment_details --format parquet -o payments.parquet
+
+Parquet output needs the optional pyarrow package
+"""
+
+import argparse
+import csv
+import importlib.util
+import io
+import itertools
+import sys
+import time
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+import pymysql
+
+_arrow = None
+
+# Rows encoded per CSV chunk (one HTTP chunk / file write)
+CSV_CHUNK_ROWS = 1000
+
+# Rows per Parquet row group
+PARQUET_ROW_GROUP_ROWS = 100_000
+
+# Seconds MySQL waits on a slow reader before aborting the stream
+EXPORT_NET_WRITE_TIMEOUT = 600
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+# table -> ([(select expression, column type)], from clause, date column, primary key)
+# Column types match the MySQL schema and fix the Parquet schema up front
+EXPORTS = {
+    "orders": (
+        [("id", "int"), ("customer_id", "int"), ("shipping_address_id", "int"), ("status", "str"),
+         ("total_amount", "money"), ("order_date", "datetime")],
+        "orders",
+        "order_date",
+        "id",
+    ),
+    "order_items": (
+        [("oi.id", "int"), ("oi.order_id", "int"), ("oi.product_id", "int"), ("oi.quantity", "int"),
+         ("oi.price", "money"), ("o.order_date", "datetime")],
+        "order_items oi JOIN orders o ON o.id = oi.order_id",
+        "o.order_date",
+        "oi.id",
+    ),
+    "payment_details": (
+        [("id", "int"), ("order_id", "int"), ("payment_provider", "str"), ("payment_id", "str"),
+         ("status", "str"), ("currency", "str"), ("amount", "money"), ("payment_date", "datetime")],
+        "payment_details",
+        "payment_date",
+        "id",
+    ),
+}
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def export_columns(table: str):
+    """Output column names for an export (without table aliases)"""
+    return [expression.split(".")[-1] for expression, _ in EXPORTS[table][0]]
+
+def parquet_available() -> bool:
+    """Whether pyarrow is installed (checked without importing it)"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+def _pyarrow():
+    """Import pyarrow on first use, keeping it out of app startup; returns (pa, pq)"""
+    global _arrow
+    if _arrow is None:
+        if not parquet_available():
+            raise RuntimeError("Parquet export requires the pyarrow package")
+        import pyarrow
+        import pyarrow.parquet
+        _arrow = (pyarrow, pyarrow.parquet)
+    return _arrow
+
+def parquet_schema(table: str):
+    """Arrow schema for an export (requires pyarrow)"""
+    pa, _ = _pyarrow()
+    arrow_types = {
+        "int": pa.int64(),
+        "str": pa.string(),
+        "money": pa.decimal128(10, 2),  # DECIMAL(10, 2) columns
+        "datetime": pa.timestamp("s"),
+    }
+    return pa.schema([
+        (name, arrow_types[column_type])
+        for name, (_, column_type) in zip(export_columns(table), EXPORTS[table][0])
+    ])
+
+def build_export_query(table: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    """Return (sql, params) selecting an export in primary key order
+
+    `date_from` is inclusive and `date_to` exclusive.
+    """
+    columns, from_clause, date_column, primary_key = EXPORTS[table]
+    select_list = [expression for expression, _ in columns]
+    conditions = []
+    params = []
+    if date_from is not None:
+        conditions.append(f"{date_column} >= %s")
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append(f"{date_column} < %s")
+        params.append(date_to)
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT {', '.join(select_list)} FROM {from_clause}{where_clause} ORDER BY {primary_key}", params
+
+def iter_export_rows(db_config: dict, table: str, date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None) -> Iterator[tuple]:
+    """Stream export rows as tuples from an unbuffered server-side cursor
+
+    Opens its own connection, which stays busy until the generator is
+    exhausted or closed. Closing early (e.g. a client disconnect) drops
+    the connection rather than draining the remaining rows.
+    """
+    query, params = build_export_query(table, date_from, date_to)
+    connection = pymysql.connect(**{**db_config, "cursorclass": pymysql.cursors.SSCursor})
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET SESSION net_write_timeout = %s", (EXPORT_NET_WRITE_TIMEOUT,))
+        cursor.execute(query, params)
+        for row in cursor:
+            yield row
+    finally:
+        if connection.open:
+            connection.close()
+
+def iter_csv_chunks(rows: Iterable[tuple], columns, chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[bytes]:
+    """Encode rows as CSV (header first), yielding about `chunk_rows` rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        writer.writerows(chunk)
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+        if len(chunk) < chunk_rows:
+            return
+        buffer.seek(0)
+        buffer.truncate()
+
+class _ChunkSink:
+    """Write-only file object that hands Parquet output back in chunks"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def iter_parquet_chunks(rows: Iterable[tuple], schema,
+                        row_group_rows: int = PARQUET_ROW_GROUP_ROWS) -> Iterator[bytes]:
+    """Encode rows as Parquet, yielding each row group as it is written
+
+    Requires pyarrow.
+    """
+    pa, pq = _pyarrow()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    batch = []
+
+    def write_batch():
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array([row[i] for row in batch], type=field.type) for i, field in enumerate(schema)],
+            schema=schema
+        ))
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= row_group_rows:
+            write_batch()
+            yield sink.drain()
+    if batch:
+        write_batch()
+    writer.close()
+    yield sink.drain()
+
+def iter_export_chunks(rows: Iterable[tuple], table: str, export_format: str) -> Iterator[bytes]:
+    """Encode an export's rows in the requested format"""
+    if export_format == "parquet":
+        return iter_parquet_chunks(rows, parquet_schema(table))
+    return iter_csv_chunks(rows, export_columns(table))
+
+def parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Export orders, order items or payments")
+    parser.add_argument("table", choices=sorted(EXPORTS), help="Table to export")
+    parser.add_argument("--from", dest="date_from", type=parse_date, help="Start date/time (inclusive)")
+    parser.add_argument("--to", dest="date_to", type=parse_date, help="End date/time (exclusive)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="Output format")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout for CSV)")
+    args = parser.parse_args()
+
+    if args.format == "parquet" and not args.output:
+        parser.error("--output is required for parquet exports")
+
+    from generate_static_site import DB_CONFIG
+
+    start = time.perf_counter()
+    row_count = 0
+
+    def counted(rows):
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
+
+    rows = counted(iter_export_rows(DB_CONFIG, args.table, args.date_from, args.date_to))
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in iter_export_chunks(rows, args.table, args.format):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Exported {row_count} {args.table} rows in {elapsed:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -25,11 +25,15 @@ DB_CONFIG = {
     'cursorclass': pymysql.cursors.DictCursor
 }
 
-def get_products_from_database():
-    """Fetch all products from database"""
+def iter_products_from_database():
+    """Stream active products from the database one row at a time
+
+    Uses an unbuffered server-side cursor so the full catalog is never
+    held in memory on the client side.
+    """
+    connection = pymysql.connect(**DB_CONFIG)
     try:
-        connection = pymysql.connect(**DB_CONFIG)
-        with connection.cursor() as cursor:
+        with connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
             cursor.execute("""
                 SELECT id, title, description, price, quantity, category, 
                        image_full_url, image_main_url, image_thumb_url, 
@@ -38,68 +42,91 @@ def get_products_from_database():
                 WHERE is_active = TRUE 
                 ORDER BY created_at DESC
             """)
-            products = cursor.fetchall()
-        connection.close()
-        return products
-    except Exception as e:
-        print(f"Error fetching products: {e}")
-        return []
+            for product in cursor:
+                yield product
+    finally:
+        if connection.open:
+            connection.close()
 
-def generate_static_products_js():
-    """Generate JavaScript file with products data"""
-    products = get_products_from_database()
-    
-    # Format products for JavaScript
-    js_products = []
-    for product in products:
-        js_product = {
-            'id': product['id'],
-            'title': product['title'],
-            'description': product['description'],
-            'price': float(product['price']),
-            'quantity': product['quantity'],
-            'category': product['category'],
-            'image_url': product.get('image_main_url', ''),
-            'images': {
-                'thumbnail': product.get('image_thumb_url', ''),
-                'main': product.get('image_main_url', ''),
-                'original': product.get('image_full_url', '')
-            },
-            'created_at': product['created_at'].isoformat() if product.get('created_at') else '',
-            'updated_at': product['updated_at'].isoformat() if product.get('updated_at') else None,
-            'is_active': product.get('is_active', True)
-        }
-        js_products.append(js_product)
+def format_product_for_js(product):
+    """Transform a database row into the frontend product format"""
+    return {
+        'id': product['id'],
+        'title': product['title'],
+        'description': product['description'],
+        'price': float(product['price']),
+        'quantity': product['quantity'],
+        'category': product['category'],
+        'image_url': product.get('image_main_url', ''),
+        'images': {
+            'thumbnail': product.get('image_thumb_url', ''),
+            'main': product.get('image_main_url', ''),
+            'original': product.get('image_full_url', '')
+        },
+        'created_at': product['created_at'].isoformat() if product.get('created_at') else '',
+        'updated_at': product['updated_at'].isoformat() if product.get('updated_at') else None,
+        'is_active': product.get('is_active', True)
+    }
+
+def write_static_products_js(products, output_path='static_products.js'):
+    """Write products to a JavaScript data file incrementally
+
+    Products are consumed from any iterable and serialized one at a time
+    into a temporary file, which is atomically renamed over the output
+    when complete. Memory use is independent of catalog size. Returns
+    the number of products written.
+    """
+    temp_path = f"{output_path}.tmp"
+    categories = {}
+    count = 0
     
-    # Create JavaScript file with products data
-    js_content = f"""
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(f"""
 // Auto-generated products data - {datetime.now().isoformat()}
 // Generated by generate_static_site.py
 
-window.STATIC_PRODUCTS = {json.dumps(js_products, indent=2)};
+window.STATIC_PRODUCTS = [""")
+            
+            for product in products:
+                js_product = format_product_for_js(product)
+                f.write(",\n  " if count else "\n  ")
+                f.write(json.dumps(js_product, indent=2).replace("\n", "\n  "))
+                count += 1
+                
+                # Accumulate category counts while streaming
+                category = js_product['category']
+                if category not in categories:
+                    categories[category] = {'name': category, 'count': 0}
+                categories[category]['count'] += 1
+            
+            f.write("\n];" if count else "];")
+            f.write(f"""
 
 // Categories data
-window.STATIC_CATEGORIES = {json.dumps(get_categories_data(js_products), indent=2)};
+window.STATIC_CATEGORIES = {json.dumps(list(categories.values()), indent=2)};
 
 console.log('Loaded {{}} products from static data'.replace('{{}}', window.STATIC_PRODUCTS.length));
-"""
-    
-    with open('static_products.js', 'w', encoding='utf-8') as f:
-        f.write(js_content)
+""")
+        
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
     
-    print(f"✅ Generated static_products.js with {len(js_products)} products")
-    return len(js_products)
+    return count
 
-def get_categories_data(products):
-    """Generate categories data from products"""
-    categories = {}
-    for product in products:
-        category = product['category']
-        if category not in categories:
-            categories[category] = {'name': category, 'count': 0}
-        categories[category]['count'] += 1
+def generate_static_products_js():
+    """Generate JavaScript file with products data"""
+    try:
+        product_count = write_static_products_js(iter_products_from_database())
+    except Exception as e:
+        # The previous static_products.js is left untouched on failure
+        print(f"Error fetching products: {e}")
+        return 0
     
-    return list(categories.values())
+    print(f"✅ Generated static_products.js with {product_count} products")
+    return product_count
 
 def update_index_html():
     """Update index.html to use static data when server is not available"""
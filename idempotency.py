@@ -0,0 +1,106 @@
+"""
+Idempotency keys for order submission
+Maps a client-supplied Idempotency-Key to the response of the order it
+created, so a retried checkout returns the stored result without touching
+orders or inventory
+
+The key row is inserted at the start of the checkout transaction, so a
+concurrent duplicate blocks on the unique key until the first attempt
+commits (then replays its result) or rolls back (then runs normally).
+The SQL helpers take an open cursor and must run inside a transaction
+(see main.db_transaction)
+"""
+
+import hashlib
+import json
+from typing import Optional
+
+import pymysql
+
+from lru import LRUCache
+
+# Longest accepted Idempotency-Key header
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+
+# Completed keys kept in memory per worker
+IDEMPOTENCY_CACHE_SIZE = 10000
+
+# Keys older than this are purged from the database
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# Expired keys deleted per purge statement
+PURGE_BATCH_SIZE = 1000
+
+class IdempotencyConflict(Exception):
+    """Raised when a key is reused with a different request body"""
+
+class IdempotentReplay(Exception):
+    """Raised inside a transaction when the key already has a result; triggers rollback"""
+
+def request_fingerprint(payload: dict) -> str:
+    """Stable hash of a request body, used to detect key reuse"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def claim_key(cursor, key: str, fingerprint: str) -> bool:
+    """Insert the key row; returns False if the key was already used
+
+    Blocks while another transaction holds an uncommitted claim on the key.
+    """
+    try:
+        cursor.execute(
+            "INSERT INTO order_idempotency_keys (idempotency_key, request_hash) VALUES (%s, %s)",
+            (key, fingerprint)
+        )
+    except pymysql.err.IntegrityError:
+        return False
+    return True
+
+def store_result(cursor, key: str, order_id: int, response: dict):
+    """Record the response for a claimed key (commits with the order)"""
+    cursor.execute(
+        "UPDATE order_idempotency_keys SET order_id = %s, response = %s WHERE idempotency_key = %s",
+        (order_id, json.dumps(response), key)
+    )
+
+def load_result(cursor, key: str) -> Optional[dict]:
+    """Return {'request_hash', 'response'} for a completed key, or None"""
+    cursor.execute(
+        "SELECT request_hash, response FROM order_idempotency_keys WHERE idempotency_key = %s AND response IS NOT NULL",
+        (key,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {"request_hash": row['request_hash'], "response": json.loads(row['response'])}
+
+def purge_expired_keys(cursor, ttl_hours: int = IDEMPOTENCY_KEY_TTL_HOURS, limit: int = PURGE_BATCH_SIZE) -> int:
+    """Delete up to `limit` keys older than `ttl_hours`; returns the number deleted"""
+    cursor.execute("""
+        DELETE FROM order_idempotency_keys
+        WHERE created_at < NOW() - INTERVAL %s HOUR
+        LIMIT %s
+    """, (ttl_hours, limit))
+    return cursor.rowcount
+
+class IdempotencyStore:
+    """In-memory front for completed keys
+
+    Entries are only added once the order has committed, so a hit can be
+    replayed without the database. Misses fall through to load_result().
+    """
+
+    def __init__(self, maxsize: int = IDEMPOTENCY_CACHE_SIZE):
+        self._cache = LRUCache(maxsize, name="idempotency")
+
+    def get(self, key: str, fingerprint: str) -> Optional[dict]:
+        """Return the stored response, or None; raises IdempotencyConflict on reuse"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry["request_hash"] != fingerprint:
+            raise IdempotencyConflict()
+        return entry["response"]
+
+    def put(self, key: str, fingerprint: str, response: dict):
+        self._cache.set(key, {"request_hash": fingerprint, "response": response})
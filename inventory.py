@@ -0,0 +1,265 @@
+"""
+Inventory reservation subsystem
+Atomic conditional stock decrements, TTL-based reservations and an
+optional in-memory sharded counter front for the hottest products
+
+The SQL helpers take an open cursor and must run inside a transaction
+(see main.db_transaction); on a failed decrement the transaction is rolled
+back, so partial decrements are never committed
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Default lifetime of an unconfirmed reservation
+RESERVATION_TTL_SECONDS = 600
+
+# Expired reservations released per sweep
+RELEASE_BATCH_SIZE = 500
+
+def _case_by_id(quantities: Dict[int, int]):
+    """Build `CASE id WHEN .. THEN .. END` plus ordered ids and parameters"""
+    product_ids = sorted(quantities)
+    case_sql = "CASE id " + " ".join(["WHEN %s THEN %s"] * len(product_ids)) + " END"
+    case_params = []
+    for product_id in product_ids:
+        case_params.extend((product_id, quantities[product_id]))
+    return case_sql, case_params, product_ids
+
+class InsufficientStock(Exception):
+    """Raised inside a transaction when stock could not be taken; triggers rollback"""
+
+def decrement_stock(cursor, quantities: Dict[int, int]) -> bool:
+    """Atomically take stock for every product
+
+    A single conditional UPDATE decrements each product only where
+    `quantity >= n`. Rows are locked in primary key order, so concurrent
+    checkouts always acquire locks in the same order and cannot deadlock
+    on each other. Returns False if any product was short; the caller
+    must then roll back, since the other rows were already decremented.
+    """
+    if not quantities:
+        return True
+
+    case_sql, case_params, product_ids = _case_by_id(quantities)
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    cursor.execute(f"""
+        UPDATE products
+        SET quantity = quantity - ({case_sql})
+        WHERE id IN ({placeholders}) AND is_active = TRUE AND quantity >= ({case_sql})
+    """, case_params + product_ids + case_params)
+    return cursor.rowcount == len(product_ids)
+
+def find_unavailable(cursor, quantities: Dict[int, int]) -> List[int]:
+    """List products that cannot currently supply the requested quantity
+
+    Only used to explain a failed decrement after rolling back.
+    """
+    product_ids = sorted(quantities)
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    cursor.execute(f"""
+        SELECT id, quantity FROM products WHERE id IN ({placeholders}) AND is_active = TRUE
+    """, product_ids)
+    available = {row['id']: row['quantity'] for row in cursor.fetchall()}
+    return [product_id for product_id in product_ids if available.get(product_id, 0) < quantities[product_id]]
+
+def restore_stock(cursor, quantities: Dict[int, int]):
+    """Return previously taken stock to products"""
+    if not quantities:
+        return
+    case_sql, case_params, product_ids = _case_by_id(quantities)
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    cursor.execute(f"""
+        UPDATE products SET quantity = quantity + ({case_sql}) WHERE id IN ({placeholders})
+    """, case_params + product_ids)
+
+def create_reservation(cursor, quantities: Dict[int, int], ttl_seconds: int = RESERVATION_TTL_SECONDS):
+    """Take stock and record a held reservation that expires after `ttl_seconds`
+
+    Returns (reservation_id, expires_at); raises InsufficientStock if any
+    product is short.
+    """
+    if not decrement_stock(cursor, quantities):
+        raise InsufficientStock()
+
+    # Expiry is computed by the database so it compares consistently with NOW()
+    cursor.execute(
+        "INSERT INTO inventory_reservations (status, expires_at) VALUES ('held', NOW() + INTERVAL %s SECOND)",
+        (ttl_seconds,)
+    )
+    expires_at = datetime.now().replace(microsecond=0) + timedelta(seconds=ttl_seconds)
+    reservation_id = cursor.lastrowid
+
+    product_ids = sorted(quantities)
+    item_placeholders = ", ".join(["(%s, %s, %s)"] * len(product_ids))
+    item_values = []
+    for product_id in product_ids:
+        item_values.extend((reservation_id, product_id, quantities[product_id]))
+    cursor.execute(
+        f"INSERT INTO inventory_reservation_items (reservation_id, product_id, quantity) VALUES {item_placeholders}",
+        item_values
+    )
+    return reservation_id, expires_at
+
+def lock_reservation(cursor, reservation_id: int) -> Optional[Dict[int, int]]:
+    """Lock a held, unexpired reservation and return its item quantities
+
+    Returns None if the reservation does not exist, has expired or was
+    already committed or released.
+    """
+    cursor.execute("""
+        SELECT id FROM inventory_reservations
+        WHERE id = %s AND status = 'held' AND expires_at > NOW()
+        FOR UPDATE
+    """, (reservation_id,))
+    if not cursor.fetchone():
+        return None
+
+    cursor.execute(
+        "SELECT product_id, quantity FROM inventory_reservation_items WHERE reservation_id = %s",
+        (reservation_id,)
+    )
+    return {row['product_id']: row['quantity'] for row in cursor.fetchall()}
+
+def mark_reservation_committed(cursor, reservation_id: int, order_id: int):
+    """Record that a locked reservation was turned into `order_id`
+
+    The stock was already taken when reserving, so only the status changes.
+    """
+    cursor.execute(
+        "UPDATE inventory_reservations SET status = 'committed', order_id = %s WHERE id = %s",
+        (order_id, reservation_id)
+    )
+
+def release_reservation(cursor, reservation_id: int) -> Optional[Dict[int, int]]:
+    """Cancel a held reservation and return its stock
+
+    Returns the released quantities, or None if it was not held.
+    """
+    quantities = lock_reservation(cursor, reservation_id)
+    if quantities is None:
+        return None
+    restore_stock(cursor, quantities)
+    cursor.execute(
+        "UPDATE inventory_reservations SET status = 'released' WHERE id = %s",
+        (reservation_id,)
+    )
+    return quantities
+
+def release_expired_reservations(cursor, limit: int = RELEASE_BATCH_SIZE) -> Dict[int, int]:
+    """Release up to `limit` expired reservations and restore their stock
+
+    Uses SKIP LOCKED so several workers can sweep concurrently without
+    blocking on each other or on in-flight checkouts. Returns the
+    restored quantity per product.
+    """
+    cursor.execute("""
+        SELECT id FROM inventory_reservations
+        WHERE status = 'held' AND expires_at <= NOW()
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """, (limit,))
+    reservation_ids = [row['id'] for row in cursor.fetchall()]
+    if not reservation_ids:
+        return {}
+
+    placeholders = ", ".join(["%s"] * len(reservation_ids))
+    cursor.execute(f"""
+        SELECT product_id, SUM(quantity) AS quantity
+        FROM inventory_reservation_items
+        WHERE reservation_id IN ({placeholders})
+        GROUP BY product_id
+    """, reservation_ids)
+    quantities = {row['product_id']: int(row['quantity']) for row in cursor.fetchall()}
+
+    restore_stock(cursor, quantities)
+    cursor.execute(
+        f"UPDATE inventory_reservations SET status = 'released' WHERE id IN ({placeholders})",
+        reservation_ids
+    )
+    return quantities
+
+class HotStockFront:
+    """In-memory sharded stock counters for the hottest products
+
+    Acts as an admission filter in front of the database: a checkout that
+    cannot take stock from any shard is rejected without touching MySQL.
+    The database's conditional UPDATE stays authoritative, so a stale
+    counter can only cause an early rejection, never an oversell, and
+    counters older than `refresh_interval` are ignored until the next
+    database result refreshes them.
+    """
+
+    def __init__(self, product_ids=(), shards: int = 8, refresh_interval: float = 1.0):
+        self.product_ids = set(product_ids)
+        self.shard_count = shards
+        self.refresh_interval = refresh_interval
+        self._counters = {}  # product_id -> (loaded_at, [shard counts], [shard locks])
+
+    def is_hot(self, product_id: int) -> bool:
+        return product_id in self.product_ids
+
+    def set_available(self, product_id: int, available: int):
+        """Reset a hot product's counter from an authoritative quantity"""
+        if product_id not in self.product_ids:
+            return
+        base, extra = divmod(max(available, 0), self.shard_count)
+        shards = [base + (1 if i < extra else 0) for i in range(self.shard_count)]
+        locks = [threading.Lock() for _ in range(self.shard_count)]
+        self._counters[product_id] = (time.monotonic(), shards, locks)
+
+    def try_take(self, product_id: int, quantity: int) -> Optional[bool]:
+        """Take `quantity` from the counter
+
+        Returns True if taken, False if the product is known to be sold
+        out, or None if the product is not tracked or its counter is stale
+        (the caller should go straight to the database).
+        """
+        entry = self._counters.get(product_id)
+        if entry is None or time.monotonic() - entry[0] > self.refresh_interval:
+            return None
+
+        _, shards, locks = entry
+        start = threading.get_ident() % self.shard_count
+        taken = []
+        remaining = quantity
+        for offset in range(self.shard_count):
+            index = (start + offset) % self.shard_count
+            with locks[index]:
+                portion = min(shards[index], remaining)
+                shards[index] -= portion
+            if portion:
+                taken.append((index, portion))
+                remaining -= portion
+            if remaining == 0:
+                return True
+
+        # Not enough across all shards: put back what we took
+        for index, portion in taken:
+            with locks[index]:
+                shards[index] += portion
+        return False
+
+    def give_back(self, product_id: int, quantity: int):
+        """Return stock taken by try_take when the database write failed"""
+        entry = self._counters.get(product_id)
+        if entry is None:
+            return
+        _, shards, locks = entry
+        index = threading.get_ident() % self.shard_count
+        with locks[index]:
+            shards[index] += quantity
+
+    def available(self, product_id: int) -> Optional[int]:
+        """Current counter total (None if not loaded)"""
+        entry = self._counters.get(product_id)
+        return sum(entry[1]) if entry else None
+
+def load_hot_product_ids():
+    """Read hot product ids from the HOT_PRODUCT_IDS env var (comma separated)"""
+    raw = os.getenv('HOT_PRODUCT_IDS', '')
+    return {int(value) for value in raw.split(',') if value.strip().isdigit()}
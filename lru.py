@@ -0,0 +1,56 @@
+"""
+Small thread-safe LRU cache
+Used for in-process lookups (e.g. email -> customer id) that are backed
+by the database and safe to evict at any time
+"""
+
+import threading
+from collections import OrderedDict
+
+from metrics import record_cache
+from server_timing import span
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, maxsize: int, name: str = None):
+        self.maxsize = maxsize
+        self.name = name  # Reported in cache hit metrics when set
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value and mark it recently used"""
+        with span("cache"), self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                value, hit = default, False
+            else:
+                value, hit = self._data[key], True
+        if self.name:
+            record_cache(self.name, hit)
+        return value
+
+    def set(self, key, value):
+        """Store a value, evicting the oldest entry when full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove and return a value (invalidation)"""
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
@@ -1,20 +1,55 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, status
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Header, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Optional, TYPE_CHECKING
 import os
 import uuid
 import json
-from datetime import datetime
-from PIL import Image
+from datetime import datetime, date, timedelta
 import shutil
 import pymysql
 from pymysql import Error
 from dotenv import load_dotenv
 import logging
 from contextlib import contextmanager
+from fastapi.responses import StreamingResponse, HTMLResponse, Response, FileResponse
+from fastapi import Request
+from catalog_events import catalog_broadcaster
+from catalog_cache import CatalogCache, CatalogSnapshot, build_category_stats
+import catalog_snapshot
+from contextlib import asynccontextmanager
+import asyncio
+import threading
+import inventory
+import analytics
+from inventory import HotStockFront, InsufficientStock, load_hot_product_ids
+import io
+import csv
+import base64
+import binascii
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from lru import LRUCache
+import itertools
+import exports
+import reconciliation
+import migrations
+from reconciliation import ReconciliationBusy, SettlementFileError
+import idempotency
+from idempotency import IdempotencyConflict, IdempotentReplay, IdempotencyStore
+import metrics
+from metrics import MetricsMiddleware, DB_CONNECT_SECONDS, IMAGE_PROCESSING_SECONDS, record_cache
+from query_log import InstrumentedDictCursor, QueryLogMiddleware
+import profiler
+from profiler import ProfilerBusy, RequestProfilerMiddleware
+from structured_logging import RequestIdMiddleware, setup_logging
+from server_timing import SERVER_TIMING_ENABLED, ServerTimingMiddleware, span
+from bulk_import import BULK_IMPORT_CHUNK_SIZE, detect_format, iter_rows, validate_product_row
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 # Load environment variables from .env file
 load_dotenv()
@@ -28,14 +63,46 @@ DB_CONFIG = {
     'database': os.getenv('database_name'),
     'charset': 'utf8mb4',
     'autocommit': True,
-    'cursorclass': pymysql.cursors.DictCursor
+    'cursorclass': InstrumentedDictCursor
 }
 
+# Seconds between sweeps that release expired inventory reservations
+RESERVATION_SWEEP_INTERVAL = 30
+
+# Seconds between incremental sales analytics roll-ups
+ANALYTICS_ROLLUP_INTERVAL = 60
+
+# Seconds between purges of expired idempotency keys
+IDEMPOTENCY_PURGE_INTERVAL = 3600
+
+# Seconds between catalog version bumps for stock changes (checkouts, reservations)
+STOCK_VERSION_INTERVAL = 1.0
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run background maintenance tasks for the lifetime of the server"""
+    create_image_directories()
+    # Boot does not wait for MySQL: the catalog comes from the warm-start snapshot
+    await asyncio.to_thread(catalog_cache.warm_start)
+    schema_check = asyncio.create_task(asyncio.to_thread(check_schema_version))
+    sweeper = asyncio.create_task(sweep_expired_reservations())
+    rollup = asyncio.create_task(roll_up_sales_analytics())
+    key_purger = asyncio.create_task(purge_idempotency_keys())
+    stock_versions = asyncio.create_task(publish_stock_versions())
+    try:
+        yield
+    finally:
+        stock_versions.cancel()
+        sweeper.cancel()
+        rollup.cancel()
+        key_purger.cancel()
+        schema_check.cancel()
+
 # Initialize FastAPI app
-app = FastAPI(title="Trendyoft E-commerce Backend", version="1.0.0")
+app = FastAPI(title="Trendyoft E-commerce Backend", version="1.0.0", lifespan=lifespan)
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging (JSON records written by a background thread, see structured_logging.py)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Database connection management
@@ -44,160 +111,58 @@ def get_db_connection():
     """Context manager for database connections"""
     connection = None
     try:
-        connection = pymysql.connect(**DB_CONFIG)
-        logger.info("Database connection established")
+        with DB_CONNECT_SECONDS.time(), span("db_connect"):
+            connection = pymysql.connect(**DB_CONFIG)
+        logger.debug("Database connection established")
         yield connection
     except Error as e:
-        logger.error(f"Database connection error: {e}")
+        logger.error("Database connection error: %s", e)
         if connection:
             connection.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     finally:
         if connection and connection.open:
             connection.close()
-            logger.info("Database connection closed")
+            logger.debug("Database connection closed")
 
-# Database initialization
-def init_database():
-    """Initialize database tables with proper schema and foreign keys"""
+@contextmanager
+def db_transaction():
+    """Context manager for an explicit transaction; yields a cursor
+
+    Commits when the block completes and rolls back on any exception,
+    including HTTPExceptions raised for validation failures.
+    """
+    with get_db_connection() as conn:
+        conn.begin()
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+# Schema changes run from the migrate command (python migrations.py migrate), not on import;
+# a worker only checks the version once, with a single query
+def check_schema_version():
+    """Warn when the database is behind the schema this code expects
+
+    With AUTO_MIGRATE=1 pending migrations are applied instead (for
+    single-instance and development deployments).
+    """
     try:
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Create customers table
-            create_customers_table = """
-            CREATE TABLE IF NOT EXISTS customers (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                first_name VARCHAR(100) NOT NULL,
-                last_name VARCHAR(100) NOT NULL,
-                phone_number VARCHAR(20) UNIQUE,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_email (email),
-                INDEX idx_phone (phone_number)
-            ) ENGINE=InnoDB;
-            """
-            
-            # Create products table
-            create_products_table = """
-            CREATE TABLE IF NOT EXISTS products (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                description TEXT,
-                price DECIMAL(10, 2) NOT NULL,
-                quantity INT NOT NULL DEFAULT 0,
-                category VARCHAR(100) NOT NULL,
-                image_full_url VARCHAR(500),
-                image_main_url VARCHAR(500),
-                image_thumb_url VARCHAR(500),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT TRUE,
-                INDEX idx_category (category),
-                INDEX idx_title (title),
-                INDEX idx_is_active (is_active)
-            ) ENGINE=InnoDB;
-            """
-            
-            # Create shipping_addresses table
-            create_shipping_addresses_table = """
-            CREATE TABLE IF NOT EXISTS shipping_addresses (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                customer_id INT NOT NULL,
-                address_line1 VARCHAR(255) NOT NULL,
-                address_line2 VARCHAR(255),
-                city VARCHAR(100) NOT NULL,
-                country VARCHAR(100) NOT NULL,
-                zip_code VARCHAR(20) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
-                INDEX idx_customer_id (customer_id)
-            ) ENGINE=InnoDB;
-            """
-            
-            # Create orders table
-            create_orders_table = """
-            CREATE TABLE IF NOT EXISTS orders (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                customer_id INT NOT NULL,
-                shipping_address_id INT NOT NULL,
-                status ENUM('pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled') DEFAULT 'pending',
-                total_amount DECIMAL(10, 2) NOT NULL,
-                order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
-                FOREIGN KEY (shipping_address_id) REFERENCES shipping_addresses(id) ON DELETE RESTRICT,
-                INDEX idx_customer_id (customer_id),
-                INDEX idx_status (status),
-                INDEX idx_order_date (order_date)
-            ) ENGINE=InnoDB;
-            """
-            
-            # Create payment_details table
-            create_payment_details_table = """
-            CREATE TABLE IF NOT EXISTS payment_details (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                order_id INT NOT NULL,
-                payment_provider VARCHAR(50) NOT NULL,
-                payment_id VARCHAR(255) NOT NULL,
-                status ENUM('pending', 'completed', 'failed', 'refunded') DEFAULT 'pending',
-                currency VARCHAR(3) DEFAULT 'USD',
-                amount DECIMAL(10, 2) NOT NULL,
-                payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
-                INDEX idx_order_id (order_id),
-                INDEX idx_payment_id (payment_id),
-                INDEX idx_status (status)
-            ) ENGINE=InnoDB;
-            """
-            
-            # Drop and recreate order_items table to fix foreign key constraint issues
-            drop_order_items_table = "DROP TABLE IF EXISTS order_items;"
-            
-            # Create order_items table (junction table for orders and products)
-            create_order_items_table = """
-            CREATE TABLE order_items (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                order_id INT NOT NULL,
-                product_id INT NOT NULL,
-                quantity INT NOT NULL,
-                price DECIMAL(10, 2) NOT NULL,
-                FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
-                FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT,
-                INDEX idx_order_id (order_id),
-                INDEX idx_product_id (product_id)
-            ) ENGINE=InnoDB;
-            """
-            
-            # Execute table creation queries in correct order for foreign keys
-            tables = [
-                ("customers", create_customers_table),
-                ("products", create_products_table),
-                ("shipping_addresses", create_shipping_addresses_table),
-                ("orders", create_orders_table),
-                ("payment_details", create_payment_details_table)
-            ]
-            
-            for table_name, query in tables:
-                cursor.execute(query)
-                logger.info(f"Table {table_name} created/verified successfully")
-            
-            # TODO: Fix order_items table foreign key constraint issue later
-            # cursor.execute(drop_order_items_table)
-            # cursor.execute(create_order_items_table)
-            # logger.info("Table order_items created/verified successfully")
-            
-            conn.commit()
-            logger.info("Database initialization completed successfully")
-            
-    except Error as e:
-        logger.error(f"Error initializing database: {e}")
-        raise
-
-# Initialize database on startup
-try:
-    init_database()
-except Exception as e:
-    logger.error(f"Failed to initialize database: {e}")
+            if os.getenv('AUTO_MIGRATE', '').lower() in ('1', 'true', 'yes'):
+                applied = migrations.migrate(conn)
+                if applied:
+                    logger.info("Applied schema migrations %s", applied)
+                return
+            version = migrations.get_schema_version(conn.cursor())
+    except Exception as e:
+        logger.error("Schema version check failed: %s", e)
+        return
+    if version < migrations.SCHEMA_VERSION:
+        logger.warning("Database schema is at version %s, this code expects %s; run `python migrations.py migrate`",
+                       version, migrations.SCHEMA_VERSION)
 
 # CORS middleware to allow frontend access
 app.add_middleware(
@@ -208,26 +173,167 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create images directory structure if it doesn't exist
+# Per-request query log: slow-query log and N+1 warnings (see query_log.py)
+app.add_middleware(QueryLogMiddleware)
+
+# Server-Timing breakdown per request, opt-in with SERVER_TIMING=1 (see server_timing.py)
+if SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+
+# Request metrics for /metrics (outermost, so CORS handling is timed too)
+app.add_middleware(MetricsMiddleware)
+
+# With several workers, share metrics through a common directory (see metrics.py)
+if os.getenv('METRICS_DIR'):
+    metrics.default_registry.start_exporter(os.getenv('METRICS_DIR'))
+
+# Images directory structure (created at startup, see lifespan)
 IMAGES_DIR = "images"
 THUMBNAIL_DIR = os.path.join(IMAGES_DIR, "thumbnails")
 MAIN_DIR = os.path.join(IMAGES_DIR, "main")
 ORIGINAL_DIR = os.path.join(IMAGES_DIR, "original")
 
-# Create directories
-for directory in [IMAGES_DIR, THUMBNAIL_DIR, MAIN_DIR, ORIGINAL_DIR]:
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+def create_image_directories():
+    """Create the images directory structure if it doesn't exist"""
+    for directory in [IMAGES_DIR, THUMBNAIL_DIR, MAIN_DIR, ORIGINAL_DIR]:
+        os.makedirs(directory, exist_ok=True)
 
-# Mount static files for serving images
-app.mount("/images", StaticFiles(directory=IMAGES_DIR), name="images")
+# Mount static files for serving images (the directory may not exist until startup)
+app.mount("/images", StaticFiles(directory=IMAGES_DIR, check_dir=False), name="images")
 
 # Admin token for protected operations
 ADMIN_TOKEN = "danishshaikh@06"  # Change this to your actual admin token
 
+# Requests sent with `X-Profile: <admin token>` return their profile instead of the response
+app.add_middleware(RequestProfilerMiddleware, token=ADMIN_TOKEN)
+
+# Request ids for log records (outermost, so every log line of a request carries it)
+app.add_middleware(RequestIdMiddleware)
+
 # Security scheme
 security = HTTPBearer()
 
+# Catalog change log helpers
+def record_catalog_change(cursor, product_id: int, change_type: str):
+    """Append a product change to the catalog change log
+
+    Must be called inside the transaction of the product write (see
+    db_transaction) so the change is committed (or rolled back) together
+    with it. Returns the new catalog version.
+    """
+    return record_catalog_changes(cursor, [product_id], change_type)
+
+def record_catalog_changes(cursor, product_ids, change_type: str = 'upsert'):
+    """Append changes for several products with one statement
+
+    Versions come from the catalog_version counter row, whose lock is held
+    until the transaction ends, so versions commit in order and delta-sync
+    clients never skip a change that commits late. Returns the catalog
+    version of the last change recorded.
+    """
+    cursor.execute(
+        "UPDATE catalog_version SET version = LAST_INSERT_ID(version + %s) WHERE id = 1",
+        (len(product_ids),)
+    )
+    last_version = cursor.lastrowid
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(product_ids))
+    values = []
+    for version, product_id in enumerate(product_ids, last_version - len(product_ids) + 1):
+        values.extend((version, product_id, change_type))
+    cursor.execute(
+        f"INSERT INTO catalog_changes (version, product_id, change_type) VALUES {placeholders}",
+        values
+    )
+    return last_version
+
+# Products whose stock changed since the last stock version bump
+pending_stock_changes = set()
+pending_stock_lock = threading.Lock()
+
+def notify_stock_change(quantities: dict):
+    """Push quantity events after a committed stock change
+
+    Checkouts and reservations do not bump the catalog version themselves:
+    during a sale every order would otherwise rebuild (and republish) the
+    catalog snapshot. The products are queued instead, and
+    flush_stock_changes records them as one catalog change at most every
+    STOCK_VERSION_INTERVAL, so /products/, the storefront and delta sync
+    show quantities at most that far behind.
+    """
+    with pending_stock_lock:
+        pending_stock_changes.update(quantities)
+    for product_id, quantity in quantities.items():
+        hot_stock_front.set_available(product_id, quantity)
+        catalog_broadcaster.publish("product.quantity", {"id": product_id, "quantity": quantity})
+
+def flush_stock_changes():
+    """Record the queued stock changes in the catalog change log
+
+    Returns the new catalog version, or None if no stock changed. On a
+    database error the products stay queued for the next flush.
+    """
+    with pending_stock_lock:
+        product_ids = sorted(pending_stock_changes)
+        pending_stock_changes.clear()
+    if not product_ids:
+        return None
+
+    try:
+        with db_transaction() as cursor:
+            version = record_catalog_changes(cursor, product_ids)
+    except BaseException:
+        with pending_stock_lock:
+            pending_stock_changes.update(product_ids)
+        raise
+    notify_catalog_change("catalog.stock", {"count": len(product_ids)}, version)
+    return version
+
+async def publish_stock_versions():
+    """Background task: coalesce stock changes into one catalog version bump per interval"""
+    while True:
+        await asyncio.sleep(STOCK_VERSION_INTERVAL)
+        try:
+            await asyncio.to_thread(flush_stock_changes)
+        except Exception as e:
+            logger.error("Error recording stock changes: %s", e)
+
+def notify_catalog_change(event_type: str, data: dict, version: int):
+    """Invalidate the catalog snapshot and push a live event after a committed write"""
+    catalog_cache.invalidate()
+    catalog_broadcaster.publish(event_type, data, event_id=version)
+
+def get_catalog_version_from_db():
+    """Get the current catalog version (0 if nothing has changed yet)"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(version), 0) AS version FROM catalog_changes")
+        return cursor.fetchone()['version']
+
+def get_catalog_changes_from_db(since_version: int, limit: int):
+    """Fetch the latest state of every product changed after a catalog version
+
+    Returns one row per changed product, ordered by the version of its most
+    recent change, with the change version in `change_version`.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT p.id, p.title, p.description, p.price, p.quantity, p.category, 
+                   p.image_full_url, p.image_main_url, p.image_thumb_url, 
+                   p.created_at, p.updated_at, p.is_active, 
+                   c.change_version 
+            FROM (
+                SELECT product_id, MAX(version) AS change_version 
+                FROM catalog_changes 
+                WHERE version > %s 
+                GROUP BY product_id
+            ) c 
+            JOIN products p ON p.id = c.product_id 
+            ORDER BY c.change_version 
+            LIMIT %s
+        """, (since_version, limit))
+        return cursor.fetchall()
+
 # Database helper functions
 def get_products_from_db():
     """Fetch all products from database"""
@@ -258,8 +364,7 @@ def get_product_by_id(product_id: int):
 
 def insert_product_to_db(product_data):
     """Insert a new product into database"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+    with db_transaction() as cursor:
         insert_query = """
             INSERT INTO products (title, description, price, quantity, category, 
                                 image_full_url, image_main_url, image_thumb_url) 
@@ -275,38 +380,140 @@ def insert_product_to_db(product_data):
             product_data['image_main_url'],
             product_data['image_thumb_url']
         ))
-        conn.commit()
-        return cursor.lastrowid
+        product_id = cursor.lastrowid
+        version = record_catalog_change(cursor, product_id, 'upsert')
+    
+    notify_catalog_change("product.upsert", {"id": product_id, **product_data}, version)
+    return product_id
+
+def insert_products_batch_to_db(products):
+    """Insert many products in one transaction with a single multi-row INSERT
+
+    The generated ids are read back inside the transaction instead of
+    being computed as a range from lastrowid: in InnoDB's interleaved
+    auto-increment mode (innodb_autoinc_lock_mode=2, the MySQL 8 default)
+    a multi-row INSERT's ids are only consecutive while no bulk insert
+    (INSERT ... SELECT, LOAD DATA) runs on products at the same time. The
+    read-back skips such gaps and rows of uncommitted transactions; the
+    app issues no bulk inserts on products, so the ids found are this
+    batch's, in insert order. Returns (product_ids, version).
+    """
+    columns = ("title", "description", "price", "quantity", "category",
+               "image_full_url", "image_main_url", "image_thumb_url")
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(products))
+    values = []
+    for product_data in products:
+        values.extend(product_data.get(column) for column in columns)
+    
+    with db_transaction() as cursor:
+        cursor.execute(
+            f"INSERT INTO products ({', '.join(columns)}) VALUES {placeholders}",
+            values
+        )
+        cursor.execute(
+            "SELECT id FROM products WHERE id >= %s ORDER BY id LIMIT %s",
+            (cursor.lastrowid, len(products))
+        )
+        product_ids = [row['id'] for row in cursor.fetchall()]
+        version = record_catalog_changes(cursor, product_ids)
+    
+    return product_ids, version
 
 def update_product_in_db(product_id: int, product_data):
     """Update a product in database"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Build dynamic update query based on provided data
-        update_fields = []
-        values = []
-        
-        for field, value in product_data.items():
-            if value is not None:
-                update_fields.append(f"{field} = %s")
-                values.append(value)
-        
-        if update_fields:
-            values.append(product_id)
-            update_query = f"UPDATE products SET {', '.join(update_fields)} WHERE id = %s"
-            cursor.execute(update_query, values)
-            conn.commit()
-            return cursor.rowcount > 0
+    # Build dynamic update query based on provided data
+    update_fields = []
+    values = []
+    
+    for field, value in product_data.items():
+        if value is not None:
+            update_fields.append(f"{field} = %s")
+            values.append(value)
+    
+    if not update_fields:
         return False
+    
+    values.append(product_id)
+    with db_transaction() as cursor:
+        update_query = f"UPDATE products SET {', '.join(update_fields)} WHERE id = %s"
+        cursor.execute(update_query, values)
+        updated = cursor.rowcount > 0
+        if updated:
+            version = record_catalog_change(cursor, product_id, 'upsert')
+    
+    if updated:
+        changes = {field: value for field, value in product_data.items() if value is not None}
+        notify_catalog_change("product.upsert", {"id": product_id, **changes}, version)
+        if 'quantity' in changes:
+            catalog_broadcaster.publish(
+                "product.quantity", {"id": product_id, "quantity": changes['quantity']}, event_id=version
+            )
+    return updated
+
+# Rows updated per set-based UPDATE statement
+BATCH_UPDATE_CHUNK_SIZE = 1000
+
+def update_products_batch_in_db(updates: dict):
+    """Apply many product updates in one transaction with set-based statements
+
+    `updates` maps product id to a dict of changed columns. Each chunk of
+    ids is locked with one SELECT and changed with one UPDATE that uses a
+    `CASE id` expression per column, so thousands of rows need only a few
+    statements. Returns (updated_ids, not_found_ids, version).
+    """
+    updated_ids = []
+    not_found_ids = []
+    version = None
+    product_ids = sorted(updates)
+    
+    with db_transaction() as cursor:
+        for start in range(0, len(product_ids), BATCH_UPDATE_CHUNK_SIZE):
+            chunk_ids = product_ids[start:start + BATCH_UPDATE_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk_ids))
+            cursor.execute(
+                f"SELECT id FROM products WHERE id IN ({placeholders}) AND is_active = TRUE FOR UPDATE",
+                chunk_ids
+            )
+            found = {row['id'] for row in cursor.fetchall()}
+            not_found_ids.extend(product_id for product_id in chunk_ids if product_id not in found)
+            chunk_ids = [product_id for product_id in chunk_ids if product_id in found]
+            if not chunk_ids:
+                continue
+            
+            # One CASE expression per column; rows without a new value keep their own
+            assignments = []
+            values = []
+            for field in PRODUCT_PATCH_FIELDS:
+                field_ids = [product_id for product_id in chunk_ids if field in updates[product_id]]
+                if not field_ids:
+                    continue
+                assignments.append(
+                    f"{field} = CASE id " + " ".join(["WHEN %s THEN %s"] * len(field_ids)) + f" ELSE {field} END"
+                )
+                for product_id in field_ids:
+                    values.extend((product_id, updates[product_id][field]))
+            
+            placeholders = ", ".join(["%s"] * len(chunk_ids))
+            cursor.execute(
+                f"UPDATE products SET {', '.join(assignments)} WHERE id IN ({placeholders})",
+                values + chunk_ids
+            )
+            version = record_catalog_changes(cursor, chunk_ids)
+            updated_ids.extend(chunk_ids)
+    
+    return updated_ids, not_found_ids, version
 
 def delete_product_from_db(product_id: int):
     """Soft delete a product (set is_active = FALSE)"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+    with db_transaction() as cursor:
         cursor.execute("UPDATE products SET is_active = FALSE WHERE id = %s", (product_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+        deleted = cursor.rowcount > 0
+        if deleted:
+            version = record_catalog_change(cursor, product_id, 'delete')
+    
+    if deleted:
+        notify_catalog_change("product.delete", {"id": product_id}, version)
+    return deleted
 
 def get_categories_from_db():
     """Get category statistics from database"""
@@ -338,66 +545,501 @@ def get_categories_from_db():
         
         return formatted_categories
 
+# Catalog snapshot cache
+def build_catalog_snapshot(version: int) -> CatalogSnapshot:
+    """Build a JSON-ready snapshot of the active catalog"""
+    products = []
+    for product in get_products_from_db():
+        formatted_product = format_product(product)
+        formatted_product['price'] = float(formatted_product['price'])
+        formatted_product['is_active'] = bool(formatted_product['is_active'])
+        products.append(formatted_product)
+    snapshot = CatalogSnapshot(version=version, products=products, categories=build_category_stats(products))
+    with span("serialize"):
+        snapshot.derived[catalog_snapshot.PRODUCTS_JSON] = encode_products_json(products)
+    return snapshot
+
+def load_catalog_snapshot(version: int) -> CatalogSnapshot:
+    """Map the snapshot another worker published for `version`, or build and publish it"""
+    return catalog_snapshot.load_shared_snapshot(version, build_catalog_snapshot)
+
+# Workers share one published snapshot per catalog version, which also warm-starts
+# cold workers (see catalog_snapshot.py)
+catalog_cache = CatalogCache(load_catalog_snapshot, get_catalog_version_from_db,
+                             warm_start=catalog_snapshot.load_warm_snapshot)
+
+# Optional in-memory admission filter for flash-sale products (HOT_PRODUCT_IDS)
+hot_stock_front = HotStockFront(load_hot_product_ids())
+
 # Customer management functions
-def insert_customer_to_db(customer_data):
-    """Insert a new customer into database"""
+CUSTOMER_CACHE_SIZE = 10000
+
+# email (normalized) -> customer id; only existing customers are cached. Filled
+# by customer writes and read by the admin batch lookup (get_customer_ids_by_email);
+# checkout takes a customer id and does not use it
+customer_id_cache = LRUCache(CUSTOMER_CACHE_SIZE, name="customer_id")
+
+class CustomerConflict(Exception):
+    """Raised when a customer's phone number belongs to another customer"""
+
+class CustomerExists(Exception):
+    """Raised when creating a customer whose email is already registered"""
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def upsert_customer_in_db(customer_data):
+    """Create a customer or update the one with the same email
+
+    A single INSERT ... ON DUPLICATE KEY UPDATE returns the id either way
+    (LAST_INSERT_ID(id) makes lastrowid the existing row's id). Returns
+    (customer_id, created). Raises CustomerConflict if the phone number
+    is already used by a customer with a different email.
+    """
+    email = normalize_email(customer_data['email'])
+    phone_number = customer_data.get('phone_number')
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        insert_query = """
-            INSERT INTO customers (first_name, last_name, phone_number, email) 
-            VALUES (%s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (
-            customer_data['first_name'],
-            customer_data['last_name'],
-            customer_data.get('phone_number'),
-            customer_data['email']
-        ))
+        # Only touch the row if it really is this email's row; a clash on
+        # the unique phone number must not rename someone else
+        try:
+            cursor.execute("""
+                INSERT INTO customers (first_name, last_name, phone_number, email) 
+                VALUES (%s, %s, %s, %s) 
+                ON DUPLICATE KEY UPDATE 
+                    id = LAST_INSERT_ID(id), 
+                    first_name = IF(email = VALUES(email), VALUES(first_name), first_name), 
+                    last_name = IF(email = VALUES(email), VALUES(last_name), last_name), 
+                    phone_number = IF(email = VALUES(email), COALESCE(VALUES(phone_number), phone_number), phone_number)
+            """, (
+                customer_data['first_name'],
+                customer_data['last_name'],
+                phone_number,
+                email
+            ))
+        except pymysql.err.IntegrityError:
+            # Updating this email's row to the new phone number clashed with another customer
+            raise CustomerConflict()
+        customer_id = cursor.lastrowid
+        # rowcount is 1 for a new row, 2 for an update and 0 when unchanged
+        created = cursor.rowcount == 1
+        
+        if not created and phone_number:
+            # Only a phone number can make the duplicate another customer's row
+            cursor.execute("SELECT email FROM customers WHERE id = %s", (customer_id,))
+            row = cursor.fetchone()
+            if row is None or normalize_email(row['email']) != email:
+                raise CustomerConflict()
         conn.commit()
-        return cursor.lastrowid
+    
+    customer_id_cache.set(email, customer_id)
+    return customer_id, created
+
+def insert_customer_to_db(customer_data):
+    """Insert a new customer into database
 
-def get_customer_by_email(email: str):
-    """Get customer by email"""
+    Raises CustomerExists if the email is already registered and
+    CustomerConflict if the phone number is.
+    """
+    email = normalize_email(customer_data['email'])
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM customers WHERE email = %s", (email,))
-        return cursor.fetchone()
+        try:
+            cursor.execute("""
+                INSERT INTO customers (first_name, last_name, phone_number, email) 
+                VALUES (%s, %s, %s, %s)
+            """, (
+                customer_data['first_name'],
+                customer_data['last_name'],
+                customer_data.get('phone_number'),
+                email
+            ))
+        except pymysql.err.IntegrityError:
+            cursor.execute("SELECT 1 FROM customers WHERE email = %s", (email,))
+            if cursor.fetchone():
+                raise CustomerExists()
+            raise CustomerConflict()
+        customer_id = cursor.lastrowid
+        conn.commit()
+    
+    customer_id_cache.set(email, customer_id)
+    return customer_id
+
+def get_customer_ids_by_email(emails):
+    """Map emails to customer ids (None when unknown)
+
+    Cached emails are answered from memory; the rest are fetched with
+    one IN query and added to the cache.
+    """
+    result = {}
+    missing = []
+    for email in emails:
+        key = normalize_email(email)
+        customer_id = customer_id_cache.get(key)
+        if customer_id is None:
+            missing.append(key)
+        result[key] = customer_id
+    
+    if missing:
+        missing = sorted(set(missing))
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            placeholders = ", ".join(["%s"] * len(missing))
+            cursor.execute(
+                f"SELECT id, email FROM customers WHERE email IN ({placeholders})",
+                missing
+            )
+            for row in cursor.fetchall():
+                key = normalize_email(row['email'])
+                result[key] = row['id']
+                customer_id_cache.set(key, row['id'])
+    
+    return result
 
 # Order management functions
-def create_order_in_db(order_data):
-    """Create a new order with order items"""
+def merge_order_items(items):
+    """Combine order lines for the same product, keeping first-seen order"""
+    quantities = {}
+    for item in items:
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+    return quantities
+
+def get_product_quantities(cursor, product_ids):
+    """Fetch current price and quantity for products (inside a transaction)"""
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    cursor.execute(
+        f"SELECT id, price, quantity FROM products WHERE id IN ({placeholders})",
+        list(product_ids)
+    )
+    return {product['id']: product for product in cursor.fetchall()}
+
+def raise_insufficient_stock(quantities):
+    """Raise a 409 naming the products that are short (after rollback)"""
+    with get_db_connection() as conn:
+        unavailable = inventory.find_unavailable(conn.cursor(), quantities)
+    raise HTTPException(
+        status_code=409,
+        # Stock may have been replenished since; then all products are reported
+        detail={"message": "Insufficient stock", "product_ids": unavailable or sorted(quantities)}
+    )
+
+def take_hot_stock(quantities):
+    """Reserve hot products in memory first; reject sold-out ones without the database
+
+    Returns the quantities taken so they can be given back on failure.
+    """
+    taken = {}
+    for product_id, quantity in quantities.items():
+        result = hot_stock_front.try_take(product_id, quantity)
+        if result is False:
+            for taken_id, taken_quantity in taken.items():
+                hot_stock_front.give_back(taken_id, taken_quantity)
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Insufficient stock", "product_ids": [product_id]}
+            )
+        if result:
+            taken[product_id] = quantity
+    return taken
+
+def create_order_in_db(order_data, idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None):
+    """Create a new order with order items in a single transaction
+
+    Stock for all items is taken with one conditional UPDATE (or from a
+    held reservation when `reservation_id` is given), and order items are
+    written with one multi-row INSERT. Items are priced from the database.
+    Returns the created order with its items; raises HTTPException(409) if
+    any item is unavailable or the supplied `total_amount` does not match
+    current prices.
+    
+    With an `idempotency_key` the key is claimed first in the same
+    transaction and the response is stored with the order; raises
+    IdempotentReplay if the key was already used.
+    """
+    quantities = merge_order_items(order_data.get('items', []))
+    if not quantities:
+        raise HTTPException(status_code=400, detail="Order must contain at least one item")
+    
+    reservation_id = order_data.get('reservation_id')
+    hot_taken = {} if reservation_id else take_hot_stock(quantities)
+    
+    try:
+        with db_transaction() as cursor:
+            if idempotency_key and not idempotency.claim_key(cursor, idempotency_key, fingerprint):
+                raise IdempotentReplay()
+            
+            if reservation_id:
+                # Stock was taken when the reservation was made
+                reserved = inventory.lock_reservation(cursor, reservation_id)
+                if reserved is None:
+                    raise HTTPException(status_code=409, detail="Reservation not found or expired")
+                if reserved != quantities:
+                    raise HTTPException(status_code=409, detail="Order items do not match reservation")
+            elif not inventory.decrement_stock(cursor, quantities):
+                raise InsufficientStock()
+            
+            products = get_product_quantities(cursor, sorted(quantities))
+            items = [
+                {'product_id': product_id, 'quantity': quantity, 'price': products[product_id]['price']}
+                for product_id, quantity in quantities.items()
+            ]
+            total_amount = sum(item['price'] * item['quantity'] for item in items)
+            
+            # Reject carts built against prices that have since changed
+            expected_total = order_data.get('total_amount')
+            if expected_total is not None and abs(float(total_amount) - float(expected_total)) > 0.01:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "Order total does not match current prices", "total_amount": float(total_amount)}
+                )
+            
+            # Insert order
+            order_date = datetime.now().replace(microsecond=0)
+            insert_order_query = """
+                INSERT INTO orders (customer_id, shipping_address_id, status, total_amount, order_date) 
+                VALUES (%s, %s, %s, %s, %s)
+            """
+            cursor.execute(insert_order_query, (
+                order_data['customer_id'],
+                order_data['shipping_address_id'],
+                order_data.get('status', 'pending'),
+                total_amount,
+                order_date
+            ))
+            order_id = cursor.lastrowid
+            
+            # Insert all order items with one multi-row statement
+            item_placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(items))
+            item_values = []
+            for item in items:
+                item_values.extend((order_id, item['product_id'], item['quantity'], item['price']))
+            cursor.execute(
+                f"INSERT INTO order_items (order_id, product_id, quantity, price) VALUES {item_placeholders}",
+                item_values
+            )
+            
+            if reservation_id:
+                inventory.mark_reservation_committed(cursor, reservation_id, order_id)
+            
+            created_order = {
+                'id': order_id,
+                'customer_id': order_data['customer_id'],
+                'shipping_address_id': order_data['shipping_address_id'],
+                'status': order_data.get('status', 'pending'),
+                'total_amount': float(total_amount),
+                'order_date': order_date.isoformat(),
+                'items': [{**item, 'price': float(item['price'])} for item in items]
+            }
+            if idempotency_key:
+                idempotency.store_result(cursor, idempotency_key, order_id, created_order)
+    except InsufficientStock:
+        for product_id, quantity in hot_taken.items():
+            hot_stock_front.give_back(product_id, quantity)
+        raise_insufficient_stock(quantities)
+    except BaseException:
+        for product_id, quantity in hot_taken.items():
+            hot_stock_front.give_back(product_id, quantity)
+        raise
+    
+    if not reservation_id:
+        notify_stock_change({product_id: products[product_id]['quantity'] for product_id in quantities})
+    
+    return created_order
+
+# Idempotent checkout functions
+idempotency_store = IdempotencyStore()
+
+def get_idempotent_response(idempotency_key: str, fingerprint: str):
+    """Return the stored checkout response for a key, from memory or the database
+
+    Returns None if the key has not completed; raises IdempotencyConflict
+    if it was used for a different request.
+    """
+    response = idempotency_store.get(idempotency_key, fingerprint)
+    if response is not None:
+        return response
+    
+    with get_db_connection() as conn:
+        stored = idempotency.load_result(conn.cursor(), idempotency_key)
+    if stored is None:
+        return None
+    if stored['request_hash'] != fingerprint:
+        raise IdempotencyConflict()
+    idempotency_store.put(idempotency_key, fingerprint, stored['response'])
+    return stored['response']
+
+def purge_idempotency_keys_in_db():
+    """Delete one batch of expired idempotency keys; returns the number deleted"""
+    with get_db_connection() as conn:
+        return idempotency.purge_expired_keys(conn.cursor())
+
+async def purge_idempotency_keys():
+    """Background task: periodically delete expired idempotency keys"""
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_PURGE_INTERVAL)
+        try:
+            while await asyncio.to_thread(purge_idempotency_keys_in_db):
+                pass
+        except Exception as e:
+            logger.error("Error purging idempotency keys: %s", e)
+
+# Order history functions
+ORDER_STATUSES = ('pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled')
+
+def encode_order_cursor(order):
+    """Opaque keyset cursor pointing just past `order` in (order_date, id) DESC order"""
+    raw = f"{order['order_date'].isoformat()}|{order['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_order_cursor(cursor_token: str):
+    """Return (order_date, id) from a cursor; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor_token + "=" * (-len(cursor_token) % 4)).decode()
+        order_date, order_id = raw.split("|")
+        return datetime.fromisoformat(order_date), int(order_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
+def get_orders_page_from_db(limit: int, after=None, customer_id: Optional[int] = None,
+                            order_status: Optional[str] = None,
+                            date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    """Fetch one page of orders, newest first, with their items
+
+    Pagination is keyset-based on (order_date, id), so every page is an
+    index range scan on (customer_id, order_date) or (status, order_date)
+    no matter how deep the client pages. Items for the whole page are
+    loaded with one query. Returns (orders, has_more).
+    """
+    conditions = []
+    params = []
+    if customer_id is not None:
+        conditions.append("customer_id = %s")
+        params.append(customer_id)
+    if order_status is not None:
+        conditions.append("status = %s")
+        params.append(order_status)
+    if date_from is not None:
+        conditions.append("order_date >= %s")
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append("order_date < %s")
+        params.append(date_to)
+    if after is not None:
+        after_date, after_id = after
+        conditions.append("(order_date < %s OR (order_date = %s AND id < %s))")
+        params.extend((after_date, after_date, after_id))
+    
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT id, customer_id, shipping_address_id, status, total_amount, order_date 
+            FROM orders 
+            {where_clause} 
+            ORDER BY order_date DESC, id DESC 
+            LIMIT %s
+        """, params + [limit + 1])
+        orders = cursor.fetchall()
         
-        # Insert order
-        insert_order_query = """
-            INSERT INTO orders (customer_id, shipping_address_id, status, total_amount) 
-            VALUES (%s, %s, %s, %s)
-        """
-        cursor.execute(insert_order_query, (
-            order_data['customer_id'],
-            order_data['shipping_address_id'],
-            order_data.get('status', 'pending'),
-            order_data['total_amount']
-        ))
-        order_id = cursor.lastrowid
-        
-        # Insert order items
-        if 'items' in order_data:
-            insert_item_query = """
-                INSERT INTO order_items (order_id, product_id, quantity, price) 
-                VALUES (%s, %s, %s, %s)
-            """
-            for item in order_data['items']:
-                cursor.execute(insert_item_query, (
-                    order_id,
-                    item['product_id'],
-                    item['quantity'],
-                    item['price']
-                ))
+        has_more = len(orders) > limit
+        orders = orders[:limit]
         
-        conn.commit()
-        return order_id
+        if orders:
+            # Load items for the whole page at once instead of one query per order
+            order_ids = [order['id'] for order in orders]
+            placeholders = ", ".join(["%s"] * len(order_ids))
+            cursor.execute(f"""
+                SELECT order_id, product_id, quantity, price 
+                FROM order_items 
+                WHERE order_id IN ({placeholders}) 
+                ORDER BY order_id, id
+            """, order_ids)
+            items_by_order = {}
+            for item in cursor.fetchall():
+                items_by_order.setdefault(item.pop('order_id'), []).append(item)
+            for order in orders:
+                order['items'] = items_by_order.get(order['id'], [])
+    
+    return orders, has_more
+
+def customer_exists(customer_id: int) -> bool:
+    """Check whether a customer id exists"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM customers WHERE id = %s", (customer_id,))
+        return cursor.fetchone() is not None
+
+# Inventory reservation functions
+def reserve_stock_in_db(quantities: dict, ttl_seconds: int):
+    """Hold stock for a checkout in progress; raises HTTPException(409) if short"""
+    try:
+        with db_transaction() as cursor:
+            reservation_id, expires_at = inventory.create_reservation(cursor, quantities, ttl_seconds)
+            products = get_product_quantities(cursor, sorted(quantities))
+    except InsufficientStock:
+        raise_insufficient_stock(quantities)
+    
+    notify_stock_change({product_id: products[product_id]['quantity'] for product_id in quantities})
+    return reservation_id, expires_at
+
+def release_reservation_in_db(reservation_id: int):
+    """Cancel a held reservation and return its stock; returns False if not held"""
+    with db_transaction() as cursor:
+        quantities = inventory.release_reservation(cursor, reservation_id)
+        if quantities is None:
+            return False
+        products = get_product_quantities(cursor, sorted(quantities))
+    
+    notify_stock_change({product_id: products[product_id]['quantity'] for product_id in quantities})
+    return True
+
+def release_expired_reservations_in_db():
+    """Release one batch of expired reservations; returns the number of products restocked"""
+    with db_transaction() as cursor:
+        quantities = inventory.release_expired_reservations(cursor)
+        if not quantities:
+            return 0
+        products = get_product_quantities(cursor, sorted(quantities))
+    
+    notify_stock_change({product_id: products[product_id]['quantity'] for product_id in quantities})
+    return len(quantities)
+
+async def sweep_expired_reservations():
+    """Background task: periodically return stock from expired reservations"""
+    while True:
+        await asyncio.sleep(RESERVATION_SWEEP_INTERVAL)
+        try:
+            while await asyncio.to_thread(release_expired_reservations_in_db):
+                pass
+        except Exception as e:
+            logger.error("Error releasing expired reservations: %s", e)
+
+# Sales analytics functions
+def roll_up_sales_analytics_in_db():
+    """Fold one batch of orders into the analytics rollups; returns orders processed"""
+    with db_transaction() as cursor:
+        return analytics.roll_up_orders(cursor)
+
+def catch_up_sales_analytics():
+    """Roll up batches until the analytics are current; returns orders processed"""
+    total = 0
+    while True:
+        processed = roll_up_sales_analytics_in_db()
+        if not processed:
+            return total
+        total += processed
+
+async def roll_up_sales_analytics():
+    """Background task: periodically fold new orders into the analytics rollups"""
+    while True:
+        await asyncio.sleep(ANALYTICS_ROLLUP_INTERVAL)
+        try:
+            processed = await asyncio.to_thread(catch_up_sales_analytics)
+            if processed:
+                logger.info("Rolled up %s orders into sales analytics", processed)
+        except Exception as e:
+            logger.error("Error rolling up sales analytics: %s", e)
 
 # Legacy support - keeping products_db for backward compatibility during transition
 products_db = []
@@ -502,6 +1144,31 @@ class ProductResponse(BaseModel):
     updated_at: Optional[str] = None
     is_active: bool = True
 
+# Encodes /products/ bodies exactly as the endpoint's response model would
+PRODUCT_LIST_ADAPTER = TypeAdapter(List[ProductResponse])
+
+def encode_products_json(products: List[dict]) -> bytes:
+    """Validate formatted products against ProductResponse and encode them as JSON"""
+    return PRODUCT_LIST_ADAPTER.dump_json(PRODUCT_LIST_ADAPTER.validate_python(products))
+
+class CatalogChangesResponse(BaseModel):
+    version: int
+    since: int
+    has_more: bool
+    upserts: List[ProductResponse]
+    deletes: List[int]
+
+# Columns that can be changed through the batch update endpoint
+PRODUCT_PATCH_FIELDS = ("title", "description", "price", "quantity", "category")
+
+class ProductPatch(BaseModel):
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    quantity: Optional[int] = None
+    category: Optional[str] = None
+
 # Additional models for database operations
 class CustomerCreate(BaseModel):
     first_name: str
@@ -517,6 +1184,14 @@ class CustomerResponse(BaseModel):
     email: str
     created_at: str
 
+class CustomerUpsertResponse(BaseModel):
+    id: int
+    email: str
+    created: bool
+
+class CustomerLookup(BaseModel):
+    emails: List[str]
+
 class ShippingAddressCreate(BaseModel):
     customer_id: int
     address_line1: str
@@ -536,6 +1211,20 @@ class OrderCreate(BaseModel):
     items: List[OrderItem]
     total_amount: float
     status: Optional[str] = "pending"
+    reservation_id: Optional[int] = None  # Use stock held by POST /inventory/reservations
+
+class ReservationItem(BaseModel):
+    product_id: int
+    quantity: int
+
+class ReservationCreate(BaseModel):
+    items: List[ReservationItem]
+    ttl_seconds: int = inventory.RESERVATION_TTL_SECONDS
+
+class ReservationResponse(BaseModel):
+    id: int
+    expires_at: str
+    items: List[ReservationItem]
 
 class OrderResponse(BaseModel):
     id: int
@@ -545,6 +1234,14 @@ class OrderResponse(BaseModel):
     total_amount: float
     order_date: str
 
+class CheckoutResponse(OrderResponse):
+    items: List[OrderItem]
+
+class OrderPage(BaseModel):
+    orders: List[CheckoutResponse]
+    has_more: bool
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch the next page
+
 # Admin authentication
 def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify admin token for protected operations"""
@@ -557,7 +1254,7 @@ def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     return credentials.credentials
 
 # Helper function to create square thumbnail with proper centering
-def create_square_thumbnail(image: Image.Image, size: int) -> Image.Image:
+def create_square_thumbnail(image: "Image.Image", size: int) -> "Image.Image":
     """Create a square thumbnail by cropping the center of the image"""
     # Calculate the crop box to get the center square
     width, height = image.size
@@ -578,12 +1275,13 @@ def create_square_thumbnail(image: Image.Image, size: int) -> Image.Image:
     square_image = image.crop((left, top, right, bottom))
     
     # Resize to target size
+    from PIL import Image
     square_image = square_image.resize((size, size), Image.Resampling.LANCZOS)
     
     return square_image
 
 # Helper function to resize image maintaining aspect ratio
-def resize_with_aspect_ratio(image: Image.Image, target_width: int, target_height: int) -> Image.Image:
+def resize_with_aspect_ratio(image: "Image.Image", target_width: int, target_height: int) -> "Image.Image":
     """Resize image to fit within target dimensions while maintaining aspect ratio"""
     # Calculate scaling factor to fit within target dimensions
     scale_w = target_width / image.width
@@ -595,6 +1293,7 @@ def resize_with_aspect_ratio(image: Image.Image, target_width: int, target_heigh
     new_height = int(image.height * scale)
     
     # Resize the image
+    from PIL import Image
     resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
     
     return resized_image
@@ -602,8 +1301,13 @@ def resize_with_aspect_ratio(image: Image.Image, target_width: int, target_heigh
 # Enhanced function to save uploaded image with multiple sizes
 def save_uploaded_image_with_sizes(file: UploadFile) -> dict:
     """Save uploaded image in multiple sizes and return URLs"""
+    return save_image_with_sizes(file.file, file.filename)
+
+def save_image_with_sizes(source, filename: str) -> dict:
+    """Save an image from a binary file object in multiple sizes and return URLs"""
+    from PIL import Image  # Imported on first upload, keeping Pillow out of worker startup
     # Generate unique filename base
-    file_extension = file.filename.split(".")[-1].lower()
+    file_extension = filename.split(".")[-1].lower()
     if file_extension not in ["jpg", "jpeg", "png", "gif", "webp"]:
         raise HTTPException(status_code=400, detail="Invalid image format. Supported formats: JPG, JPEG, PNG, GIF, WEBP")
     
@@ -617,29 +1321,35 @@ def save_uploaded_image_with_sizes(file: UploadFile) -> dict:
     # Save original uploaded file temporarily
     temp_path = os.path.join(IMAGES_DIR, f"temp_{filename_base}")
     with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+        shutil.copyfileobj(source, buffer)
     
+    thumbnail_path = main_path = original_path = None
     try:
         # Open the image
-        with Image.open(temp_path) as img:
+        with IMAGE_PROCESSING_SECONDS.time(stage="total"), span("image_process"), Image.open(temp_path) as img:
             # Convert to RGB if necessary (for JPEG compatibility)
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
+            with IMAGE_PROCESSING_SECONDS.time(stage="decode"):
+                img.load()
+                if img.mode in ("RGBA", "P"):
+                    img = img.convert("RGB")
             
             # 1. Create thumbnail (200x200 square)
-            thumbnail = create_square_thumbnail(img, 200)
-            thumbnail_path = os.path.join(THUMBNAIL_DIR, filename_base)
-            thumbnail.save(thumbnail_path, optimize=True, quality=85)
+            with IMAGE_PROCESSING_SECONDS.time(stage="thumbnail"):
+                thumbnail = create_square_thumbnail(img, 200)
+                thumbnail_path = os.path.join(THUMBNAIL_DIR, filename_base)
+                thumbnail.save(thumbnail_path, optimize=True, quality=85)
             
             # 2. Create main product image (600x400 max, maintaining aspect ratio)
-            main_image = resize_with_aspect_ratio(img, 600, 400)
-            main_path = os.path.join(MAIN_DIR, filename_base)
-            main_image.save(main_path, optimize=True, quality=90)
+            with IMAGE_PROCESSING_SECONDS.time(stage="main"):
+                main_image = resize_with_aspect_ratio(img, 600, 400)
+                main_path = os.path.join(MAIN_DIR, filename_base)
+                main_image.save(main_path, optimize=True, quality=90)
             
             # 3. Create original size (800x600 max, maintaining aspect ratio)
-            original_image = resize_with_aspect_ratio(img, 800, 600)
-            original_path = os.path.join(ORIGINAL_DIR, filename_base)
-            original_image.save(original_path, optimize=True, quality=95)
+            with IMAGE_PROCESSING_SECONDS.time(stage="original"):
+                original_image = resize_with_aspect_ratio(img, 800, 600)
+                original_path = os.path.join(ORIGINAL_DIR, filename_base)
+                original_image.save(original_path, optimize=True, quality=95)
             
             # Return URLs for all sizes
             return {
@@ -651,7 +1361,7 @@ def save_uploaded_image_with_sizes(file: UploadFile) -> dict:
     except Exception as e:
         # Clean up any created files on error
         for path in [thumbnail_path, main_path, original_path]:
-            if 'path' in locals() and os.path.exists(path):
+            if path and os.path.exists(path):
                 os.remove(path)
         raise HTTPException(status_code=400, detail=f"Error processing image: {str(e)}")
     
@@ -695,8 +1405,51 @@ def delete_image_file(image_url: str):
         if os.path.exists(file_path):
             os.remove(file_path)
 
+# Helper function to format a product row for API responses
+def format_product(product: dict) -> dict:
+    """Format a database product row to match ProductResponse"""
+    return {
+        **product,
+        'image_url': product.get('image_main_url', ''),  # Backward compatibility
+        'images': {
+            'thumbnail': product.get('image_thumb_url', ''),
+            'main': product.get('image_main_url', ''),
+            'original': product.get('image_full_url', '')
+        },
+        'created_at': product['created_at'].isoformat() if product.get('created_at') else '',
+        'updated_at': product['updated_at'].isoformat() if product.get('updated_at') else None
+    }
+
 # API Endpoints
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus metrics for all workers"""
+    return Response(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/admin/profile", include_in_schema=False)
+async def profile_worker(
+    seconds: float = 10,
+    interval_ms: float = 10,
+    include_idle: bool = False,
+    token: str = Depends(verify_admin_token)
+):
+    """Sample this worker's stacks for `seconds` - Admin only
+
+    Returns collapsed stacks for flamegraph.pl or speedscope. Only the
+    worker that receives the request is profiled.
+    """
+    if seconds <= 0 or seconds > 60:
+        raise HTTPException(status_code=400, detail="seconds must be between 0 and 60")
+    if interval_ms < 1 or interval_ms > 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    try:
+        stacks = await asyncio.to_thread(profiler.profile, seconds, interval_ms / 1000, include_idle)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    filename = f"profile-{os.getpid()}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return Response(stacks, media_type="text/plain", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -704,37 +1457,204 @@ async def root():
         "message": "Trendyoft E-commerce Backend API",
         "version": "1.0.0",
         "endpoints": {
+            "storefront": "/index.html",
+            "bootstrap": "/bootstrap",
             "products": "/products/",
+            "product_changes": "/products/changes?since=<version>",
+            "catalog_events": "/events/catalog (Server-Sent Events)",
             "add_product": "/add-product/ (POST, Admin only)",
-            "delete_product": "/delete-product/{product_id} (DELETE, Admin only)"
+            "delete_product": "/delete-product/{product_id} (DELETE, Admin only)",
+            "bulk_import": "/admin/products/bulk (POST, Admin only)",
+            "bulk_update": "/admin/products (PATCH, Admin only)",
+            "customers": "/customers/ (POST, create)",
+            "update_customer": "/admin/customers (PUT, create or update by email - Admin only)",
+            "customer_lookup": "/admin/customers/lookup (POST, Admin only)",
+            "customer_orders": "/customers/{customer_id}/orders (Admin only)",
+            "all_orders": "/orders (Admin only)",
+            "exports": "/admin/exports/{orders|order_items|payment_details}?format=csv|parquet (Admin only)",
+            "reconciliation": "/admin/reconciliation/run, /admin/reconciliation/settlements, /admin/reconciliation/issues (Admin only)",
+            "sales_analytics": "/admin/analytics/daily, /admin/analytics/categories, /admin/analytics/products (Admin only)",
+            "checkout": "/orders/ (POST)",
+            "reserve_stock": "/inventory/reservations (POST)"
         }
     }
 
+# Server-side rendered storefront
+INDEX_HTML_PATH = "index.html"
+INITIAL_PAGE_SIZE = 24  # Products inlined into the first page
+BOOTSTRAP_CACHE_SIZE = 8  # Serialized bootstrap variants kept per snapshot
+
+class RawJSONResponse(Response):
+    """JSON response whose body is already encoded (bytes or a memoryview, sent without copying)"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return content
+
+def get_products_json(snapshot: CatalogSnapshot):
+    """Encoded /products/ body of a snapshot (a view into the shared mapping when mapped)"""
+    body = snapshot.derived.get(catalog_snapshot.PRODUCTS_JSON)
+    record_cache("products_json", body is not None)
+    if body is None:
+        with span("serialize"):
+            body = snapshot.derived[catalog_snapshot.PRODUCTS_JSON] = encode_products_json(snapshot.products)
+    return body
+
+def build_bootstrap_payload(snapshot: CatalogSnapshot, limit: Optional[int] = None) -> dict:
+    """Build the storefront's initial data (products page, categories, version)"""
+    products = snapshot.products if limit is None else snapshot.products[:limit]
+    return {
+        "version": snapshot.version,
+        "products": products,
+        "total_products": len(snapshot.products),
+        "has_more": len(products) < len(snapshot.products),
+        "categories": snapshot.categories,
+        "total_categories": len(snapshot.categories),
+        "all_products_count": sum(cat['total_products'] for cat in snapshot.categories)
+    }
+
+def get_bootstrap_json(snapshot: CatalogSnapshot, limit: Optional[int] = None) -> str:
+    """Serialize the bootstrap payload once per snapshot and limit"""
+    cache = snapshot.derived.setdefault('bootstrap_json', {})
+    body = cache.get(limit)
+    record_cache("bootstrap_json", body is not None)
+    if body is None:
+        if len(cache) >= BOOTSTRAP_CACHE_SIZE:
+            cache.clear()
+        with span("serialize"):
+            body = cache[limit] = json.dumps(build_bootstrap_payload(snapshot, limit), separators=(',', ':'))
+    return body
+
+def render_index_html(snapshot: CatalogSnapshot) -> str:
+    """Inline the first page of products and categories into index.html
+
+    The result is memoized on the snapshot, so it is rendered once per
+    catalog version (and again only if index.html changes on disk).
+    """
+    template_mtime = os.path.getmtime(INDEX_HTML_PATH)
+    cached = snapshot.derived.get('index_html')
+    hit = bool(cached) and cached[0] == template_mtime
+    record_cache("index_html", hit)
+    if hit:
+        return cached[1]
+    
+    with open(INDEX_HTML_PATH, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+    
+    # Escape '<' so product text can never close the script tag
+    catalog_json = get_bootstrap_json(snapshot, INITIAL_PAGE_SIZE).replace('<', '\\u003c')
+    html_content = html_content.replace(
+        '</head>',
+        f'    <script>window.INITIAL_CATALOG = {catalog_json};</script>\n</head>',
+        1
+    )
+    
+    snapshot.derived['index_html'] = (template_mtime, html_content)
+    return html_content
+
+@app.get("/index.html", response_class=HTMLResponse)
+async def get_storefront(request: Request):
+    """Serve the storefront with the first page of products inlined - Public endpoint"""
+    try:
+        snapshot = catalog_cache.get()
+    except Exception as e:
+        # Without a catalog the page still works; it fetches from the API itself
+        logger.error("Error loading catalog for storefront: %s", e)
+        with open(INDEX_HTML_PATH, 'r', encoding='utf-8') as f:
+            return HTMLResponse(f.read(), headers={"Cache-Control": "no-cache"})
+    
+    html_content = render_index_html(snapshot)
+    etag = f'"catalog-{snapshot.version}-{int(snapshot.derived["index_html"][0])}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(html_content, headers=headers)
+
+@app.get("/bootstrap")
+async def get_bootstrap(request: Request, limit: Optional[int] = None):
+    """Get products, category stats and catalog version in one response - Public endpoint
+
+    Omit `limit` to get the full catalog. Responses carry an ETag derived
+    from the catalog version, so unchanged catalogs revalidate with a 304.
+    """
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    
+    try:
+        snapshot = catalog_cache.get()
+    except Exception as e:
+        logger.error("Error fetching bootstrap data: %s", e)
+        raise HTTPException(status_code=500, detail="Error fetching bootstrap data")
+    
+    etag = f'"catalog-{snapshot.version}-{limit or "all"}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(get_bootstrap_json(snapshot, limit), media_type="application/json", headers=headers)
+
+@app.get("/style.css", include_in_schema=False)
+async def get_storefront_stylesheet():
+    """Serve the storefront stylesheet alongside /index.html"""
+    return FileResponse("style.css", media_type="text/css")
+
 @app.get("/products/", response_model=List[ProductResponse])
 async def get_products():
-    """Get all products - Public endpoint for frontend"""
+    """Get all products - Public endpoint for frontend
+
+    Served from the catalog snapshot, so a cold worker answers from the
+    warm-start file and keeps answering while MySQL is unavailable. The
+    body is encoded once per catalog version and shared by all workers.
+    """
     try:
-        products = get_products_from_db()
-        # Format products to match expected response
-        formatted_products = []
-        for product in products:
-            formatted_product = {
-                **product,
-                'image_url': product.get('image_main_url', ''),  # Backward compatibility
-                'images': {
-                    'thumbnail': product.get('image_thumb_url', ''),
-                    'main': product.get('image_main_url', ''),
-                    'original': product.get('image_full_url', '')
-                },
-                'created_at': product['created_at'].isoformat() if product.get('created_at') else '',
-                'updated_at': product['updated_at'].isoformat() if product.get('updated_at') else None
-            }
-            formatted_products.append(formatted_product)
-        return formatted_products
+        return RawJSONResponse(get_products_json(catalog_cache.get()))
     except Exception as e:
-        logger.error(f"Error fetching products: {e}")
+        logger.error("Error fetching products: %s", e)
         raise HTTPException(status_code=500, detail="Error fetching products")
 
+@app.get("/products/changes", response_model=CatalogChangesResponse)
+async def get_product_changes(since: int = 0, limit: int = 1000):
+    """Get products changed since a catalog version - Public endpoint
+
+    Clients keep the returned `version` and pass it as `since` on the next
+    call. When `has_more` is true, call again immediately to continue.
+    """
+    if since < 0:
+        raise HTTPException(status_code=400, detail="since cannot be negative")
+    if limit < 1 or limit > 5000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 5000")
+    
+    try:
+        current_version = get_catalog_version_from_db()
+        changes = get_catalog_changes_from_db(since, limit + 1)
+        
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        
+        version = max(current_version, since)
+        upserts = []
+        deletes = []
+        for product in changes:
+            change_version = product.pop('change_version')
+            if product['is_active']:
+                upserts.append(format_product(product))
+            else:
+                deletes.append(product['id'])
+        
+        if changes:
+            # Resume from the last change returned when the page was truncated
+            version = change_version if has_more else max(version, change_version)
+        
+        return {
+            "version": version,
+            "since": since,
+            "has_more": has_more,
+            "upserts": upserts,
+            "deletes": deletes
+        }
+    except Exception as e:
+        logger.error("Error fetching product changes since %s: %s", since, e)
+        raise HTTPException(status_code=500, detail="Error fetching product changes")
+
 @app.get("/products/{product_id}", response_model=ProductResponse)
 async def get_product(product_id: int):
     """Get a specific product by ID - Public endpoint"""
@@ -759,11 +1679,12 @@ async def get_product(product_id: int):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching product {product_id}: {e}")
+        logger.error("Error fetching product %s: %s", product_id, e)
         raise HTTPException(status_code=500, detail="Error fetching product")
 
+# Product write endpoints are `def`: image processing and database work run in the threadpool
 @app.post("/add-product/", response_model=ProductResponse)
-async def add_product(
+def add_product(
     title: str = Form(...),
     price: float = Form(...),
     description: str = Form(...),
@@ -823,7 +1744,7 @@ async def add_product(
         return formatted_product
         
     except Exception as e:
-        logger.error(f"Error creating product: {e}")
+        logger.error("Error creating product: %s", e)
         # Clean up uploaded images on error
         try:
             delete_image_files(image_urls)
@@ -832,7 +1753,7 @@ async def add_product(
         raise HTTPException(status_code=500, detail="Error creating product")
 
 @app.put("/update-product/{product_id}", response_model=ProductResponse)
-async def update_product(
+def update_product(
     product_id: int,
     title: Optional[str] = Form(None),
     price: Optional[float] = Form(None),
@@ -909,7 +1830,7 @@ async def update_product(
 
         return formatted_product
     except Exception as e:
-        logger.error(f"Error updating product {product_id}: {e}")
+        logger.error("Error updating product %s: %s", product_id, e)
         raise HTTPException(status_code=500, detail="Error updating product")
     
     # Update image if provided
@@ -932,7 +1853,7 @@ async def update_product(
     return product
 
 @app.delete("/delete-product/{product_id}")
-async def delete_product(
+def delete_product(
     product_id: int,
     token: str = Depends(verify_admin_token)
 ):
@@ -949,9 +1870,706 @@ async def delete_product(
         raise
 
     except Exception as e:
-        logger.error(f"Error deleting product {product_id}: {e}")
+        logger.error("Error deleting product %s: %s", product_id, e)
         raise HTTPException(status_code=500, detail="Error deleting product")
 
+@app.patch("/admin/products")
+def bulk_update_products(
+    updates: List[ProductPatch],
+    token: str = Depends(verify_admin_token)
+):
+    """Apply many price/stock/detail changes at once - Admin only
+
+    All valid changes are applied in one transaction; items that fail
+    validation are skipped and reported. If an id appears more than once,
+    its fields are merged with later values winning. Runs in the
+    threadpool (plain def) so the batch's blocking database work does
+    not stall the event loop.
+    """
+    changes = {}
+    errors = []
+    for index, update in enumerate(updates):
+        fields = {field: value for field, value in update.model_dump(exclude={'id'}).items() if value is not None}
+        if update.price is not None and update.price <= 0:
+            errors.append({"index": index, "id": update.id, "error": "Price must be positive"})
+        elif update.quantity is not None and update.quantity < 0:
+            errors.append({"index": index, "id": update.id, "error": "Quantity cannot be negative"})
+        elif any(isinstance(value, str) and not value.strip() for field, value in fields.items() if field != 'description'):
+            errors.append({"index": index, "id": update.id, "error": "Text fields cannot be empty"})
+        elif not fields:
+            errors.append({"index": index, "id": update.id, "error": "No fields to update"})
+        else:
+            changes.setdefault(update.id, {}).update(fields)
+    
+    updated_ids, not_found_ids, version = [], [], None
+    if changes:
+        try:
+            updated_ids, not_found_ids, version = update_products_batch_in_db(changes)
+        except Exception as e:
+            logger.error("Error applying batch product update: %s", e)
+            raise HTTPException(status_code=500, detail="Error updating products")
+    
+    if updated_ids:
+        # Invalidate caches and notify subscribers once for the whole batch
+        notify_catalog_change("catalog.bulk_update", {"count": len(updated_ids)}, version)
+        for product_id in updated_ids:
+            if 'quantity' in changes[product_id]:
+                hot_stock_front.set_available(product_id, changes[product_id]['quantity'])
+                catalog_broadcaster.publish(
+                    "product.quantity", {"id": product_id, "quantity": changes[product_id]['quantity']}, event_id=version
+                )
+    
+    return {
+        "updated": len(updated_ids),
+        "updated_ids": updated_ids,
+        "not_found": not_found_ids,
+        "errors": errors
+    }
+
+# Bulk product import
+IMAGE_PROCESSING_WORKERS = min(8, os.cpu_count() or 1)
+
+class ImageArchive:
+    """Case-insensitive lookup of images inside an uploaded zip by file name"""
+    
+    def __init__(self, fileobj):
+        self.zip_file = zipfile.ZipFile(fileobj)
+        self.members = {
+            os.path.basename(info.filename).lower(): info
+            for info in self.zip_file.infolist() if not info.is_dir()
+        }
+    
+    def get(self, name: str):
+        return self.members.get(os.path.basename(name))
+    
+    def read(self, member) -> bytes:
+        return self.zip_file.read(member)
+
+def process_bulk_images(rows, image_archive, executor):
+    """Generate image derivatives for a chunk of import rows in parallel
+
+    Returns (rows with image URLs set, errors). Zip members are read on the
+    calling thread; only decoding, resizing and encoding run in the pool.
+    """
+    def process(row_number, product_data, image_bytes):
+        try:
+            image_urls = save_image_with_sizes(io.BytesIO(image_bytes), product_data['image'])
+        except HTTPException as e:
+            return row_number, product_data, e.detail
+        except Exception as e:
+            return row_number, product_data, f"Error processing image: {e}"
+        product_data.update({
+            "image_full_url": image_urls["original"],
+            "image_main_url": image_urls["main"],
+            "image_thumb_url": image_urls["thumbnail"]
+        })
+        return row_number, product_data, None
+    
+    futures = []
+    ready = []
+    errors = []
+    for row_number, product_data in rows:
+        if not product_data['image']:
+            ready.append((row_number, product_data))
+            continue
+        member = image_archive.get(product_data['image'].lower()) if image_archive else None
+        if member is None:
+            errors.append({"row": row_number, "error": f"Image '{product_data['image']}' not found in images zip"})
+            continue
+        futures.append(executor.submit(process, row_number, product_data, image_archive.read(member)))
+    
+    for future in futures:
+        row_number, product_data, error = future.result()
+        if error:
+            errors.append({"row": row_number, "error": error})
+        else:
+            ready.append((row_number, product_data))
+    
+    ready.sort(key=lambda item: item[0])
+    return ready, errors
+
+def import_products_chunk(rows, image_archive, executor):
+    """Process images for a chunk, then insert it in one transaction
+
+    Returns (product_ids, version, errors).
+    """
+    ready, errors = process_bulk_images(rows, image_archive, executor)
+    if not ready:
+        return [], None, errors
+    
+    try:
+        product_ids, version = insert_products_batch_to_db([product_data for _, product_data in ready])
+    except Exception as e:
+        logger.error("Error inserting bulk import chunk: %s", e)
+        for row_number, product_data in ready:
+            errors.append({"row": row_number, "error": "Database error while inserting row"})
+            if product_data.get('image_main_url'):
+                delete_image_files({
+                    "thumbnail": product_data['image_thumb_url'],
+                    "main": product_data['image_main_url'],
+                    "original": product_data['image_full_url']
+                })
+        return [], None, errors
+    
+    return product_ids, version, errors
+
+# Defined with `def` so the import runs in the threadpool instead of blocking the event loop
+@app.post("/admin/products/bulk")
+def bulk_import_products(
+    file: UploadFile = File(...),
+    images: Optional[UploadFile] = File(None),
+    format: Optional[str] = Form(None),
+    token: str = Depends(verify_admin_token)
+):
+    """Import products from a CSV or JSONL file - Admin only
+
+    Columns/keys: title, description, price, quantity, category and an
+    optional image naming a file inside the `images` zip. Rows are
+    validated as they stream in and inserted in transactional chunks;
+    invalid rows are skipped and reported with their row number.
+    """
+    file_format = detect_format(file.filename, format)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="Unsupported import format. Supported formats: CSV, JSONL")
+    
+    try:
+        image_archive = ImageArchive(images.file) if images is not None else None
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="images must be a zip archive")
+    
+    product_ids = []
+    errors = []
+    version = None
+    chunk = []
+    
+    def flush():
+        nonlocal version
+        chunk_ids, chunk_version, chunk_errors = import_products_chunk(chunk, image_archive, executor)
+        product_ids.extend(chunk_ids)
+        errors.extend(chunk_errors)
+        version = chunk_version or version
+        chunk.clear()
+    
+    with ThreadPoolExecutor(max_workers=IMAGE_PROCESSING_WORKERS) as executor:
+        try:
+            for row_number, row, error in iter_rows(file.file, file_format):
+                if error is None:
+                    product_data, error = validate_product_row(row)
+                if error:
+                    errors.append({"row": row_number, "error": error})
+                    continue
+                
+                chunk.append((row_number, product_data))
+                if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+                    flush()
+        except (UnicodeDecodeError, csv.Error) as e:
+            errors.append({"row": None, "error": f"Could not parse file: {e}"})
+        
+        if chunk:
+            flush()
+    
+    if product_ids:
+        # One invalidation and one event for the whole import
+        notify_catalog_change("catalog.bulk_import", {"count": len(product_ids)}, version)
+    
+    errors.sort(key=lambda error: error["row"] or 0)
+    return {
+        "inserted": len(product_ids),
+        "failed": len(errors),
+        "product_ids": product_ids,
+        "errors": errors
+    }
+
+# Defined with `def` so concurrent checkouts run in the threadpool instead of queueing on the event loop
+@app.post("/orders/", response_model=CheckoutResponse, status_code=status.HTTP_201_CREATED)
+def create_order(
+    order: OrderCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Place an order (checkout) - Public endpoint
+
+    Item prices and the order total are taken from the database. The
+    order is rejected with 409 if `total_amount` no longer matches current
+    prices or any item is out of stock.
+    
+    Send an `Idempotency-Key` header to make retries safe: a repeated key
+    returns the original order (with `Idempotent-Replayed: true`) instead
+    of placing a new one. Failed attempts are not stored and can be retried.
+    """
+    for item in order.items:
+        if item.quantity <= 0:
+            raise HTTPException(status_code=400, detail="Item quantity must be positive")
+    
+    order_data = order.model_dump()
+    order_data['status'] = 'pending'
+    
+    fingerprint = None
+    if idempotency_key is not None:
+        if not idempotency_key or len(idempotency_key) > idempotency.IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Idempotency-Key must be 1-{idempotency.IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+            )
+        fingerprint = idempotency.request_fingerprint(order_data)
+    
+    try:
+        if idempotency_key:
+            stored_order = get_idempotent_response(idempotency_key, fingerprint)
+            if stored_order is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+                return stored_order
+        
+        try:
+            created_order = create_order_in_db(order_data, idempotency_key, fingerprint)
+        except IdempotentReplay:
+            # A concurrent attempt with the same key committed first
+            stored_order = get_idempotent_response(idempotency_key, fingerprint)
+            if stored_order is None:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+            response.headers["Idempotent-Replayed"] = "true"
+            return stored_order
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error creating order: %s", e)
+        raise HTTPException(status_code=500, detail="Error creating order")
+    
+    if idempotency_key:
+        idempotency_store.put(idempotency_key, fingerprint, created_order)
+    return created_order
+
+# Finance exports
+@app.get("/admin/exports/{table}")
+def export_table(
+    table: str,
+    format: str = "csv",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    token: str = Depends(verify_admin_token)
+):
+    """Stream orders, order_items or payment_details as CSV or Parquet - Admin only
+
+    Rows come from an unbuffered server-side cursor and are sent in small
+    chunks, so exports of any size use constant memory. Dates filter on
+    the order/payment date (`date_from` inclusive, `date_to` exclusive).
+    """
+    if table not in exports.EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export. Available: {', '.join(sorted(exports.EXPORTS))}")
+    if format not in exports.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(exports.EXPORT_FORMATS)}")
+    if format == "parquet" and not exports.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export is not available (pyarrow is not installed)")
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+    
+    rows = exports.iter_export_rows(DB_CONFIG, table, date_from, date_to)
+    try:
+        # Run the query before responding so database errors still return a 500
+        first_row = next(rows, None)
+    except Exception as e:
+        logger.error("Error starting %s export: %s", table, e)
+        raise HTTPException(status_code=500, detail="Error starting export")
+    if first_row is not None:
+        rows = itertools.chain([first_row], rows)
+    
+    filename = f"{table}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(
+        exports.iter_export_chunks(rows, table, format),
+        media_type=exports.CONTENT_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Payment reconciliation
+@app.post("/admin/reconciliation/run")
+def run_reconciliation(token: str = Depends(verify_admin_token)):
+    """Reconcile orders placed since the last run against payments - Admin only
+
+    Orders younger than 24 hours are left for a later run.
+    """
+    try:
+        return reconciliation.reconcile_orders(DB_CONFIG)
+    except ReconciliationBusy:
+        raise HTTPException(status_code=409, detail="A reconciliation run is already in progress")
+    except Exception as e:
+        logger.error("Error running payment reconciliation: %s", e)
+        raise HTTPException(status_code=500, detail="Error running payment reconciliation")
+
+@app.post("/admin/reconciliation/settlements")
+def import_settlement(
+    file: UploadFile = File(...),
+    provider: str = Form(...),
+    date_from: Optional[datetime] = Form(None),
+    date_to: Optional[datetime] = Form(None),
+    token: str = Depends(verify_admin_token)
+):
+    """Check a provider settlement CSV against payment_details - Admin only
+
+    The CSV needs `payment_id` and `amount` columns (optionally `status`
+    and `currency`). With `date_from`/`date_to`, completed payments in that
+    period that are missing from the file are flagged too.
+    """
+    if (date_from is None) != (date_to is None):
+        raise HTTPException(status_code=400, detail="date_from and date_to must be given together")
+    if date_from and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+    
+    try:
+        settlements = reconciliation.parse_settlement_file(file.file)
+    except (SettlementFileError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid settlement file: {e}")
+    finally:
+        file.file.close()
+    
+    try:
+        return reconciliation.reconcile_settlement(DB_CONFIG, settlements, provider, date_from, date_to)
+    except Exception as e:
+        logger.error("Error reconciling %s settlement: %s", provider, e)
+        raise HTTPException(status_code=500, detail="Error reconciling settlement")
+
+@app.get("/admin/reconciliation/issues")
+def get_reconciliation_issues(
+    issue_type: Optional[str] = None,
+    resolved: bool = False,
+    before_id: Optional[int] = None,
+    limit: int = 100,
+    token: str = Depends(verify_admin_token)
+):
+    """List reconciliation issues, newest first - Admin only
+
+    Pass the last `id` of a page as `before_id` to get the next one.
+    """
+    if issue_type is not None and issue_type not in reconciliation.ISSUE_TYPES:
+        raise HTTPException(status_code=400, detail=f"issue_type must be one of: {', '.join(reconciliation.ISSUE_TYPES)}")
+    if limit < 1 or limit > 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    
+    conditions = ["resolved = %s"]
+    params = [resolved]
+    if issue_type is not None:
+        conditions.append("issue_type = %s")
+        params.append(issue_type)
+    if before_id is not None:
+        conditions.append("id < %s")
+        params.append(before_id)
+    
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT id, order_id, payment_id, issue_type, expected_amount, actual_amount, 
+                       details, source, resolved, detected_at 
+                FROM reconciliation_issues 
+                WHERE {' AND '.join(conditions)} 
+                ORDER BY id DESC 
+                LIMIT %s
+            """, params + [limit])
+            issues = cursor.fetchall()
+    except Exception as e:
+        logger.error("Error fetching reconciliation issues: %s", e)
+        raise HTTPException(status_code=500, detail="Error fetching reconciliation issues")
+    
+    for row in issues:
+        for field in ('expected_amount', 'actual_amount'):
+            if row[field] is not None:
+                row[field] = float(row[field])
+        row['resolved'] = bool(row['resolved'])
+        row['detected_at'] = row['detected_at'].isoformat() if row['detected_at'] else None
+    return {"issues": issues, "has_more": len(issues) == limit}
+
+@app.post("/admin/reconciliation/issues/{issue_id}/resolve")
+def resolve_reconciliation_issue(issue_id: int, token: str = Depends(verify_admin_token)):
+    """Mark a reconciliation issue as resolved - Admin only"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE reconciliation_issues SET resolved = TRUE WHERE id = %s", (issue_id,))
+        if not cursor.rowcount:
+            cursor.execute("SELECT 1 FROM reconciliation_issues WHERE id = %s", (issue_id,))
+            if not cursor.fetchone():
+                raise HTTPException(status_code=404, detail="Issue not found")
+    return {"message": "Issue resolved", "id": issue_id}
+
+# Customers
+CUSTOMER_LOOKUP_LIMIT = 1000
+
+def validate_customer(customer: CustomerCreate):
+    if not customer.email.strip() or "@" not in customer.email:
+        raise HTTPException(status_code=400, detail="A valid email is required")
+    if not customer.first_name.strip() or not customer.last_name.strip():
+        raise HTTPException(status_code=400, detail="First and last name are required")
+
+@app.post("/customers/", response_model=CustomerUpsertResponse, status_code=status.HTTP_201_CREATED)
+def create_customer(customer: CustomerCreate):
+    """Create a customer
+
+    Returns 409 when the email (or phone number) is already registered;
+    existing customers are only changed through PUT /admin/customers.
+    """
+    validate_customer(customer)
+    try:
+        customer_id = insert_customer_to_db(customer.model_dump())
+    except CustomerExists:
+        raise HTTPException(status_code=409, detail="Email is already registered")
+    except CustomerConflict:
+        raise HTTPException(status_code=409, detail="Phone number is already registered to another customer")
+    except Exception as e:
+        logger.error("Error creating customer %s: %s", customer.email, e)
+        raise HTTPException(status_code=500, detail="Error creating customer")
+    
+    return {"id": customer_id, "email": normalize_email(customer.email), "created": True}
+
+@app.put("/admin/customers", response_model=CustomerUpsertResponse)
+def upsert_customer(customer: CustomerCreate, response: Response, token: str = Depends(verify_admin_token)):
+    """Create a customer, or update the name/phone of the one with this email - Admin only
+
+    Returns 201 when a new customer was created and 200 otherwise.
+    """
+    validate_customer(customer)
+    try:
+        customer_id, created = upsert_customer_in_db(customer.model_dump())
+    except CustomerConflict:
+        raise HTTPException(status_code=409, detail="Phone number is already registered to another customer")
+    except Exception as e:
+        logger.error("Error saving customer %s: %s", customer.email, e)
+        raise HTTPException(status_code=500, detail="Error saving customer")
+    
+    if created:
+        response.status_code = status.HTTP_201_CREATED
+    return {"id": customer_id, "email": normalize_email(customer.email), "created": created}
+
+@app.post("/admin/customers/lookup")
+def lookup_customers(lookup: CustomerLookup, token: str = Depends(verify_admin_token)):
+    """Map many emails to customer ids in one call - Admin only
+
+    Unknown emails map to null.
+    """
+    if len(lookup.emails) > CUSTOMER_LOOKUP_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {CUSTOMER_LOOKUP_LIMIT} emails per lookup")
+    try:
+        return {"customers": get_customer_ids_by_email(lookup.emails)}
+    except Exception as e:
+        logger.error("Error looking up customers: %s", e)
+        raise HTTPException(status_code=500, detail="Error looking up customers")
+
+def list_orders(limit: int, cursor: Optional[str], customer_id: Optional[int] = None,
+                order_status: Optional[str] = None,
+                date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    """Validate order history parameters and build one OrderPage"""
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    if order_status is not None and order_status not in ORDER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of: {', '.join(ORDER_STATUSES)}")
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+    
+    after = None
+    if cursor:
+        try:
+            after = decode_order_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    try:
+        orders, has_more = get_orders_page_from_db(
+            limit, after, customer_id=customer_id, order_status=order_status,
+            date_from=date_from, date_to=date_to
+        )
+    except Exception as e:
+        logger.error("Error fetching orders: %s", e)
+        raise HTTPException(status_code=500, detail="Error fetching orders")
+    
+    next_cursor = encode_order_cursor(orders[-1]) if has_more else None
+    for order in orders:
+        order['total_amount'] = float(order['total_amount'])
+        order['order_date'] = order['order_date'].isoformat()
+        for item in order['items']:
+            item['price'] = float(item['price'])
+    
+    return {"orders": orders, "has_more": has_more, "next_cursor": next_cursor}
+
+@app.get("/customers/{customer_id}/orders", response_model=OrderPage)
+def get_customer_orders(
+    customer_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    token: str = Depends(verify_admin_token)
+):
+    """Get a customer's order history, newest first - Admin only
+
+    Follow `next_cursor` to page further back. Dates filter on order_date
+    (`date_from` inclusive, `date_to` exclusive). Customer ids are
+    sequential, so without customer authentication this stays behind the
+    admin token.
+    """
+    page = list_orders(limit, cursor, customer_id=customer_id, order_status=status,
+                       date_from=date_from, date_to=date_to)
+    if not page['orders'] and not cursor and not customer_exists(customer_id):
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return page
+
+@app.get("/orders", response_model=OrderPage)
+def get_orders(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    token: str = Depends(verify_admin_token)
+):
+    """List all orders, newest first - Admin only"""
+    return list_orders(limit, cursor, order_status=status, date_from=date_from, date_to=date_to)
+
+# Sales analytics (answered from the daily rollup tables)
+ANALYTICS_DEFAULT_DAYS = 30
+
+def analytics_date_range(date_from: Optional[date], date_to: Optional[date]):
+    """Default to the last 30 days and validate an inclusive date range"""
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    return date_from, date_to
+
+def format_sales_row(row):
+    """Convert rollup values to JSON-friendly types"""
+    if 'day' in row:
+        row['day'] = row['day'].isoformat()
+    row['revenue'] = float(row['revenue'])
+    row['units'] = int(row['units'])
+    row['order_count'] = int(row['order_count'])
+    return row
+
+def read_analytics(reader, *args):
+    """Run an analytics query and attach the roll-up watermark"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            rows = reader(cursor, *args)
+            last_order_id = analytics.get_last_rolled_up_order_id(cursor)
+    except Exception as e:
+        logger.error("Error reading sales analytics: %s", e)
+        raise HTTPException(status_code=500, detail="Error reading sales analytics")
+    return [format_sales_row(row) for row in rows], last_order_id
+
+@app.get("/admin/analytics/daily")
+def get_daily_sales(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    token: str = Depends(verify_admin_token)
+):
+    """Revenue, units and order count per day - Admin only"""
+    date_from, date_to = analytics_date_range(date_from, date_to)
+    days, last_order_id = read_analytics(analytics.get_daily_totals, date_from, date_to)
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "last_order_id": last_order_id,
+        "days": days,
+        "totals": {
+            "revenue": round(sum(day['revenue'] for day in days), 2),
+            "units": sum(day['units'] for day in days),
+            "order_count": sum(day['order_count'] for day in days)
+        }
+    }
+
+@app.get("/admin/analytics/categories")
+def get_category_sales(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None,
+    token: str = Depends(verify_admin_token)
+):
+    """Revenue, units and order count per category per day - Admin only"""
+    date_from, date_to = analytics_date_range(date_from, date_to)
+    rows, last_order_id = read_analytics(analytics.get_category_daily, date_from, date_to, category)
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "last_order_id": last_order_id,
+        "rows": rows
+    }
+
+@app.get("/admin/analytics/products")
+def get_product_sales(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = 20,
+    token: str = Depends(verify_admin_token)
+):
+    """Best-selling products by revenue over a date range - Admin only"""
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    date_from, date_to = analytics_date_range(date_from, date_to)
+    products, last_order_id = read_analytics(analytics.get_top_products, date_from, date_to, limit)
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "last_order_id": last_order_id,
+        "products": products
+    }
+
+@app.post("/admin/analytics/refresh")
+def refresh_sales_analytics(token: str = Depends(verify_admin_token)):
+    """Fold pending orders into the analytics rollups now - Admin only
+
+    Orders placed (or changed) since the previous run only become
+    eligible with this run, so they are folded in by the next one.
+    """
+    try:
+        processed = catch_up_sales_analytics()
+    except Exception as e:
+        logger.error("Error rolling up sales analytics: %s", e)
+        raise HTTPException(status_code=500, detail="Error refreshing sales analytics")
+    return {"orders_rolled_up": processed}
+
+# Reservation endpoints are `def`: their transactions run in the threadpool, off the event loop
+@app.post("/inventory/reservations", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
+def create_reservation(reservation: ReservationCreate):
+    """Hold stock for a checkout in progress - Public endpoint
+
+    The stock is released automatically after `ttl_seconds` unless the
+    reservation is used by POST /orders/ (via `reservation_id`).
+    """
+    if not reservation.items:
+        raise HTTPException(status_code=400, detail="Reservation must contain at least one item")
+    if any(item.quantity <= 0 for item in reservation.items):
+        raise HTTPException(status_code=400, detail="Item quantity must be positive")
+    if reservation.ttl_seconds < 1 or reservation.ttl_seconds > 3600:
+        raise HTTPException(status_code=400, detail="ttl_seconds must be between 1 and 3600")
+    
+    quantities = merge_order_items([item.model_dump() for item in reservation.items])
+    try:
+        reservation_id, expires_at = reserve_stock_in_db(quantities, reservation.ttl_seconds)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error creating reservation: %s", e)
+        raise HTTPException(status_code=500, detail="Error creating reservation")
+    
+    return {
+        "id": reservation_id,
+        "expires_at": expires_at.isoformat(),
+        "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in quantities.items()]
+    }
+
+@app.delete("/inventory/reservations/{reservation_id}")
+def cancel_reservation(reservation_id: int):
+    """Release a held reservation and return its stock - Public endpoint"""
+    try:
+        if not release_reservation_in_db(reservation_id):
+            raise HTTPException(status_code=404, detail="Reservation not found or no longer held")
+        return {"message": f"Reservation {reservation_id} released"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error releasing reservation %s: %s", reservation_id, e)
+        raise HTTPException(status_code=500, detail="Error releasing reservation")
+
 @app.get("/categories/")
 async def get_categories():
     """Get all unique categories with metadata - Public endpoint"""
@@ -969,9 +2587,26 @@ async def get_categories():
             "all_products_count": total_products
         }
     except Exception as e:
-        logger.error(f"Error fetching categories: {e}")
+        logger.error("Error fetching categories: %s", e)
         raise HTTPException(status_code=500, detail="Error fetching categories")
 
+@app.get("/events/catalog")
+async def catalog_events():
+    """Stream product upsert/delete and quantity-change events (SSE) - Public endpoint
+
+    Each event id is the catalog version after the change. Clients that
+    reconnect, or receive a `dropped` event, should catch up through
+    /products/changes?since=<last id>.
+    """
+    return StreamingResponse(
+        catalog_broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering (nginx)
+        }
+    )
+
 @app.get("/products/category/{category}", response_model=List[ProductResponse])
 async def get_products_by_category(category: str):
     """Get products by category - Public endpoint"""
@@ -1065,4 +2700,6 @@ def load_products_from_file():
 # Run the server
 if __name__ == "__main__":
     import uvicorn
+    with get_db_connection() as conn:
+        migrations.migrate(conn)
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,302 @@
+"""
+Prometheus-style metrics
+Counters, gauges and histograms rendered in the Prometheus text format
+for GET /metrics
+
+Each thread updates its own shard of plain dicts, so recording a value
+takes no lock; a scrape sums the shards. With several uvicorn workers,
+set METRICS_DIR to a directory shared by the workers: each process then
+writes its snapshot there every second and /metrics merges the
+snapshots of all workers (gauges of exited workers are dropped)
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds between per-process snapshot writes when METRICS_DIR is set
+METRICS_FLUSH_INTERVAL = 1.0
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _label_key(labels: dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(label_key, extra=()) -> str:
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    def __init__(self, registry, name):
+        self._registry = registry
+        self.name = name
+
+    def inc(self, amount: float = 1, **labels):
+        shard = self._registry._shard()
+        key = (self.name, _label_key(labels))
+        shard[key] = shard.get(key, 0) + amount
+
+class Gauge(Counter):
+    """Gauge summed across threads; use inc()/dec() around work in progress"""
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram:
+    def __init__(self, registry, name, buckets):
+        self._registry = registry
+        self.name = name
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        shard = self._registry._shard()
+        key = (self.name, _label_key(labels))
+        # Per-bucket counts (the last one is +Inf) followed by the sum
+        counts = shard.get(key)
+        if counts is None:
+            counts = shard[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+class MetricsRegistry:
+    """Holds metric definitions and the per-thread value shards"""
+
+    def __init__(self):
+        self._definitions = {}  # name -> (type, help, buckets)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._exporter = None
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        self._definitions[name] = ("counter", help_text, None)
+        return Counter(self, name)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        self._definitions[name] = ("gauge", help_text, None)
+        return Gauge(self, name)
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        self._definitions[name] = ("histogram", help_text, tuple(buckets))
+        return Histogram(self, name, buckets)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def collect(self) -> Dict[tuple, object]:
+        """Sum all thread shards of this process"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            # list() copies the items atomically under the GIL
+            for key, value in list(shard.items()):
+                _merge(totals, key, list(value) if isinstance(value, list) else value)
+        return totals
+
+    # Multi-process support
+
+    def start_exporter(self, directory: str, interval: float = METRICS_FLUSH_INTERVAL):
+        """Write this process's snapshot to `directory` every `interval` seconds"""
+        if self._exporter is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+
+        def export_loop():
+            while True:
+                try:
+                    self._write_snapshot()
+                except Exception:
+                    pass
+                time.sleep(interval)
+
+        self._exporter = threading.Thread(target=export_loop, name="metrics-exporter", daemon=True)
+        self._exporter.start()
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self._directory, f"metrics-{pid}.json")
+
+    def _write_snapshot(self):
+        snapshot = [[name, list(map(list, labels)), value] for (name, labels), value in self.collect().items()]
+        path = self._snapshot_path(os.getpid())
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def collect_all(self) -> Dict[tuple, object]:
+        """Sum this process with the snapshots of the other workers"""
+        totals = self.collect()
+        if self._exporter is None:
+            return totals
+
+        for filename in os.listdir(self._directory):
+            if not (filename.startswith("metrics-") and filename.endswith(".json")):
+                continue
+            pid = int(filename[len("metrics-"):-len(".json")])
+            if pid == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self._directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(pid)
+            for name, labels, value in snapshot:
+                definition = self._definitions.get(name)
+                if definition is None or (definition[0] == "gauge" and not alive):
+                    continue
+                _merge(totals, (name, tuple(map(tuple, labels))), value)
+        return totals
+
+    def render(self, values=None) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        if values is None:
+            values = self.collect_all()
+        by_name = {}
+        for (name, labels), value in values.items():
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (metric_type, help_text, buckets) in self._definitions.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in sorted(by_name.get(name, [])):
+                if metric_type != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), value[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+def _merge(totals: dict, key, value):
+    existing = totals.get(key)
+    if existing is None:
+        totals[key] = value
+    elif isinstance(value, list):
+        totals[key] = [a + b for a, b in zip(existing, value)]
+    else:
+        totals[key] = existing + value
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status codes and in-flight requests
+
+    Routes are labelled with their path template (e.g. /products/{product_id})
+    so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec(method=method)
+            route = getattr(scope.get("route"), "path", None) or scope.get("root_path") or "unmatched"
+            HTTP_REQUESTS.inc(method=method, route=route, status=status_code)
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+
+# Process-wide registry used by the app
+default_registry = MetricsRegistry()
+
+HTTP_IN_FLIGHT = default_registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served")
+HTTP_REQUESTS = default_registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status code")
+HTTP_LATENCY = default_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route, including the response body")
+
+DB_CONNECT_SECONDS = default_registry.histogram(
+    "db_connection_wait_seconds", "Time to obtain a database connection")
+DB_QUERY_SECONDS = default_registry.histogram(
+    "db_query_duration_seconds", "Database statement execution time by operation")
+IMAGE_PROCESSING_SECONDS = default_registry.histogram(
+    "image_processing_duration_seconds", "Image pipeline time by stage")
+CACHE_REQUESTS = default_registry.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)")
+
+def record_cache(cache: str, hit: bool):
+    """Count one cache lookup"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def query_operation(query: str) -> str:
+    """Leading SQL keyword (SELECT, INSERT, ...) used as a low-cardinality label"""
+    words = query.lstrip().split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in ("SELECT", "INSERT", "UPDATE", "DELETE", "SET") else "OTHER"
+
+def render_metrics() -> str:
+    """Render the default registry, adding cache hit ratio gauges"""
+    values = default_registry.collect_all()
+    text = default_registry.render(values)
+    cache_counts = {}
+    for (name, labels), value in values.items():
+        if name == "cache_requests_total":
+            label_map = dict(labels)
+            counts = cache_counts.setdefault(label_map["cache"], {"hit": 0, "miss": 0})
+            counts[label_map["result"]] += value
+    lines = ["# HELP cache_hit_ratio Share of cache lookups that were hits",
+             "# TYPE cache_hit_ratio gauge"]
+    for cache, counts in sorted(cache_counts.items()):
+        total = counts["hit"] + counts["miss"]
+        lines.append(f'cache_hit_ratio{{cache="{_escape(cache)}"}} {counts["hit"] / total if total else 0:g}')
+    return text + "\n".join(lines) + "\n"
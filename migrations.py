@@ -0,0 +1,414 @@
+"""
+Versioned schema migrations
+The schema version is recorded in `schema_migrations`; checking it costs
+a single query, so workers no longer create tables on import. Schema
+changes run only from the explicit migrate command (or the development
+server entry point):
+
+    python migrations.py migrate     apply pending migrations
+    python migrations.py status      show the applied and latest version
+
+Migrations run in order under a MySQL named lock, so concurrent deploys
+do not apply them twice. To change the schema, append a new
+(version, name, function) entry to MIGRATIONS; never edit an applied one
+"""
+
+import argparse
+import logging
+
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for another process that is migrating
+MIGRATION_LOCK_TIMEOUT = 60
+
+# Indexes added to tables that existed before them (CREATE TABLE IF NOT EXISTS skips them)
+ADDED_INDEXES = [
+    ("orders", "idx_customer_order_date", "customer_id, order_date"),
+    ("orders", "idx_status_order_date", "status, order_date"),
+]
+
+def ensure_index(cursor, table_name: str, index_name: str, columns: str):
+    """Create an index if the table does not have it yet"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.statistics 
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s 
+        LIMIT 1
+    """, (table_name, index_name))
+    if not cursor.fetchone():
+        cursor.execute(f"ALTER TABLE {table_name} ADD INDEX {index_name} ({columns})")
+        logger.info("Index %s added to %s", index_name, table_name)
+
+def create_baseline_schema(cursor):
+    """Version 1: every table the app uses, with proper schema and foreign keys
+
+    Uses IF NOT EXISTS, so it also adopts databases created before
+    migrations were versioned.
+    """
+    # Create customers table
+    create_customers_table = """
+    CREATE TABLE IF NOT EXISTS customers (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        first_name VARCHAR(100) NOT NULL,
+        last_name VARCHAR(100) NOT NULL,
+        phone_number VARCHAR(20) UNIQUE,
+        email VARCHAR(255) UNIQUE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_email (email),
+        INDEX idx_phone (phone_number)
+    ) ENGINE=InnoDB;
+    """
+
+    # Create products table
+    create_products_table = """
+    CREATE TABLE IF NOT EXISTS products (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        price DECIMAL(10, 2) NOT NULL,
+        quantity INT NOT NULL DEFAULT 0,
+        category VARCHAR(100) NOT NULL,
+        image_full_url VARCHAR(500),
+        image_main_url VARCHAR(500),
+        image_thumb_url VARCHAR(500),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        is_active BOOLEAN DEFAULT TRUE,
+        INDEX idx_category (category),
+        INDEX idx_title (title),
+        INDEX idx_is_active (is_active)
+    ) ENGINE=InnoDB;
+    """
+
+    # Create catalog_changes table (change log backing delta sync)
+    # Each row's version is the monotonic catalog version after the change
+    create_catalog_changes_table = """
+    CREATE TABLE IF NOT EXISTS catalog_changes (
+        version BIGINT AUTO_INCREMENT PRIMARY KEY,
+        product_id INT NOT NULL,
+        change_type ENUM('upsert', 'delete') NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_product_id (product_id)
+    ) ENGINE=InnoDB;
+    """
+
+    # Create shipping_addresses table
+    create_shipping_addresses_table = """
+    CREATE TABLE IF NOT EXISTS shipping_addresses (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        customer_id INT NOT NULL,
+        address_line1 VARCHAR(255) NOT NULL,
+        address_line2 VARCHAR(255),
+        city VARCHAR(100) NOT NULL,
+        country VARCHAR(100) NOT NULL,
+        zip_code VARCHAR(20) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+        INDEX idx_customer_id (customer_id)
+    ) ENGINE=InnoDB;
+    """
+
+    # Create orders table
+    create_orders_table = """
+    CREATE TABLE IF NOT EXISTS orders (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        customer_id INT NOT NULL,
+        shipping_address_id INT NOT NULL,
+        status ENUM('pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled') DEFAULT 'pending',
+        total_amount DECIMAL(10, 2) NOT NULL,
+        order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+        FOREIGN KEY (shipping_address_id) REFERENCES shipping_addresses(id) ON DELETE RESTRICT,
+        INDEX idx_customer_order_date (customer_id, order_date),
+        INDEX idx_status_order_date (status, order_date),
+        INDEX idx_order_date (order_date)
+    ) ENGINE=InnoDB;
+    """
+
+    # Create payment_details table
+    create_payment_details_table = """
+    CREATE TABLE IF NOT EXISTS payment_details (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        order_id INT NOT NULL,
+        payment_provider VARCHAR(50) NOT NULL,
+        payment_id VARCHAR(255) NOT NULL,
+        status ENUM('pending', 'completed', 'failed', 'refunded') DEFAULT 'pending',
+        currency VARCHAR(3) DEFAULT 'USD',
+        amount DECIMAL(10, 2) NOT NULL,
+        payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
+        INDEX idx_order_id (order_id),
+        INDEX idx_payment_id (payment_id),
+        INDEX idx_status (status)
+    ) ENGINE=InnoDB;
+    """
+
+    # Create order_items table (junction table for orders and products)
+    create_order_items_table = """
+    CREATE TABLE IF NOT EXISTS order_items (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        order_id INT NOT NULL,
+        product_id INT NOT NULL,
+        quantity INT NOT NULL,
+        price DECIMAL(10, 2) NOT NULL,
+        FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
+        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT,
+        INDEX idx_order_id (order_id),
+        INDEX idx_product_id (product_id)
+    ) ENGINE=InnoDB;
+    """
+
+    # Create inventory reservation tables (stock held for a limited time)
+    create_inventory_reservations_table = """
+    CREATE TABLE IF NOT EXISTS inventory_reservations (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        status ENUM('held', 'committed', 'released') NOT NULL DEFAULT 'held',
+        expires_at TIMESTAMP NOT NULL,
+        order_id INT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_status_expires_at (status, expires_at)
+    ) ENGINE=InnoDB;
+    """
+
+    create_inventory_reservation_items_table = """
+    CREATE TABLE IF NOT EXISTS inventory_reservation_items (
+        reservation_id INT NOT NULL,
+        product_id INT NOT NULL,
+        quantity INT NOT NULL,
+        PRIMARY KEY (reservation_id, product_id),
+        FOREIGN KEY (reservation_id) REFERENCES inventory_reservations(id) ON DELETE CASCADE,
+        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT
+    ) ENGINE=InnoDB;
+    """
+
+    # Create sales analytics rollup tables (maintained from orders by analytics.py)
+    create_sales_daily_table = """
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        day DATE PRIMARY KEY,
+        revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        units INT NOT NULL DEFAULT 0,
+        order_count INT NOT NULL DEFAULT 0
+    ) ENGINE=InnoDB;
+    """
+
+    create_sales_daily_category_table = """
+    CREATE TABLE IF NOT EXISTS sales_daily_category (
+        day DATE NOT NULL,
+        category VARCHAR(100) NOT NULL,
+        revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        units INT NOT NULL DEFAULT 0,
+        order_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, category),
+        INDEX idx_category_day (category, day)
+    ) ENGINE=InnoDB;
+    """
+
+    create_sales_daily_product_table = """
+    CREATE TABLE IF NOT EXISTS sales_daily_product (
+        day DATE NOT NULL,
+        product_id INT NOT NULL,
+        revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        units INT NOT NULL DEFAULT 0,
+        order_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, product_id),
+        INDEX idx_product_day (product_id, day)
+    ) ENGINE=InnoDB;
+    """
+
+    create_analytics_rollup_state_table = """
+    CREATE TABLE IF NOT EXISTS analytics_rollup_state (
+        name VARCHAR(50) PRIMARY KEY,
+        last_order_id INT NOT NULL DEFAULT 0,
+        seen_order_id INT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB;
+    """
+
+    # Create order_idempotency_keys table (Idempotency-Key -> stored checkout response)
+    create_order_idempotency_keys_table = """
+    CREATE TABLE IF NOT EXISTS order_idempotency_keys (
+        idempotency_key VARCHAR(128) PRIMARY KEY,
+        request_hash CHAR(64) NOT NULL,
+        order_id INT NULL,
+        response TEXT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_created_at (created_at)
+    ) ENGINE=InnoDB;
+    """
+
+    # Create payment reconciliation tables (written by reconciliation.py)
+    create_reconciliation_issues_table = """
+    CREATE TABLE IF NOT EXISTS reconciliation_issues (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        order_id INT NULL,
+        payment_id VARCHAR(255) NULL,
+        issue_type ENUM('missing_payment', 'amount_mismatch', 'paid_cancelled_order', 'orphan_payment',
+                        'unknown_settlement', 'settlement_amount_mismatch', 'settlement_status_mismatch',
+                        'missing_from_settlement') NOT NULL,
+        expected_amount DECIMAL(10, 2) NULL,
+        actual_amount DECIMAL(10, 2) NULL,
+        details VARCHAR(255),
+        source ENUM('database', 'settlement') NOT NULL,
+        resolved BOOLEAN DEFAULT FALSE,
+        detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_order_id (order_id),
+        INDEX idx_payment_id (payment_id),
+        INDEX idx_resolved_type (resolved, issue_type)
+    ) ENGINE=InnoDB;
+    """
+
+    create_reconciliation_state_table = """
+    CREATE TABLE IF NOT EXISTS reconciliation_state (
+        name VARCHAR(50) PRIMARY KEY,
+        last_order_id INT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB;
+    """
+
+    # Execute table creation queries in correct order for foreign keys
+    tables = [
+        ("customers", create_customers_table),
+        ("products", create_products_table),
+        ("catalog_changes", create_catalog_changes_table),
+        ("shipping_addresses", create_shipping_addresses_table),
+        ("orders", create_orders_table),
+        ("payment_details", create_payment_details_table),
+        ("order_items", create_order_items_table),
+        ("inventory_reservations", create_inventory_reservations_table),
+        ("inventory_reservation_items", create_inventory_reservation_items_table),
+        ("sales_daily", create_sales_daily_table),
+        ("sales_daily_category", create_sales_daily_category_table),
+        ("sales_daily_product", create_sales_daily_product_table),
+        ("analytics_rollup_state", create_analytics_rollup_state_table),
+        ("order_idempotency_keys", create_order_idempotency_keys_table),
+        ("reconciliation_issues", create_reconciliation_issues_table),
+        ("reconciliation_state", create_reconciliation_state_table)
+    ]
+    
+    for table_name, query in tables:
+        cursor.execute(query)
+        logger.info("Table %s created/verified successfully", table_name)
+    
+    # Add indexes introduced after a table was first created
+    for table_name, index_name, columns in ADDED_INDEXES:
+        ensure_index(cursor, table_name, index_name, columns)
+
+def add_catalog_version_counter(cursor):
+    """Version 2: allocate catalog versions from a locked counter row
+
+    AUTO_INCREMENT ids are handed out at insert time, so transactions could
+    commit their catalog_changes rows out of version order and delta-sync
+    clients that had moved past a version would never see it. Writers now
+    bump the single counter row inside their transaction; its row lock is
+    held until commit, so versions become visible in order.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id TINYINT PRIMARY KEY,
+            version BIGINT NOT NULL
+        ) ENGINE=InnoDB
+    """)
+    cursor.execute("""
+        INSERT IGNORE INTO catalog_version (id, version) 
+        SELECT 1, COALESCE(MAX(version), 0) FROM catalog_changes
+    """)
+    cursor.execute("ALTER TABLE catalog_changes MODIFY version BIGINT NOT NULL")
+
+def add_order_change_tracking(cursor):
+    """Version 3: track order updates so analytics can re-roll changed days
+
+    orders.updated_at is set by MySQL on any change (status, amounts);
+    analytics_rollup_state gets a second watermark pair for it.
+    """
+    cursor.execute("""
+        ALTER TABLE orders 
+        ADD COLUMN updated_at TIMESTAMP NULL DEFAULT NULL ON UPDATE CURRENT_TIMESTAMP, 
+        ADD INDEX idx_updated_at (updated_at)
+    """)
+    cursor.execute("""
+        ALTER TABLE analytics_rollup_state 
+        ADD COLUMN changes_checked_at TIMESTAMP NULL DEFAULT NULL, 
+        ADD COLUMN changes_seen_at TIMESTAMP NULL DEFAULT NULL
+    """)
+
+def add_settlement_currency_mismatch(cursor):
+    """Version 4: report settlement currency mismatches as their own issue type"""
+    cursor.execute("""
+        ALTER TABLE reconciliation_issues 
+        MODIFY issue_type ENUM('missing_payment', 'amount_mismatch', 'paid_cancelled_order', 'orphan_payment',
+                               'unknown_settlement', 'settlement_amount_mismatch', 'settlement_currency_mismatch',
+                               'settlement_status_mismatch', 'missing_from_settlement') NOT NULL
+    """)
+
+# (version, name, function(cursor)) in order
+MIGRATIONS = [
+    (1, "baseline schema", create_baseline_schema),
+    (2, "catalog version counter", add_catalog_version_counter),
+    (3, "order change tracking", add_order_change_tracking),
+    (4, "settlement currency mismatch issue type", add_settlement_currency_mismatch),
+]
+
+# Schema version this code expects
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(cursor) -> int:
+    """Latest applied migration (0 for a database without schema_migrations)"""
+    try:
+        cursor.execute("SELECT MAX(version) AS version FROM schema_migrations")
+    except pymysql.err.ProgrammingError:
+        return 0
+    row = cursor.fetchone()
+    if not row:
+        return 0
+    return (row['version'] if isinstance(row, dict) else row[0]) or 0
+
+def migrate(connection) -> list:
+    """Apply pending migrations; returns the versions applied"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT GET_LOCK('trendyoft_schema_migrations', %s) AS acquired", (MIGRATION_LOCK_TIMEOUT,))
+    row = cursor.fetchone()
+    if not (row['acquired'] if isinstance(row, dict) else row[0]):
+        raise RuntimeError("Timed out waiting for another migration to finish")
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB
+        """)
+        current = get_schema_version(cursor)
+        applied = []
+        for version, name, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info("Applying migration %s: %s", version, name)
+            apply(cursor)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            connection.commit()
+            applied.append(version)
+        return applied
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK('trendyoft_schema_migrations')")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("command", choices=["migrate", "status"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from generate_static_site import DB_CONFIG
+
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        if args.command == "migrate":
+            applied = migrate(connection)
+            print(f"✅ Applied migrations {applied}" if applied else "✅ Schema is up to date")
+        print(f"   Schema version {get_schema_version(connection.cursor())} (latest {SCHEMA_VERSION})")
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    main()
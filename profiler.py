@@ -0,0 +1,172 @@
+"""
+Sampling profiler for live workers
+A background thread snapshots the Python stack of every thread with
+sys._current_frames() at a fixed interval and counts identical stacks.
+The result is written in the collapsed-stack format read by flamegraph.pl,
+speedscope and inferno: one `thread;outer;...;inner count` line per stack
+
+Sampling costs one stack walk per thread per interval and nothing on the
+profiled threads themselves, so it is safe to run on a production worker.
+Only one profile runs per process at a time
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+# Seconds between samples (100 Hz)
+DEFAULT_INTERVAL = 0.01
+
+# Deepest stack recorded per sample; deeper frames are cut at the root
+MAX_STACK_DEPTH = 128
+
+# Leaf frames of threads that are blocked waiting for work; dropped unless include_idle
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("profiler.py", "profile"),
+}
+
+_active_lock = threading.Lock()
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already running in this process"""
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Counts stacks of all threads until stopped
+
+    Use as a context manager, or call start() and stop(); stop() returns
+    {collapsed stack: sample count}.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples = 0
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_names = {}
+
+    def start(self):
+        if not _active_lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        self._thread.join()
+        _active_lock.release()
+        return dict(self._stacks)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+
+    def _thread_name(self, thread_id) -> str:
+        name = self._thread_names.get(thread_id)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names.get(thread_id, f"thread-{thread_id}")
+        return name
+
+    def _sample(self, own_id):
+        self.samples += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            code = frame.f_code
+            if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(self._thread_name(thread_id))
+            labels.reverse()
+            self._stacks[";".join(labels)] += 1
+
+def collapse(stacks: Dict[str, int]) -> str:
+    """Render {stack: count} as collapsed-stack lines, most frequent first"""
+    lines = [f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda item: -item[1])]
+    return "\n".join(lines) + "\n" if lines else ""
+
+def profile(seconds: float, interval: float = DEFAULT_INTERVAL, include_idle: bool = False) -> str:
+    """Sample the whole process for `seconds` and return collapsed stacks (blocking)"""
+    sampler = StackSampler(interval, include_idle).start()
+    try:
+        time.sleep(seconds)
+    finally:
+        stacks = sampler.stop()
+    return collapse(stacks)
+
+class RequestProfilerMiddleware:
+    """Profile single requests on demand
+
+    A request sent with `X-Profile: <admin token>` runs normally, but the
+    response body is replaced by the collapsed stacks sampled while it ran
+    (text/plain); the original status code is returned in
+    X-Profile-Status. All threads are sampled, so on a busy worker stacks
+    of concurrent requests appear as well.
+    """
+
+    def __init__(self, app, token: str, interval: float = DEFAULT_INTERVAL):
+        self.app = app
+        self.token = token.encode("utf-8")
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or dict(scope["headers"]).get(b"x-profile") != self.token:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def discard_response(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        try:
+            sampler = StackSampler(self.interval).start()
+        except ProfilerBusy:
+            await _send_text(send, 409, "A profile is already running in this worker\n")
+            return
+        try:
+            await self.app(scope, receive, discard_response)
+        finally:
+            stacks = sampler.stop()
+        await _send_text(send, 200, collapse(stacks), [
+            (b"x-profile-status", str(status_code).encode()),
+            (b"x-profile-samples", str(sampler.samples).encode()),
+        ])
+
+async def _send_text(send, status_code: int, text: str, headers=()):
+    body = text.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
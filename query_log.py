@@ -0,0 +1,167 @@
+"""
+Query-level instrumentation
+Every statement run through InstrumentedDictCursor is timed and recorded
+with its fingerprint, row count and call site in the current request's
+log. Statements slower than SLOW_QUERY_MS go to the slow-query log, and at
+the end of each request repeated identical statements (N+1 patterns) and
+re-selects of rows the request just wrote are reported as warnings
+"""
+
+import functools
+import logging
+import os
+import re
+import sys
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import pymysql
+
+from metrics import DB_QUERY_SECONDS, query_operation
+from server_timing import add_timing
+
+# Statements at least this slow (milliseconds) are written to the slow-query log
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+
+# Identical statements per request that trigger an N+1 warning
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '5'))
+
+slow_query_logger = logging.getLogger("trendyoft.slow_query")
+logger = logging.getLogger("trendyoft.query_log")
+
+# Modules skipped when looking for the application frame that ran a query
+_SKIPPED_MODULES = ("pymysql", "query_log", "contextlib")
+
+_LITERAL_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_LITERAL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+_CASE_ARMS = re.compile(r"(WHEN \? THEN \?)(?: WHEN \? THEN \?)+")
+_PRIMARY_KEY_SELECT = re.compile(r"^SELECT .* FROM (\w+) WHERE id = \?", re.IGNORECASE)
+_WRITE_TARGET = re.compile(r"^(?:INSERT INTO|UPDATE|DELETE FROM) (\w+)", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(query: str) -> str:
+    """Normalize a statement so executions differing only in values match
+
+    Literals and placeholders become `?`, and value/IN lists and CASE
+    arms of any length collapse, e.g. `WHERE id IN (?, ?, ?)` becomes
+    `WHERE id IN (...)`.
+    """
+    normalized = " ".join(query.split())
+    normalized = _LITERAL_STRING.sub("?", normalized)
+    normalized = _LITERAL_NUMBER.sub("?", normalized)
+    normalized = normalized.replace("%s", "?")
+    normalized = _VALUE_LISTS.sub("(...)", normalized)
+    return _CASE_ARMS.sub(r"\1 ...", normalized)
+
+def call_site() -> str:
+    """Describe the innermost application frame, e.g. main.py:412 in get_products_from_db"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(_SKIPPED_MODULES):
+            return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+@dataclass
+class QueryRecord:
+    fingerprint: str
+    duration: float
+    rows: int
+    call_site: str
+
+@dataclass
+class RequestQueryLog:
+    """Statements run while handling one request"""
+    label: str
+    queries: List[QueryRecord] = field(default_factory=list)
+
+    @property
+    def total_duration(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def report(self):
+        """Log N+1 patterns and re-selects after writes for this request"""
+        counts = {}
+        for query in self.queries:
+            counts[query.fingerprint] = counts.get(query.fingerprint, 0) + 1
+        for statement, count in counts.items():
+            if count >= N_PLUS_ONE_THRESHOLD:
+                sites = sorted({query.call_site for query in self.queries if query.fingerprint == statement})
+                logger.warning("Possible N+1 in %s: %s x %s (from %s)", self.label, count, statement, ', '.join(sites))
+
+        written = set()
+        for query in self.queries:
+            write = _WRITE_TARGET.match(query.fingerprint)
+            if write:
+                written.add(write.group(1).lower())
+                continue
+            select = _PRIMARY_KEY_SELECT.match(query.fingerprint)
+            if select and select.group(1).lower() in written:
+                logger.warning(
+                    "Re-select after write in %s: %s (%s); build the result from the written values instead",
+                    self.label, query.fingerprint, query.call_site
+                )
+
+        if self.queries and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s: %s statements in %.1f ms", self.label, len(self.queries), self.total_duration * 1000)
+
+_current_log: ContextVar[Optional[RequestQueryLog]] = ContextVar("request_query_log", default=None)
+
+def current_query_log() -> Optional[RequestQueryLog]:
+    """Query log of the request being handled (None outside requests)"""
+    return _current_log.get()
+
+def record_query(query: str, duration: float, rows: int):
+    """Record one executed statement in /metrics and the request query log"""
+    DB_QUERY_SECONDS.observe(duration, operation=query_operation(query))
+    add_timing("db_query", duration)
+    log = _current_log.get()
+    slow = duration * 1000 >= SLOW_QUERY_MS
+    if log is None and not slow:
+        return
+
+    record = QueryRecord(fingerprint(query), duration, rows, call_site())
+    if log is not None:
+        log.queries.append(record)
+    if slow:
+        slow_query_logger.warning(
+            "Slow query %.1f ms, %s rows, %s%s: %s",
+            duration * 1000, rows, record.call_site, f" [{log.label}]" if log else "", record.fingerprint,
+            extra={"duration_ms": round(duration * 1000, 1), "rows": rows, "fingerprint": record.fingerprint}
+        )
+
+class InstrumentedDictCursor(pymysql.cursors.DictCursor):
+    """DictCursor that times statements for /metrics and the request query log"""
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            record_query(query, time.perf_counter() - start, self.rowcount)
+
+class QueryLogMiddleware:
+    """ASGI middleware giving each request its own query log"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = RequestQueryLog(f"{scope['method']} {scope['path']}")
+        token = _current_log.set(log)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_log.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                log.label = f"{scope['method']} {route}"
+            log.report()
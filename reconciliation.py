@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Payment reconciliation
+Checks payment_details against orders.total_amount, and provider
+settlement files against payment_details, recording every mismatch in
+reconciliation_issues
+
+Order reconciliation streams orders and payments in order_id order from
+two unbuffered cursors and merge-joins them, continuing from the last
+reconciled order id, so a nightly run only reads new orders. Settlement
+imports build a hash index of the file on payment_id and probe it with
+the matching payment_details rows.
+
+Usage:
+    python reconciliation.py run
+    python reconciliation.py settlement stripe-2025-07-31.csv --provider stripe \\
+        --from 2025-07-31 --to 2025-08-01
+"""
+
+import argparse
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pymysql
+
+# Orders younger than this are left for a later run (payments may still be settling)
+RECONCILE_SETTLE_HOURS = 24
+
+# Orders checked per transaction (issues and the watermark commit together)
+RECONCILE_FLUSH_ORDERS = 1000
+
+# Settlement payment ids looked up per query
+SETTLEMENT_LOOKUP_CHUNK = 1000
+
+# Watermark row in reconciliation_state
+RECONCILE_STATE_NAME = "payments"
+
+# Allowed rounding difference between amounts
+AMOUNT_TOLERANCE = Decimal("0.01")
+
+ISSUE_TYPES = (
+    "missing_payment",
+    "amount_mismatch",
+    "paid_cancelled_order",
+    "orphan_payment",
+    "unknown_settlement",
+    "settlement_amount_mismatch",
+    "settlement_currency_mismatch",
+    "settlement_status_mismatch",
+    "missing_from_settlement",
+)
+
+class ReconciliationBusy(Exception):
+    """Raised when another reconciliation run holds the lock"""
+
+class SettlementFileError(Exception):
+    """Raised when a settlement file cannot be parsed"""
+
+def _stream_rows(db_config: dict, query: str, params) -> Iterator[dict]:
+    """Yield rows from an unbuffered server-side cursor on its own connection
+
+    The connection is closed directly when the consumer stops early, so
+    unread rows are not drained from the server first.
+    """
+    connection = pymysql.connect(**{**db_config, "cursorclass": pymysql.cursors.SSDictCursor})
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        for row in cursor:
+            yield row
+    finally:
+        if connection.open:
+            connection.close()
+
+def merge_orders_and_payments(orders: Iterable[dict], payments: Iterable[dict]) -> Iterator[Tuple[Optional[dict], List[dict]]]:
+    """Merge-join two streams sorted by order id
+
+    Yields (order, payments_for_order) for every order, and (None, payments)
+    for payments whose order id is not in the order stream. Both inputs are
+    read once, so memory holds one order's payments at a time.
+    """
+    payments = iter(payments)
+    payment = next(payments, None)
+    for order in orders:
+        orphans = []
+        while payment is not None and payment['order_id'] < order['id']:
+            orphans.append(payment)
+            payment = next(payments, None)
+        if orphans:
+            yield None, orphans
+
+        matched = []
+        while payment is not None and payment['order_id'] == order['id']:
+            matched.append(payment)
+            payment = next(payments, None)
+        yield order, matched
+
+def check_order(order: Optional[dict], payments: List[dict]) -> List[dict]:
+    """Return the issues for one order and its payments
+
+    Only `completed` payments count towards the amount paid.
+    """
+    if order is None:
+        return [
+            issue("orphan_payment", order_id=payment['order_id'], payment_id=payment['payment_id'],
+                  actual_amount=payment['amount'], details="Payment has no matching order")
+            for payment in payments
+        ]
+
+    paid = sum((payment['amount'] for payment in payments if payment['status'] == 'completed'), Decimal("0"))
+    if order['status'] == 'cancelled':
+        if paid > 0:
+            return [issue("paid_cancelled_order", order_id=order['id'], expected_amount=Decimal("0"),
+                          actual_amount=paid, details="Cancelled order has completed payments")]
+        return []
+
+    if not any(payment['status'] == 'completed' for payment in payments):
+        statuses = ", ".join(sorted({payment['status'] for payment in payments})) or "none"
+        return [issue("missing_payment", order_id=order['id'], expected_amount=order['total_amount'],
+                      actual_amount=paid, details=f"No completed payment (payments: {statuses})")]
+
+    if abs(paid - order['total_amount']) > AMOUNT_TOLERANCE:
+        return [issue("amount_mismatch", order_id=order['id'], expected_amount=order['total_amount'],
+                      actual_amount=paid, details=f"{len(payments)} payment(s)")]
+    return []
+
+def issue(issue_type: str, order_id=None, payment_id=None, expected_amount=None, actual_amount=None,
+          details: str = "", source: str = "database") -> dict:
+    """Build a reconciliation_issues row"""
+    return {
+        "order_id": order_id,
+        "payment_id": payment_id,
+        "issue_type": issue_type,
+        "expected_amount": expected_amount,
+        "actual_amount": actual_amount,
+        "details": details[:255],
+        "source": source,
+    }
+
+def insert_issues(cursor, issues: List[dict]):
+    """Write issues with one multi-row INSERT"""
+    if not issues:
+        return
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(issues))
+    values = []
+    for row in issues:
+        values.extend((row['order_id'], row['payment_id'], row['issue_type'], row['expected_amount'],
+                       row['actual_amount'], row['details'], row['source']))
+    cursor.execute(f"""
+        INSERT INTO reconciliation_issues
+            (order_id, payment_id, issue_type, expected_amount, actual_amount, details, source)
+        VALUES {placeholders}
+    """, values)
+
+def without_open_duplicates(cursor, issues: List[dict]) -> List[dict]:
+    """Drop issues already recorded, unresolved, for the same payment and type
+
+    Settlement files are often imported more than once; only issues not
+    already open are new. Looked up in chunks on idx_payment_id.
+    """
+    payment_ids = sorted({row['payment_id'] for row in issues if row['payment_id'] is not None})
+    open_issues = set()
+    for start in range(0, len(payment_ids), SETTLEMENT_LOOKUP_CHUNK):
+        chunk = payment_ids[start:start + SETTLEMENT_LOOKUP_CHUNK]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(f"""
+            SELECT payment_id, issue_type FROM reconciliation_issues
+            WHERE payment_id IN ({placeholders}) AND resolved = FALSE
+        """, chunk)
+        open_issues.update((row['payment_id'], row['issue_type']) for row in cursor.fetchall())
+    return [row for row in issues if (row['payment_id'], row['issue_type']) not in open_issues]
+
+def _acquire_run_lock(cursor):
+    """Take a server-wide named lock so only one run is active at a time"""
+    cursor.execute("SELECT GET_LOCK('trendyoft_reconciliation', 0) AS acquired")
+    if not cursor.fetchone()['acquired']:
+        raise ReconciliationBusy()
+
+def reconcile_orders(db_config: dict, settle_hours: int = RECONCILE_SETTLE_HOURS,
+                     flush_orders: int = RECONCILE_FLUSH_ORDERS) -> dict:
+    """Reconcile orders placed since the last run against their payments
+
+    Stops at the first order younger than `settle_hours`, so the watermark
+    never skips an order that is not yet settled. Issues and the new
+    watermark are committed together every `flush_orders` orders, so an
+    interrupted run resumes without duplicating issues. Raises
+    ReconciliationBusy if another run is in progress.
+    """
+    connection = pymysql.connect(**db_config)
+    summary = {"orders_checked": 0, "issues": 0, "issue_counts": {}, "last_order_id": None}
+    try:
+        cursor = connection.cursor()
+        _acquire_run_lock(cursor)
+        cursor.execute(
+            "INSERT IGNORE INTO reconciliation_state (name, last_order_id) VALUES (%s, 0)",
+            (RECONCILE_STATE_NAME,)
+        )
+        cursor.execute(
+            "SELECT last_order_id, NOW() - INTERVAL %s HOUR AS cutoff FROM reconciliation_state WHERE name = %s",
+            (settle_hours, RECONCILE_STATE_NAME)
+        )
+        state = cursor.fetchone()
+        last_order_id = state['last_order_id']
+        cutoff = state['cutoff']
+
+        orders = _stream_rows(db_config, """
+            SELECT id, total_amount, status, order_date FROM orders WHERE id > %s ORDER BY id
+        """, (last_order_id,))
+        payments = _stream_rows(db_config, """
+            SELECT order_id, payment_id, status, amount FROM payment_details
+            WHERE order_id > %s ORDER BY order_id, id
+        """, (last_order_id,))
+
+        pending_issues = []
+        pending_orders = 0
+
+        def flush():
+            connection.begin()
+            try:
+                insert_issues(cursor, pending_issues)
+                cursor.execute(
+                    "UPDATE reconciliation_state SET last_order_id = %s WHERE name = %s",
+                    (last_order_id, RECONCILE_STATE_NAME)
+                )
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            for row in pending_issues:
+                summary["issue_counts"][row['issue_type']] = summary["issue_counts"].get(row['issue_type'], 0) + 1
+            summary["issues"] += len(pending_issues)
+            pending_issues.clear()
+
+        orphan_issues = []
+        try:
+            for order, order_payments in merge_orders_and_payments(orders, payments):
+                if order is None:
+                    # Orphans precede the next order and are recorded with it, so
+                    # the watermark persisted alongside always covers their ids
+                    orphan_issues = check_order(None, order_payments)
+                    continue
+                if order['order_date'] >= cutoff:
+                    break
+                pending_issues.extend(orphan_issues)
+                orphan_issues = []
+                pending_issues.extend(check_order(order, order_payments))
+                last_order_id = order['id']
+                pending_orders += 1
+                summary["orders_checked"] += 1
+                if pending_orders >= flush_orders:
+                    flush()
+                    pending_orders = 0
+            if pending_orders or pending_issues:
+                flush()
+        finally:
+            orders.close()
+            payments.close()
+
+        summary["last_order_id"] = last_order_id
+        return summary
+    finally:
+        if connection.open:
+            connection.close()
+
+def parse_settlement_file(fileobj) -> Dict[str, dict]:
+    """Build a hash index payment_id -> settlement row from a provider CSV
+
+    Required columns: payment_id, amount. Optional: status, currency.
+    Raises SettlementFileError on bad rows.
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        missing = {"payment_id", "amount"} - set(reader.fieldnames or [])
+        if missing:
+            raise SettlementFileError(f"Missing columns: {', '.join(sorted(missing))}")
+
+        settlements = {}
+        for row_number, row in enumerate(reader, start=1):
+            payment_id = (row.get("payment_id") or "").strip()
+            if not payment_id:
+                raise SettlementFileError(f"Row {row_number}: payment_id is required")
+            try:
+                amount = Decimal((row.get("amount") or "").strip())
+            except InvalidOperation:
+                raise SettlementFileError(f"Row {row_number}: amount must be a number")
+            settlements[payment_id] = {
+                "amount": amount,
+                "status": (row.get("status") or "completed").strip().lower(),
+                "currency": (row.get("currency") or "").strip().upper() or None,
+            }
+        return settlements
+    finally:
+        text.detach()
+
+def check_settlement(payment_id: str, settled: dict, payment: Optional[dict]) -> List[dict]:
+    """Compare one settlement row with its payment_details row (None if absent)"""
+    if payment is None:
+        return [issue("unknown_settlement", payment_id=payment_id, actual_amount=settled['amount'],
+                      details="Settled payment not found in payment_details", source="settlement")]
+
+    issues = []
+    if abs(payment['amount'] - settled['amount']) > AMOUNT_TOLERANCE:
+        issues.append(issue("settlement_amount_mismatch", order_id=payment['order_id'], payment_id=payment_id,
+                            expected_amount=payment['amount'], actual_amount=settled['amount'],
+                            details="Settled amount differs from payment_details", source="settlement"))
+    if settled['currency'] and payment['currency'] and settled['currency'] != payment['currency'].upper():
+        issues.append(issue("settlement_currency_mismatch", order_id=payment['order_id'], payment_id=payment_id,
+                            expected_amount=payment['amount'], actual_amount=settled['amount'],
+                            details=f"Currency {settled['currency']} != {payment['currency']}", source="settlement"))
+    if settled['status'] != payment['status']:
+        issues.append(issue("settlement_status_mismatch", order_id=payment['order_id'], payment_id=payment_id,
+                            expected_amount=payment['amount'], actual_amount=settled['amount'],
+                            details=f"Provider status {settled['status']} != {payment['status']}",
+                            source="settlement"))
+    return issues
+
+def reconcile_settlement(db_config: dict, settlements: Dict[str, dict], provider: str,
+                         date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> dict:
+    """Check a parsed settlement file against payment_details
+
+    Every settled payment is looked up by payment_id (chunked IN queries on
+    idx_payment_id). With a date range, completed payments from that
+    provider in the range are streamed and probed against the settlement
+    hash index to find payments the provider never settled. Issues still
+    open from an earlier import are not recorded (or counted) again.
+    """
+    connection = pymysql.connect(**db_config)
+    issues = []
+    try:
+        cursor = connection.cursor()
+        payment_ids = sorted(settlements)
+        for start in range(0, len(payment_ids), SETTLEMENT_LOOKUP_CHUNK):
+            chunk = payment_ids[start:start + SETTLEMENT_LOOKUP_CHUNK]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"""
+                SELECT order_id, payment_id, status, currency, amount FROM payment_details
+                WHERE payment_provider = %s AND payment_id IN ({placeholders})
+            """, [provider] + chunk)
+            found = {row['payment_id']: row for row in cursor.fetchall()}
+            for payment_id in chunk:
+                issues.extend(check_settlement(payment_id, settlements[payment_id], found.get(payment_id)))
+
+        if date_from is not None and date_to is not None:
+            for payment in _stream_rows(db_config, """
+                SELECT order_id, payment_id, amount FROM payment_details
+                WHERE payment_provider = %s AND status = 'completed'
+                  AND payment_date >= %s AND payment_date < %s
+            """, (provider, date_from, date_to)):
+                if payment['payment_id'] not in settlements:
+                    issues.append(issue("missing_from_settlement", order_id=payment['order_id'],
+                                        payment_id=payment['payment_id'], expected_amount=payment['amount'],
+                                        details=f"Completed {provider} payment missing from settlement file",
+                                        source="settlement"))
+
+        connection.begin()
+        try:
+            issues = without_open_duplicates(cursor, issues)
+            for start in range(0, len(issues), RECONCILE_FLUSH_ORDERS):
+                insert_issues(cursor, issues[start:start + RECONCILE_FLUSH_ORDERS])
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+    finally:
+        if connection.open:
+            connection.close()
+
+    issue_counts = {}
+    for row in issues:
+        issue_counts[row['issue_type']] = issue_counts.get(row['issue_type'], 0) + 1
+    return {"settlements": len(settlements), "issues": len(issues), "issue_counts": issue_counts}
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Payment reconciliation")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="Reconcile new orders against payment_details")
+    settlement = commands.add_parser("settlement", help="Check a provider settlement CSV")
+    settlement.add_argument("file", help="Settlement CSV (payment_id, amount[, status, currency])")
+    settlement.add_argument("--provider", required=True, help="payment_provider value in payment_details")
+    settlement.add_argument("--from", dest="date_from", type=datetime.fromisoformat,
+                            help="Settlement period start (inclusive)")
+    settlement.add_argument("--to", dest="date_to", type=datetime.fromisoformat,
+                            help="Settlement period end (exclusive)")
+    args = parser.parse_args()
+
+    from generate_static_site import DB_CONFIG
+
+    if args.command == "run":
+        summary = reconcile_orders(DB_CONFIG)
+        print(f"✅ Checked {summary['orders_checked']} orders up to id {summary['last_order_id']}, "
+              f"{summary['issues']} issue(s) {summary['issue_counts']}")
+    else:
+        with open(args.file, "rb") as fileobj:
+            settlements = parse_settlement_file(fileobj)
+        summary = reconcile_settlement(DB_CONFIG, settlements, args.provider, args.date_from, args.date_to)
+        print(f"✅ Checked {summary['settlements']} settlements, {summary['issues']} issue(s) {summary['issue_counts']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Per-request timing breakdown in Server-Timing headers
+Code paths attribute their time to a phase with span("name") (or
+add_timing() for durations measured elsewhere); ServerTimingMiddleware
+collects the phases of each request and sends them as
+
+    Server-Timing: db_connect;dur=0.8;desc="2x", db_query;dur=3.1;desc="4x", ..., total;dur=12.4
+
+Phases: db_connect, db_query, cache, serialize (formatting loops and
+response model validation/encoding), image_process. Phases can nest (a
+catalog cache rebuild runs queries), so they need not add up to total.
+
+Headers expose internals, so they are off unless SERVER_TIMING=1; the
+benchmarks always enable them. Without the middleware span() only reads
+a ContextVar
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+
+# phase -> [seconds, count] for the request being handled
+_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("server_timings", default=None)
+
+def add_timing(name: str, seconds: float):
+    """Attribute `seconds` to a phase of the current request (no-op outside timed requests)"""
+    timings = _timings.get()
+    if timings is None:
+        return
+    entry = timings.get(name)
+    if entry is None:
+        timings[name] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+@contextmanager
+def span(name: str):
+    """Attribute the duration of a with-block to a phase"""
+    if _timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - start)
+
+def render_header(timings: Dict[str, List[float]], total: float) -> str:
+    entries = [f'{name};dur={seconds * 1000:.2f};desc="{count}x"' for name, (seconds, count) in timings.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+def instrument_response_serialization():
+    """Time FastAPI's response model validation and encoding as `serialize`
+
+    Wraps fastapi.routing.serialize_response, which request handlers look
+    up by name on every call.
+    """
+    import fastapi.routing
+
+    original = fastapi.routing.serialize_response
+    if getattr(original, "_server_timing", False):
+        return
+
+    async def timed_serialize_response(*args, **kwargs):
+        with span("serialize"):
+            return await original(*args, **kwargs)
+
+    timed_serialize_response._server_timing = True
+    fastapi.routing.serialize_response = timed_serialize_response
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a Server-Timing header with the request's phases
+
+    The header is sent with the response start, so for streamed responses
+    it covers the time until the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        instrument_response_serialization()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                header = render_header(timings, time.perf_counter() - start)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        token = _timings.set(timings)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
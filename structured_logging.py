@@ -0,0 +1,210 @@
+"""
+Structured, asynchronous logging
+Request threads only filter a record and put it on a bounded queue; a
+QueueListener thread formats it (JSON by default) and writes it out, so
+log I/O stays off the request path. Every record carries the id of the
+request it was logged under (X-Request-ID, generated when absent)
+
+Noisy loggers can be sampled and rate limited per logger name:
+    LOG_SAMPLING="main=0.1,catalog_cache=0.5"   keep 10% / 50% of records below WARNING
+    LOG_RATE_LIMITS="trendyoft.slow_query=20"   at most 20 records per second, any level
+Rules apply to the named logger and its children. Dropped records are
+counted in log_records_dropped_total
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from metrics import default_registry
+
+# Records buffered for the writer thread; further records are dropped
+LOG_QUEUE_SIZE = 10000
+
+# Accepted client-supplied request ids
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+LOG_RECORDS_DROPPED = default_registry.counter(
+    "log_records_dropped_total", "Log records not written, by reason (sampled, rate_limited, queue_full)")
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener = None
+
+def current_request_id() -> Optional[str]:
+    """Id of the request being handled (None outside requests)"""
+    return _request_id.get()
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra` fields are added as keys"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", "-") != "-":
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+def _prefix_rules(setting: Optional[str]) -> Dict[str, float]:
+    """Parse "name=value,name=value" into {name: float(value)}"""
+    rules = {}
+    for item in (setting or "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            rules[name.strip()] = float(value)
+    return rules
+
+class LogThrottle(logging.Filter):
+    """Per-logger sampling (below WARNING) and rate limits (all levels)
+
+    Runs in the logging thread before the record is queued, so a dropped
+    record costs its LogRecord, a dict lookup and a random number.
+    """
+
+    def __init__(self, sampling: Dict[str, float] = None, rate_limits: Dict[str, float] = None):
+        super().__init__()
+        self.sampling = sampling or {}
+        self.rate_limits = rate_limits or {}
+        self._rules = {}  # logger name -> (sample rate, rate limit), resolved once
+        self._buckets = {}  # logger name -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def _rule(self, name: str):
+        rule = self._rules.get(name)
+        if rule is None:
+            rule = (self._lookup(self.sampling, name, 1.0), self._lookup(self.rate_limits, name, None))
+            self._rules[name] = rule
+        return rule
+
+    @staticmethod
+    def _lookup(rules, name, default):
+        while name:
+            if name in rules:
+                return rules[name]
+            name = name.rpartition(".")[0]
+        return default
+
+    def filter(self, record):
+        sample_rate, rate_limit = self._rule(record.name)
+        if sample_rate < 1 and record.levelno < logging.WARNING and random.random() >= sample_rate:
+            LOG_RECORDS_DROPPED.inc(reason="sampled")
+            return False
+        if rate_limit is not None and not self._take_token(record.name, rate_limit):
+            LOG_RECORDS_DROPPED.inc(reason="rate_limited")
+            return False
+        return True
+
+    def _take_token(self, name: str, per_second: float) -> bool:
+        """Token bucket holding up to one second of records"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(name, [per_second, now])
+            bucket[0] = min(per_second, bucket[0] + (now - bucket[1]) * per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+class _RequestQueueHandler(logging.handlers.QueueHandler):
+    """Tags records with the request id and queues them without formatting"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.request_id = _request_id.get() or "-"
+        # Merge args now, since they may change after the call returns
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+def setup_logging(level: str = None, log_format: str = None):
+    """Route all logging through the background writer (idempotent)
+
+    `level` and `log_format` ("json" or "text") default to the LOG_LEVEL
+    and LOG_FORMAT environment variables.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    if (log_format or os.getenv("LOG_FORMAT", "json")) == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    records = queue.Queue(LOG_QUEUE_SIZE)
+    handler = _RequestQueueHandler(records)
+    handler.addFilter(LogThrottle(_prefix_rules(os.getenv("LOG_SAMPLING")), _prefix_rules(os.getenv("LOG_RATE_LIMITS"))))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level or os.getenv("LOG_LEVEL", "INFO"))
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+class RequestIdMiddleware:
+    """ASGI middleware assigning each request an id for its log records
+
+    A valid incoming X-Request-ID is kept (so ids follow a request across
+    services); otherwise a new one is generated. The id is echoed in the
+    X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
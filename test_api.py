@@ -21,6 +21,7 @@ class APITester:
     def __init__(self):
         self.headers = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
         self.created_product_id = None
+        self.catalog_version = None
         self.test_results = []
     
     def create_test_image(self):
@@ -183,6 +184,53 @@ class APITester:
             self.log_test("PUT /update-product/{id}", False, f"- Error: {e}")
             return False
     
+    def sync_catalog_changes(self, since):
+        """Follow /products/changes pages until caught up, return (version, upserts, deletes)"""
+        upserts, deletes = [], []
+        while True:
+            response = requests.get(f"{BASE_URL}/products/changes", params={"since": since})
+            response.raise_for_status()
+            changes = response.json()
+            upserts.extend(changes['upserts'])
+            deletes.extend(changes['deletes'])
+            since = changes['version']
+            if not changes['has_more']:
+                return since, upserts, deletes
+    
+    def test_capture_catalog_version(self):
+        """Record the catalog version before making changes"""
+        print("\n=== Testing Catalog Delta Sync ===")
+        try:
+            self.catalog_version, _, _ = self.sync_catalog_changes(0)
+            self.log_test("GET /products/changes", True, f"- Catalog version: {self.catalog_version}")
+            return True
+        except Exception as e:
+            self.log_test("GET /products/changes", False, f"- Error: {e}")
+            return False
+    
+    def test_product_changes(self, expect_deleted=False):
+        """Test that the created product shows up in the delta since the captured version"""
+        name = "Delta Sync (delete)" if expect_deleted else "Delta Sync (upsert)"
+        if self.catalog_version is None or not self.created_product_id:
+            self.log_test(name, False, "- No catalog version or product ID available")
+            return False
+        
+        try:
+            version, upserts, deletes = self.sync_catalog_changes(self.catalog_version)
+            if expect_deleted:
+                found = self.created_product_id in deletes
+            else:
+                found = any(p['id'] == self.created_product_id for p in upserts)
+            
+            if found and version > self.catalog_version:
+                self.log_test(name, True, f"- Product {self.created_product_id} in changes up to version {version}")
+                return True
+            self.log_test(name, False, f"- Product {self.created_product_id} missing from changes")
+            return False
+        except Exception as e:
+            self.log_test(name, False, f"- Error: {e}")
+            return False
+    
     def test_get_categories(self):
         """Test getting categories from database"""
         print("\n=== Testing Categories Retrieval ===")
@@ -282,11 +330,14 @@ class APITester:
         
         # Run all tests
         self.test_get_products()
+        self.test_capture_catalog_version()
         self.test_add_product()
         self.test_get_product_by_id()
         self.test_update_product()
+        self.test_product_changes()
         self.test_get_categories()
         self.test_delete_product()
+        self.test_product_changes(expect_deleted=True)
         self.test_database_error_handling()
         
         # Print summary
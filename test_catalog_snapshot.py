@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for on-disk catalog snapshots and warm starts
+These run under pytest without a database
+"""
+
+import threading
+
+from catalog_cache import CatalogCache, CatalogSnapshot
+from catalog_snapshot import HEADER, PRODUCTS_JSON, load_shared_snapshot, read_snapshot, write_snapshot
+
+PRODUCTS = [{'id': 1, 'title': "Tee", 'price': 19.99, 'quantity': 3, 'category': "t-shirts",
+             'images': {'thumbnail': "/t.jpg", 'main': "/m.jpg", 'original': "/o.jpg"},
+             'updated_at': None, 'is_active': True}]
+CATEGORIES = [{'name': "t-shirts", 'count': 1, 'total_products': 1, 'in_stock': 1, 'out_of_stock': 0}]
+
+def test_snapshot_round_trip_and_corruption(tmp_path):
+    """A written snapshot reads back unchanged; a damaged one is ignored"""
+    path = str(tmp_path / "catalog_snapshot.bin")
+    assert read_snapshot(path) is None
+
+    write_snapshot(CatalogSnapshot(version=7, products=PRODUCTS, categories=CATEGORIES), path)
+    snapshot = read_snapshot(path)
+    assert (snapshot.version, snapshot.products, snapshot.categories) == (7, PRODUCTS, CATEGORIES)
+
+    with open(path, "r+b") as f:
+        f.seek(HEADER.size + 5)
+        f.write(b"\xff")
+    assert read_snapshot(path) is None
+
+def test_cold_cache_serves_warm_start_while_database_is_down():
+    """The persisted snapshot is served at once and kept when the background refresh fails"""
+    refreshed = threading.Event()
+
+    def version_loader():
+        refreshed.set()
+        raise ConnectionError("database unavailable")
+
+    def loader(version):
+        raise AssertionError("database rebuild attempted")
+
+    warm = CatalogSnapshot(version=3, products=PRODUCTS, categories=CATEGORIES)
+    cache = CatalogCache(loader, version_loader, warm_start=lambda: warm)
+
+    assert cache.get() is warm
+    assert refreshed.wait(1)
+    assert cache.get() is warm
+
+def test_version_check_does_not_block_readers():
+    """Once the check interval passes, reads keep the current snapshot while the slow check runs behind them"""
+    release = threading.Event()
+    versions = iter([1, 2])
+
+    def version_loader():
+        version = next(versions)
+        if version == 2:
+            release.wait(5)
+        return version
+
+    def loader(version):
+        return CatalogSnapshot(version=version, products=PRODUCTS, categories=CATEGORIES)
+
+    cache = CatalogCache(loader, version_loader, check_interval=0)
+    first = cache.get()
+    assert first.version == 1
+
+    # The check for version 2 hangs until released; readers are not held up
+    for _ in range(3):
+        assert cache.get() is first
+    release.set()
+    for _ in range(100):
+        if cache.peek().version == 2:
+            break
+        threading.Event().wait(0.01)
+    assert cache.peek().version == 2
+
+def test_local_write_rebuilds_in_the_background():
+    """After invalidate(), reads keep the current snapshot while the new version is built"""
+    release = threading.Event()
+    versions = [1]
+
+    def loader(version):
+        if version == 2:
+            release.wait(5)
+        return CatalogSnapshot(version=version, products=PRODUCTS, categories=CATEGORIES)
+
+    cache = CatalogCache(loader, lambda: versions[-1], check_interval=60)
+    first = cache.get()
+    versions.append(2)
+    cache.invalidate()
+
+    assert cache.get() is first
+    release.set()
+    for _ in range(100):
+        if cache.peek().version == 2:
+            break
+        threading.Event().wait(0.01)
+    assert cache.get().version == 2
+
+def test_workers_share_one_build_per_version(tmp_path):
+    """A version published by one worker is mapped by the others, body included, without rebuilding"""
+    path = str(tmp_path / "catalog_snapshot.bin")
+    builds = []
+
+    def build(version):
+        builds.append(version)
+        snapshot = CatalogSnapshot(version=version, products=PRODUCTS, categories=CATEGORIES)
+        snapshot.derived[PRODUCTS_JSON] = b'[{"id":1}]'
+        return snapshot
+
+    first = load_shared_snapshot(4, build, path)
+    second = load_shared_snapshot(4, build, path)
+    assert builds == [4]
+    # Mapped sections are decoded only when used
+    assert second.product_count == 1 and "products" not in vars(second)
+    assert second.products == first.products and bytes(second.derived[PRODUCTS_JSON]) == b'[{"id":1}]'
+    assert isinstance(second.derived[PRODUCTS_JSON], memoryview)
+
+    assert load_shared_snapshot(5, build, path).version == 5
+    assert builds == [4, 5]
+
+def test_snapshot_from_another_database_is_rebuilt(tmp_path):
+    """A file ahead of the database (reset or restored since) is replaced, not served"""
+    path = str(tmp_path / "catalog_snapshot.bin")
+    write_snapshot(CatalogSnapshot(version=500, products=[], categories=[]), path)
+    builds = []
+
+    def build(version):
+        builds.append(version)
+        return CatalogSnapshot(version=version, products=PRODUCTS, categories=CATEGORIES)
+
+    cache = CatalogCache(lambda version: load_shared_snapshot(version, build, path), lambda: 3,
+                         check_interval=60, warm_start=lambda: read_snapshot(path))
+    cache.warm_start()
+    for _ in range(100):
+        if cache.peek().version == 3:
+            break
+        threading.Event().wait(0.01)
+
+    assert (cache.get().version, cache.get().products) == (3, PRODUCTS)
+    assert builds == [3]
+    assert read_snapshot(path).version == 3
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Concurrency tests for inventory reservations and checkout
+The in-memory counter and conditional-decrement tests run under pytest
+(the latter against SQLite, which executes the same statements with real
+transactions); the checkout race tests drive a running server
+(python main.py) with parallel buyers and check that stock is never
+oversold
+"""
+
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pymysql
+import requests
+
+from generate_static_site import DB_CONFIG
+import inventory
+from inventory import HotStockFront
+
+# API Base URL (change if running on different port)
+BASE_URL = "http://localhost:8000"
+
+def test_hot_stock_front_never_oversells():
+    """Parallel takes from the sharded counters never exceed the stock"""
+    front = HotStockFront(product_ids=[1], shards=8, refresh_interval=60)
+    front.set_available(1, 1000)
+
+    successes = []
+    lock = threading.Lock()
+
+    def buyer():
+        taken = 0
+        for _ in range(100):
+            if front.try_take(1, 1):
+                taken += 1
+        with lock:
+            successes.append(taken)
+
+    threads = [threading.Thread(target=buyer) for _ in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(successes) == 1000
+    assert front.available(1) == 0
+    assert front.try_take(1, 1) is False
+
+def test_hot_stock_front_takes_across_shards():
+    """A take larger than one shard borrows from the others, all or nothing"""
+    front = HotStockFront(product_ids=[1], shards=4)
+    front.set_available(1, 10)
+
+    assert front.try_take(1, 7) is True
+    assert front.available(1) == 3
+    assert front.try_take(1, 4) is False
+    assert front.available(1) == 3
+
+    front.give_back(1, 7)
+    assert front.available(1) == 10
+
+def test_hot_stock_front_ignores_untracked_and_stale():
+    """Untracked or stale products fall through to the database"""
+    front = HotStockFront(product_ids=[1], refresh_interval=0)
+    assert front.try_take(2, 1) is None
+    front.set_available(2, 5)
+    assert front.available(2) is None
+
+    front.set_available(1, 5)
+    assert front.try_take(1, 1) is None
+
+class SqliteCursor:
+    """pymysql-style cursor (%s placeholders, dict rows) over a SQLite connection"""
+
+    def __init__(self, connection):
+        self.cursor = connection.cursor()
+
+    def execute(self, query, args=()):
+        self.cursor.execute(query.replace("%s", "?"), args)
+        self.rowcount = self.cursor.rowcount
+
+    def fetchall(self):
+        columns = [column[0] for column in self.cursor.description]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+
+def test_conditional_decrement_never_oversells(tmp_path):
+    """Parallel two-item checkouts take exactly the scarcer stock and roll back partial decrements"""
+    path = str(tmp_path / "inventory.db")
+    setup = sqlite3.connect(path)
+    setup.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, quantity INTEGER NOT NULL, is_active BOOLEAN NOT NULL)")
+    setup.executemany("INSERT INTO products VALUES (?, ?, TRUE)", [(1, 10), (2, 25)])
+    setup.commit()
+    setup.close()
+
+    results = []
+    lock = threading.Lock()
+
+    def buyer():
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        connection.execute("BEGIN IMMEDIATE")
+        cursor = SqliteCursor(connection)
+        if inventory.decrement_stock(cursor, {2: 1, 1: 1}):
+            connection.execute("COMMIT")
+            outcome = True
+        else:
+            connection.execute("ROLLBACK")
+            outcome = inventory.find_unavailable(cursor, {1: 1, 2: 1})
+        connection.close()
+        with lock:
+            results.append(outcome)
+
+    threads = [threading.Thread(target=buyer) for _ in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    check = sqlite3.connect(path)
+    quantities = dict(check.execute("SELECT id, quantity FROM products").fetchall())
+    check.close()
+    assert results.count(True) == 10
+    assert all(outcome == [1] for outcome in results if outcome is not True)
+    assert quantities == {1: 0, 2: 15}
+
+class InventoryConcurrencyTester:
+    """Race many checkouts against a running server"""
+
+    def __init__(self, stock=10, buyers=50):
+        self.stock = stock
+        self.buyers = buyers
+        self.test_results = []
+
+    def log_test(self, test_name, passed, message=""):
+        """Log test results"""
+        status = "✓ PASS" if passed else "✗ FAIL"
+        print(f"{status}: {test_name} {message}")
+        self.test_results.append({"test": test_name, "passed": passed, "message": message})
+
+    def create_fixtures(self):
+        """Create a customer, address and a product with limited stock"""
+        connection = pymysql.connect(**DB_CONFIG)
+        with connection.cursor() as cursor:
+            tag = uuid.uuid4().hex[:8]
+            cursor.execute(
+                "INSERT INTO customers (first_name, last_name, email) VALUES (%s, %s, %s)",
+                ("Race", "Tester", f"race-{tag}@example.com")
+            )
+            self.customer_id = cursor.lastrowid
+            cursor.execute("""
+                INSERT INTO shipping_addresses (customer_id, address_line1, city, country, zip_code)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (self.customer_id, "1 Race Street", "Test City", "IN", "000000"))
+            self.address_id = cursor.lastrowid
+            cursor.execute("""
+                INSERT INTO products (title, description, price, quantity, category)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (f"Race Product {tag}", "Inventory race test product", 5.00, self.stock, "test-category"))
+            self.product_id = cursor.lastrowid
+        connection.close()
+
+    def remove_fixtures(self):
+        """Delete everything created by the test"""
+        connection = pymysql.connect(**DB_CONFIG)
+        with connection.cursor() as cursor:
+            # Reservations first (their items cascade), then anything left over
+            cursor.execute("""
+                DELETE r FROM inventory_reservations r
+                JOIN inventory_reservation_items i ON i.reservation_id = r.id
+                WHERE i.product_id = %s
+            """, (self.product_id,))
+            cursor.execute("DELETE FROM inventory_reservation_items WHERE product_id = %s", (self.product_id,))
+            cursor.execute("DELETE FROM catalog_changes WHERE product_id = %s", (self.product_id,))
+            cursor.execute("DELETE FROM order_items WHERE product_id = %s", (self.product_id,))
+            cursor.execute("DELETE FROM orders WHERE customer_id = %s", (self.customer_id,))
+            cursor.execute("DELETE FROM products WHERE id = %s", (self.product_id,))
+            cursor.execute("DELETE FROM shipping_addresses WHERE customer_id = %s", (self.customer_id,))
+            cursor.execute("DELETE FROM customers WHERE id = %s", (self.customer_id,))
+        connection.close()
+
+    def get_stock_state(self):
+        """Return (current quantity, units sold in order_items)"""
+        connection = pymysql.connect(**DB_CONFIG)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT quantity FROM products WHERE id = %s", (self.product_id,))
+            quantity = cursor.fetchone()['quantity']
+            cursor.execute(
+                "SELECT COALESCE(SUM(quantity), 0) AS sold FROM order_items WHERE product_id = %s",
+                (self.product_id,)
+            )
+            sold = int(cursor.fetchone()['sold'])
+        connection.close()
+        return quantity, sold
+
+    def place_order(self, _):
+        """Try to buy one unit; return the HTTP status code"""
+        response = requests.post(f"{BASE_URL}/orders/", json={
+            "customer_id": self.customer_id,
+            "shipping_address_id": self.address_id,
+            "items": [{"product_id": self.product_id, "quantity": 1, "price": 5.00}],
+            "total_amount": 5.00
+        })
+        return response.status_code
+
+    def test_parallel_checkouts(self):
+        """More buyers than stock: exactly `stock` orders succeed"""
+        print(f"\n=== Testing {self.buyers} Parallel Checkouts for {self.stock} Units ===")
+        with ThreadPoolExecutor(max_workers=self.buyers) as executor:
+            statuses = list(executor.map(self.place_order, range(self.buyers)))
+
+        created = statuses.count(201)
+        rejected = statuses.count(409)
+        quantity, sold = self.get_stock_state()
+
+        self.log_test("Successful Orders", created == self.stock, f"- {created} created, {rejected} rejected")
+        self.log_test("No Unexpected Errors", created + rejected == self.buyers,
+                      f"- Other statuses: {[s for s in statuses if s not in (201, 409)]}")
+        self.log_test("No Overselling", quantity == 0 and sold == self.stock,
+                      f"- Remaining quantity: {quantity}, units sold: {sold}")
+
+    def test_reservation_race(self):
+        """Parallel reservations hold at most the available stock and release it back"""
+        print("\n=== Testing Parallel Reservations ===")
+        connection = pymysql.connect(**DB_CONFIG)
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE products SET quantity = %s WHERE id = %s", (self.stock, self.product_id))
+        connection.close()
+
+        def reserve(_):
+            return requests.post(f"{BASE_URL}/inventory/reservations", json={
+                "items": [{"product_id": self.product_id, "quantity": 1}],
+                "ttl_seconds": 60
+            })
+
+        with ThreadPoolExecutor(max_workers=self.buyers) as executor:
+            responses = list(executor.map(reserve, range(self.buyers)))
+
+        held = [r.json()['id'] for r in responses if r.status_code == 201]
+        quantity, _ = self.get_stock_state()
+        self.log_test("Reservations Capped", len(held) == self.stock and quantity == 0,
+                      f"- {len(held)} held, remaining quantity: {quantity}")
+
+        for reservation_id in held:
+            requests.delete(f"{BASE_URL}/inventory/reservations/{reservation_id}")
+        quantity, _ = self.get_stock_state()
+        self.log_test("Reservations Released", quantity == self.stock, f"- Quantity restored to {quantity}")
+
+    def run_all_tests(self):
+        """Run all tests"""
+        print("Trendyoft Inventory Concurrency Test")
+        print("=" * 60)
+
+        self.create_fixtures()
+        try:
+            self.test_parallel_checkouts()
+            self.test_reservation_race()
+        finally:
+            self.remove_fixtures()
+
+        failed_tests = [result for result in self.test_results if not result['passed']]
+        print("\n" + "=" * 60)
+        if failed_tests:
+            print(f"⚠️  {len(failed_tests)} of {len(self.test_results)} checks failed.")
+        else:
+            print("🎉 All inventory concurrency checks passed!")
+
+def main():
+    """Main function"""
+    InventoryConcurrencyTester().run_all_tests()
+
+if __name__ == "__main__":
+    main()
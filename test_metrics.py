@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics registry
+These run under pytest without a database
+"""
+
+import json
+import threading
+
+from metrics import MetricsRegistry
+
+def test_counters_sum_thread_shards():
+    """Each thread records into its own shard; a scrape sees the total"""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests")
+
+    def worker():
+        for _ in range(10_000):
+            requests.inc(route="/products/")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 'requests_total{route="/products/"} 80000' in registry.render()
+
+def test_histogram_renders_cumulative_buckets():
+    """Buckets are cumulative and le is inclusive"""
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, route="/")
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{route="/",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{route="/",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="/",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/"} 4' in text
+    assert 'latency_seconds_sum{route="/"} 3.65' in text
+
+def test_worker_snapshots_are_merged(tmp_path):
+    """Counters from other workers are added; gauges of exited workers are dropped"""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests")
+    in_flight = registry.gauge("in_flight", "In flight")
+    requests.inc(3)
+    in_flight.inc()
+
+    registry._directory = str(tmp_path)
+    registry._exporter = object()  # Read snapshots without starting the writer thread
+    dead_pid = 2 ** 22 + 1  # Above the default pid_max, so never a live process
+    (tmp_path / f"metrics-{dead_pid}.json").write_text(json.dumps([
+        ["requests_total", [], 5],
+        ["in_flight", [], 7],
+    ]))
+
+    text = registry.render()
+    assert "requests_total 8" in text
+    assert "in_flight 1" in text
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for versioned schema migrations
+These run under pytest without a database
+"""
+
+import pymysql
+
+import migrations
+
+class RecordingCursor:
+    """Cursor that records statements and answers the migration bookkeeping queries"""
+
+    def __init__(self, applied_version=None):
+        self.applied_version = applied_version  # None: schema_migrations does not exist
+        self.statements = []
+        self._row = None
+
+    def execute(self, query, args=None):
+        query = " ".join(query.split())
+        self.statements.append((query, args))
+        self._row = None
+        if query.startswith("SELECT GET_LOCK"):
+            self._row = {'acquired': 1}
+        elif query.startswith("SELECT MAX(version)"):
+            if self.applied_version is None:
+                raise pymysql.err.ProgrammingError(1146, "Table 'schema_migrations' doesn't exist")
+            self._row = {'version': self.applied_version}
+        elif query.startswith("CREATE TABLE IF NOT EXISTS schema_migrations"):
+            self.applied_version = self.applied_version or 0
+
+    def fetchone(self):
+        return self._row
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+def test_schema_version_of_unmigrated_database_is_zero():
+    """A database without schema_migrations reports version 0 from a single query"""
+    cursor = RecordingCursor()
+    assert migrations.get_schema_version(cursor) == 0
+    assert len(cursor.statements) == 1
+
+def test_migrate_applies_only_pending_versions():
+    """Pending migrations are applied and recorded; an up-to-date schema is left alone"""
+    cursor = RecordingCursor()
+    connection = FakeConnection(cursor)
+    assert migrations.migrate(connection) == [version for version, _, _ in migrations.MIGRATIONS]
+    assert any(q.startswith("CREATE TABLE IF NOT EXISTS products") for q, _ in cursor.statements)
+    assert ("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (1, "baseline schema")) in cursor.statements
+    assert cursor.statements[-1][0].startswith("SELECT RELEASE_LOCK")
+
+    current = RecordingCursor(applied_version=migrations.SCHEMA_VERSION)
+    assert migrations.migrate(FakeConnection(current)) == []
+    assert not any(q.startswith("CREATE TABLE IF NOT EXISTS products") for q, _ in current.statements)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Tests for the sampling profiler
+These run under pytest without a database
+"""
+
+import threading
+import time
+
+import pytest
+
+from profiler import ProfilerBusy, StackSampler, collapse
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sampler_collapses_busy_thread_stacks():
+    """A busy thread shows up as thread;...;busy_loop with a positive count"""
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        with StackSampler(interval=0.001) as sampler:
+            time.sleep(0.2)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = collapse(sampler._stacks).splitlines()
+    busy = [line for line in lines if line.startswith("busy;")]
+    assert busy and all(" (test_profiler.py:" in line for line in busy)
+    stack, count = busy[0].rsplit(" ", 1)
+    assert stack.split(";")[-1].startswith("busy_loop") and int(count) > 0
+
+def test_only_one_profile_at_a_time():
+    with StackSampler():
+        with pytest.raises(ProfilerBusy):
+            StackSampler().start()
+    StackSampler().start().stop()
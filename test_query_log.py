@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Tests for query fingerprinting and the per-request query log
+These run under pytest without a database
+"""
+
+import logging
+
+from query_log import QueryRecord, RequestQueryLog, fingerprint
+
+def test_fingerprint_collapses_values_and_lists():
+    """Executions differing only in values or list lengths share a fingerprint"""
+    assert fingerprint("SELECT * FROM products WHERE id = %s") == "SELECT * FROM products WHERE id = ?"
+    assert fingerprint("SELECT id FROM  products\n WHERE id IN (%s, %s, %s)") == \
+        fingerprint("SELECT id FROM products WHERE id IN (%s)")
+    assert fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)") == "INSERT INTO t (a, b) VALUES (...)"
+    assert fingerprint("UPDATE t SET q = CASE id WHEN %s THEN %s WHEN %s THEN %s END") == \
+        "UPDATE t SET q = CASE id WHEN ? THEN ? ... END"
+    assert fingerprint("SELECT * FROM orders WHERE status = 'paid' LIMIT 10") == \
+        "SELECT * FROM orders WHERE status = ? LIMIT ?"
+
+def test_report_warns_on_repeats_and_reselect(caplog):
+    """Repeated statements and a primary-key read of a just-written table are flagged"""
+    log = RequestQueryLog("POST /products/")
+    log.queries.append(QueryRecord(fingerprint("INSERT INTO products (name) VALUES (%s)"), 0.001, 1, "main.py:1 in add"))
+    log.queries.append(QueryRecord(fingerprint("SELECT * FROM products WHERE id = %s"), 0.001, 1, "main.py:2 in get"))
+    for _ in range(5):
+        log.queries.append(QueryRecord(fingerprint("SELECT * FROM order_items WHERE order_id = %s"), 0.001, 2, "main.py:3 in items"))
+
+    with caplog.at_level(logging.WARNING, logger="trendyoft.query_log"):
+        log.report()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(m.startswith("Possible N+1 in POST /products/: 5 x SELECT * FROM order_items") for m in messages)
+    assert any(m.startswith("Re-select after write in POST /products/: SELECT * FROM products") for m in messages)
+    assert len(messages) == 2
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tests for the payment reconciliation merge-join and checks
+These run under pytest without a database
+"""
+
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import reconciliation
+from reconciliation import (
+    SettlementFileError, check_order, check_settlement, issue, merge_orders_and_payments, parse_settlement_file,
+    without_open_duplicates
+)
+
+def order(order_id, total, status="confirmed"):
+    return {"id": order_id, "total_amount": Decimal(total), "status": status, "order_date": datetime(2025, 7, 1)}
+
+def payment(order_id, amount, status="completed", payment_id=None):
+    return {"order_id": order_id, "payment_id": payment_id or f"pay_{order_id}", "status": status,
+            "amount": Decimal(amount)}
+
+def test_merge_join_groups_payments_by_order():
+    """Each order gets its own payments; unmatched payments are reported as orphans"""
+    orders = [order(1, "10.00"), order(3, "5.00"), order(4, "7.00")]
+    payments = [payment(1, "4.00"), payment(1, "6.00"), payment(2, "9.99"), payment(4, "7.00")]
+
+    merged = list(merge_orders_and_payments(orders, payments))
+
+    assert [(o and o["id"], [p["order_id"] for p in ps]) for o, ps in merged] == [
+        (1, [1, 1]),
+        (None, [2]),
+        (3, []),
+        (4, [4]),
+    ]
+
+def test_check_order_flags_mismatches():
+    """Missing, short and cancelled-but-paid orders are flagged; split payments that add up are not"""
+    assert check_order(order(1, "10.00"), [payment(1, "4.00"), payment(1, "6.00")]) == []
+
+    issues = check_order(order(2, "10.00"), [payment(2, "10.00", status="failed")])
+    assert [i["issue_type"] for i in issues] == ["missing_payment"]
+
+    issues = check_order(order(3, "10.00"), [payment(3, "9.00")])
+    assert [i["issue_type"] for i in issues] == ["amount_mismatch"]
+    assert issues[0]["actual_amount"] == Decimal("9.00")
+
+    issues = check_order(order(4, "10.00", status="cancelled"), [payment(4, "10.00")])
+    assert [i["issue_type"] for i in issues] == ["paid_cancelled_order"]
+    assert check_order(order(5, "10.00", status="cancelled"), []) == []
+
+    issues = check_order(None, [payment(6, "1.00")])
+    assert [i["issue_type"] for i in issues] == ["orphan_payment"]
+
+def test_settlement_file_hash_index_and_checks():
+    """Settlement rows are indexed by payment_id and compared with payment_details"""
+    settlements = parse_settlement_file(io.BytesIO(
+        b"payment_id,amount,status,currency\npay_1,10.00,completed,usd\npay_2,5.00,refunded,USD\npay_3,1.00,,\n"
+    ))
+    assert set(settlements) == {"pay_1", "pay_2", "pay_3"}
+    assert settlements["pay_3"]["status"] == "completed"
+
+    db_payment = {**payment(1, "10.00", payment_id="pay_1"), "currency": "USD"}
+    assert check_settlement("pay_1", settlements["pay_1"], db_payment) == []
+
+    db_payment = {**payment(2, "4.00", payment_id="pay_2"), "currency": "USD"}
+    issue_types = [i["issue_type"] for i in check_settlement("pay_2", settlements["pay_2"], db_payment)]
+    assert issue_types == ["settlement_amount_mismatch", "settlement_status_mismatch"]
+
+    assert [i["issue_type"] for i in check_settlement("pay_3", settlements["pay_3"], None)] == ["unknown_settlement"]
+
+    db_payment = {**payment(1, "10.00", payment_id="pay_1"), "currency": "EUR"}
+    issue_types = [i["issue_type"] for i in check_settlement("pay_1", settlements["pay_1"], db_payment)]
+    assert issue_types == ["settlement_currency_mismatch"]
+
+    with pytest.raises(SettlementFileError):
+        parse_settlement_file(io.BytesIO(b"payment_id,total\npay_1,10.00\n"))
+
+class OpenIssuesCursor:
+    """Cursor answering the open-issue lookup from a fixed set of rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def execute(self, query, args=None):
+        self.queries += 1
+        self._result = [row for row in self.rows if row["payment_id"] in args]
+
+    def fetchall(self):
+        return self._result
+
+def test_reimported_settlement_issues_are_not_duplicated():
+    """Issues already open for a payment and type are dropped; other types and payments are kept"""
+    cursor = OpenIssuesCursor([{"payment_id": "pay_1", "issue_type": "settlement_status_mismatch"}])
+    issues = [
+        issue("settlement_status_mismatch", payment_id="pay_1", source="settlement"),
+        issue("settlement_amount_mismatch", payment_id="pay_1", source="settlement"),
+        issue("settlement_status_mismatch", payment_id="pay_2", source="settlement"),
+    ]
+    kept = without_open_duplicates(cursor, issues)
+    assert [(i["payment_id"], i["issue_type"]) for i in kept] == [
+        ("pay_1", "settlement_amount_mismatch"), ("pay_2", "settlement_status_mismatch")
+    ]
+    assert cursor.queries == 1
+
+class ReconcileCursor:
+    """Cursor answering reconcile_orders' lock and state queries and recording inserted issues"""
+
+    def __init__(self, cutoff):
+        self.cutoff = cutoff
+        self.issue_types = []
+        self.watermarks = []
+
+    def execute(self, query, args=None):
+        query = " ".join(query.split())
+        self._row = None
+        if query.startswith("SELECT GET_LOCK"):
+            self._row = {"acquired": 1}
+        elif query.startswith("SELECT last_order_id"):
+            self._row = {"last_order_id": 0, "cutoff": self.cutoff}
+        elif query.startswith("INSERT INTO reconciliation_issues"):
+            self.issue_types.extend(args[2::7])
+        elif query.startswith("UPDATE reconciliation_state"):
+            self.watermarks.append(args[0])
+
+    def fetchone(self):
+        return self._row
+
+class ReconcileConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.open = True
+
+    def cursor(self):
+        return self._cursor
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.open = False
+
+def test_orphans_past_the_settle_cutoff_wait_for_the_next_run(monkeypatch):
+    """Orphan payments are only recorded with an order the watermark moves past"""
+    orders = [order(1, "10.00"), {**order(3, "5.00"), "order_date": datetime(2025, 7, 3)}]
+    payments = [payment(1, "10.00"), payment(2, "9.99")]
+    cursor = ReconcileCursor(cutoff=datetime(2025, 7, 2))
+    monkeypatch.setattr(reconciliation.pymysql, "connect", lambda **config: ReconcileConnection(cursor))
+    monkeypatch.setattr(reconciliation, "_stream_rows",
+                        lambda config, query, params: (row for row in (orders if "FROM orders" in query else payments)))
+
+    summary = reconciliation.reconcile_orders({})
+    assert (summary["last_order_id"], summary["issues"]) == (1, 0)
+    assert cursor.issue_types == [] and cursor.watermarks == [1]
+
+    cursor.cutoff = datetime(2025, 7, 4)
+    summary = reconciliation.reconcile_orders({})
+    assert cursor.issue_types == ["orphan_payment", "missing_payment"] and cursor.watermarks[-1] == 3
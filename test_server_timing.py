@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Tests for the Server-Timing middleware and span helpers
+These run under pytest without a database
+"""
+
+import asyncio
+
+from server_timing import ServerTimingMiddleware, add_timing, span
+
+def test_spans_are_reported_in_server_timing_header():
+    """Phases recorded during a request are summed and sent with the response start"""
+    async def app(scope, receive, send):
+        with span("db_query"):
+            pass
+        add_timing("db_query", 0.002)
+        add_timing("serialize", 0.0015)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(ServerTimingMiddleware(app)({"type": "http", "headers": []}, None, send))
+
+    header = dict(messages[0]["headers"])[b"server-timing"].decode()
+    entries = [entry.strip() for entry in header.split(",")]
+    assert entries[0].startswith("db_query;dur=2.") and entries[0].endswith('desc="2x"')
+    assert entries[1] == 'serialize;dur=1.50;desc="1x"'
+    assert entries[2].startswith("total;dur=")
+
+def test_spans_outside_requests_are_ignored():
+    with span("cache"):
+        add_timing("db_query", 1.0)
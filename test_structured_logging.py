@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for structured logging: JSON output, sampling and rate limits
+These run under pytest without a database
+"""
+
+import json
+import logging
+import queue
+
+from structured_logging import JsonFormatter, LogThrottle, _RequestQueueHandler, _request_id
+
+def make_record(name="main", level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_queued_records_are_json_with_request_id():
+    """Records are merged and tagged in the caller; the writer renders JSON with extras"""
+    records = queue.Queue()
+    handler = _RequestQueueHandler(records)
+    token = _request_id.set("req-1")
+    try:
+        handler.handle(make_record(rows=3))
+    finally:
+        _request_id.reset(token)
+
+    entry = json.loads(JsonFormatter().format(records.get_nowait()))
+    assert entry["message"] == "hello world"
+    assert entry["request_id"] == "req-1"
+    assert entry["rows"] == 3
+    assert entry["logger"] == "main" and entry["level"] == "INFO"
+
+def test_throttle_samples_below_warning_and_rate_limits():
+    throttle = LogThrottle(sampling={"main": 0.0}, rate_limits={"trendyoft.slow_query": 5})
+
+    assert not throttle.filter(make_record("main.child"))
+    assert throttle.filter(make_record("main", logging.WARNING))
+    assert throttle.filter(make_record("catalog_cache"))
+
+    passed = sum(throttle.filter(make_record("trendyoft.slow_query", logging.WARNING)) for _ in range(100))
+    assert passed == 5